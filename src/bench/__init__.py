@@ -0,0 +1,15 @@
+"""Storage benchmarks for the forum database.
+
+Run from ``src/``::
+
+    python -m bench seed  /tmp/bench.db --threads 1000000 --posts 10000000 --users 100000
+    python -m bench run   /tmp/bench.db --out results.json
+    python -m bench run   /tmp/bench.db --readers 8 --writers 2 --duration 30 --out load.json
+    python -m bench compare before.json after.json
+
+``seed`` bulk-loads synthetic data with skewed category/author/thread
+popularity, ``run`` measures latency percentiles and throughput of each
+``forum_db`` helper, and ``compare`` diffs two result files. Write ops (``--writes`` or
+``--writers``) modify the database, so re-seed a fresh copy when comparing
+commits.
+"""
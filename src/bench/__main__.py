@@ -0,0 +1,202 @@
+import argparse
+import json
+import platform
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import forum_db
+from bench import sessions, startup
+from bench.seed import seed
+from bench.workloads import read_ops, run_concurrent, run_single, write_ops
+from storage import MemoryBackend, ReplicaBackend, SQLiteBackend
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment(path: Path) -> dict:
+    with forum_db._conn() as c:
+        counts = {t: c.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("threads", "posts", "saves")}
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "db_path": str(path),
+        "db_bytes": path.stat().st_size,
+        "rows": counts,
+    }
+
+
+def _print_table(results: list[dict]) -> None:
+    print(f"{'op':<60} {'count':>7} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'ops/s':>9}")
+    for r in results:
+        print(f"{r['op']:<60} {r['count']:>7} {r['errors']:>5} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['ops_per_s']:>9.1f}")
+
+
+def cmd_seed(args) -> dict:
+    info = seed(Path(args.db), args.threads, args.posts, args.users, args.saves, args.seed)
+    print(json.dumps(info, indent=2))
+    return info
+
+
+def cmd_run(args) -> dict:
+    path = Path(args.db)
+    if args.backend == "memory":
+        backend = MemoryBackend()
+        backend.load_from(path)
+    elif args.backend == "replica":
+        backend = ReplicaBackend(path)  # reads on read-only connections to the same file
+    else:
+        backend = SQLiteBackend(path)
+    forum_db.set_backend(backend)
+    forum_db.init_db()
+    if args.readers or args.writers:
+        mode = "concurrent"
+        results = run_concurrent(args.readers, args.writers, args.duration, args.seed, args.cached)
+    else:
+        mode = "single"
+        ops = read_ops(args.cached)
+        if args.writes:
+            ops.update(write_ops())
+        results = run_single(ops, args.iterations, args.seed, args.match)
+    report = {
+        "mode": mode,
+        "cached": args.cached,
+        "params": {k: v for k, v in vars(args).items() if k != "func"},
+        "env": _environment(path),
+        "query_plan_problems": forum_db.verify_query_plans(),
+        "results": results,
+    }
+    _print_table(results)
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+    return report
+
+
+def cmd_startup(args) -> list[dict]:
+    results = startup.run(args.pages or None, args.reruns)
+    print(f"{'page':<22} {'streamlit':>9} {'imports':>9} {'bootstrap':>9} {'1st run':>9} {'rerun p50':>9} {'rerun max':>9} {'q/rerun':>7}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['page']:<22} failed: {r['error']}")
+            continue
+        print(f"{r['page']:<22} {r['streamlit_ms']:>9.1f} {r['imports_ms']:>9.1f} {r['bootstrap_ms']:>9.1f} {r['first_run_ms']:>9.1f} "
+              f"{r['rerun_p50_ms']:>9.1f} {r['rerun_max_ms']:>9.1f} {r['queries_per_rerun']:>7.1f}")
+    if args.out:
+        Path(args.out).write_text(json.dumps({"commit": _git_commit(), "results": results}, indent=2))
+    return results
+
+
+def cmd_sessions(args) -> dict:
+    reports = sessions.run(args.levels, args.seed, args.threads, args.posts)
+    print(f"{'sessions':>8} {'steps':>6} {'err':>4} {'p50':>9} {'p95':>9} {'p99':>9} {'steps/s':>8} {'KiB/sess':>9}")
+    for r in reports:
+        if "error" in r:
+            print(f"{r['sessions']:>8} failed: {r['error']}")
+            continue
+        a = next(x for x in r["results"] if x["op"] == "ALL steps")
+        print(f"{r['sessions']:>8} {a['count']:>6} {a['errors']:>4} {a['p50_ms']:>9.1f} {a['p95_ms']:>9.1f} "
+              f"{a['p99_ms']:>9.1f} {a['ops_per_s']:>8.1f} {r['rss_per_session_kb']:>9.0f}")
+    ok = [r for r in reports if "error" not in r]
+    if ok:
+        print(f"\n{'statements per rerun':<22}" + "".join(f"{r['sessions']:>9}" for r in ok))
+        for page in sorted({p for r in ok for p in r["pages"]}):
+            print(f"{page:<22}" + "".join(f"{r['pages'].get(page, {}).get('queries_per_rerun', 0):>9.1f}" for r in ok))
+    for r in ok:
+        for e in r["errors"][:5]:
+            print(f"[{r['sessions']} sessions] {e}")
+    # Flattened "<n> sessions: <step>" rows so `bench compare` works on these files too.
+    report = {
+        "commit": _git_commit(),
+        "params": {k: v for k, v in vars(args).items() if k != "func"},
+        "levels": reports,
+        "results": [{**x, "op": f"{r['sessions']} sessions: {x['op']}"} for r in ok for x in r["results"]],
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+    return report
+
+
+def cmd_compare(args) -> None:
+    """Print p50/p95 ratios (new/old) and flag ops that got slower."""
+    old = {r["op"]: r for r in json.loads(Path(args.old).read_text())["results"]}
+    new = {r["op"]: r for r in json.loads(Path(args.new).read_text())["results"]}
+    regressions = 0
+    print(f"{'op':<60} {'p50 old':>9} {'p50 new':>9} {'ratio':>7} {'p95 ratio':>9}")
+    for name in sorted(old.keys() & new.keys()):
+        o, n = old[name], new[name]
+        r50 = n["p50_ms"] / o["p50_ms"] if o["p50_ms"] else float("inf")
+        r95 = n["p95_ms"] / o["p95_ms"] if o["p95_ms"] else float("inf")
+        flag = "  <-- slower" if r50 > 1 + args.threshold else ""
+        regressions += bool(flag)
+        print(f"{name:<60} {o['p50_ms']:>9.3f} {n['p50_ms']:>9.3f} {r50:>7.2f} {r95:>9.2f}{flag}")
+    if regressions and args.fail:
+        sys.exit(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Forum storage benchmarks")
+    sub = parser.add_subparsers(required=True)
+
+    p = sub.add_parser("seed", help="bulk-load synthetic forum data")
+    p.add_argument("db")
+    p.add_argument("--threads", type=int, default=10000)
+    p.add_argument("--posts", type=int, default=100000)
+    p.add_argument("--users", type=int, default=1000)
+    p.add_argument("--saves", type=int, default=20000)
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=cmd_seed)
+
+    p = sub.add_parser("run", help="measure query helper latency and throughput")
+    p.add_argument("db")
+    p.add_argument("--iterations", type=int, default=200, help="calls per op (single mode)")
+    p.add_argument("--match", default="", help="only ops whose name contains this")
+    p.add_argument("--writes", action="store_true", help="include write ops (single mode)")
+    p.add_argument("--readers", type=int, default=0, help="concurrent reader threads")
+    p.add_argument("--writers", type=int, default=0, help="concurrent writer threads")
+    p.add_argument("--duration", type=float, default=10.0, help="seconds (concurrent mode)")
+    p.add_argument("--cached", action="store_true", help="go through READ_CACHE")
+    p.add_argument("--backend", choices=("sqlite", "memory", "replica"), default="sqlite",
+                   help="storage backend; memory copies the file into RAM first")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", help="write JSON results here")
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("startup", help="cold import, bootstrap and rerun cost per page")
+    p.add_argument("pages", nargs="*", help="page scripts relative to src/ (default: all)")
+    p.add_argument("--reruns", type=int, default=10)
+    p.add_argument("--out", help="write JSON results here")
+    p.set_defaults(func=cmd_startup)
+
+    p = sub.add_parser("sessions", help="concurrent simulated sessions driving the whole app")
+    p.add_argument("--levels", type=int, nargs="+", default=[1, 10, 50], help="session counts to measure")
+    p.add_argument("--threads", type=int, default=2000, help="threads in the seeded forum")
+    p.add_argument("--posts", type=int, default=10000, help="posts in the seeded forum")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", help="write JSON results here")
+    p.set_defaults(func=cmd_sessions)
+
+    p = sub.add_parser("compare", help="compare two JSON result files")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.2, help="flag p50 slowdowns above this fraction")
+    p.add_argument("--fail", action="store_true", help="exit 1 when any op regressed")
+    p.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import forum_db
+from db import PRAGMAS, connect
+from storage import SQLiteBackend
+
+# Bulk loading does not need crash safety: the file is thrown away if the
+# process dies, so skip fsyncs and grow the page cache.
+SEED_PRAGMAS = {**PRAGMAS, "synchronous": "OFF", "cache_size": -262144}
+WORDS = (
+    "audit balance budget capital cash compliance contract controlling cost "
+    "debt depreciation dividend equity finance governance grant income "
+    "invoice ledger liability merger policy profit reporting revenue risk "
+    "statement subsidy tax treasury valuation variance accrual acquisition "
+    "asset board director disclosure forecast learning lecture question quiz"
+).split()
+START = datetime(2024, 1, 1)
+# Filler vocabulary so term frequencies follow a Zipf curve like real text:
+# the domain words above are the most frequent, the long tail is rare.
+_SYLLABLES = "ba ko mi ne ra su ti vo ze la pe do gu hi ja".split()
+VOCAB = WORDS + [a + b + c for a in _SYLLABLES for b in _SYLLABLES for c in _SYLLABLES]
+
+
+def zipf_weights(n: int, s: float = 1.1) -> list[float]:
+    """Cumulative Zipf weights: a few items get most of the traffic."""
+    return list(accumulate(1.0 / (k ** s) for k in range(1, n + 1)))
+
+
+VOCAB_WEIGHTS = zipf_weights(len(VOCAB), 1.0)
+
+
+def words(rng: random.Random, k: int) -> list[str]:
+    return rng.choices(VOCAB, cum_weights=VOCAB_WEIGHTS, k=k)
+
+
+def _text(rng: random.Random, lo: int, hi: int) -> str:
+    return " ".join(words(rng, rng.randint(lo, hi)))
+
+
+def _chunks(total: int, size: int):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+def seed(path, threads: int = 10000, posts: int = 100000, users: int = 1000, saves: int = 20000, seed: int = 0, chunk: int = 50000, log=print) -> dict:
+    """Create (or extend) a forum database at ``path`` with synthetic rows."""
+    rng = random.Random(seed)
+    forum_db.set_backend(SQLiteBackend(path))
+    forum_db.init_db()
+    conn = connect(path, SEED_PRAGMAS, timed=False)
+    user_names = [f"user{i}" for i in range(users)]
+    user_w = zipf_weights(users)
+    cat_w = zipf_weights(len(forum_db.CATEGORIES), 0.8)
+    first_id = (conn.execute("SELECT MAX(id) FROM threads").fetchone()[0] or 0) + 1
+    step = timedelta(seconds=30)
+    timings = {}
+
+    t0 = time.perf_counter()
+    for start, n in _chunks(threads, chunk):
+        rows = []
+        for i in range(n):
+            title, body = _text(rng, 3, 10).capitalize(), _text(rng, 20, 200)
+            rows.append((
+                title,
+                body,
+                forum_db.make_preview(body),  # saves the trigger an UPDATE per row
+                rng.choices(forum_db.CATEGORIES, cum_weights=cat_w)[0],
+                rng.choices(user_names, cum_weights=user_w)[0],
+                (START + step * (first_id + start + i)).isoformat(timespec="seconds"),
+            ))
+        with conn:
+            conn.executemany(
+                "INSERT INTO threads (title, body, preview, category, author, created_at) VALUES (?,?,?,?,?,?)",
+                rows,
+            )
+        log(f"threads {start + n}/{threads}")
+    timings["threads_s"] = time.perf_counter() - t0
+
+    thread_ids = range(first_id, first_id + threads)
+    thread_w = zipf_weights(threads, 0.9) if threads else []
+    t0 = time.perf_counter()
+    for start, n in _chunks(posts if threads else 0, chunk):
+        rows = []
+        for _ in range(n):
+            tid = rng.choices(thread_ids, cum_weights=thread_w)[0]
+            ts = START + step * tid + timedelta(minutes=rng.randint(1, 60 * 24 * 30))
+            rows.append((tid, rng.choices(user_names, cum_weights=user_w)[0], _text(rng, 5, 80), ts.isoformat(timespec="seconds")))
+        with conn:
+            conn.executemany(
+                "INSERT INTO posts (thread_id, author, body, created_at) VALUES (?,?,?,?)",
+                rows,
+            )
+        log(f"posts {start + n}/{posts}")
+    timings["posts_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for start, n in _chunks(saves if threads else 0, chunk):
+        rows = [
+            (rng.choice(user_names), rng.choices(thread_ids, cum_weights=thread_w)[0])
+            for _ in range(n)
+        ]
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO saves (user, thread_id) VALUES (?,?)", rows)
+    timings["saves_s"] = time.perf_counter() - t0
+
+    with conn:
+        conn.execute("ANALYZE")
+    conn.close()
+    return {"threads": threads, "posts": posts, "users": users, "saves": saves, "seed": seed, **timings}
@@ -0,0 +1,281 @@
+import gc
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from bench.seed import words
+from bench.workloads import summarize
+
+# ---------- Multi-session load ----------
+# Drives the real app (streamlit_app.py and its st.navigation) headlessly.
+# Every simulated session is its own AppTest, so it has its own session
+# state and script runs, while all of them share this process's connection
+# pools, writer threads and caches, like sessions on one Streamlit server.
+# Sessions run the scripted flows below concurrently, one thread each.
+#
+# Each scale level runs in a fresh interpreter on a copy of the same seeded
+# forum and an empty quiz store, so levels are comparable:
+#   results        per-step latency (bench.workloads.summarize), one op per
+#                  "<step>" plus "ALL steps"
+#   pages          reruns, statements per rerun and mean time per page and
+#                  per fragment, from metrics
+#   rss_per_session_kb  resident memory growth over the warmed-up process,
+#                  per session, with every session still alive
+#
+# Component clicks (the answer bridge, the thread list) are delivered the
+# way the browser does: as the component's value in session state. AppTest
+# always reruns the whole script, also for widgets inside fragments, so
+# step latencies are an upper bound on what a browser session waits for.
+# Sessions share one interpreter, as on a single Streamlit server, so past
+# a few dozen of them the GIL, not SQLite, sets the pace.
+
+SRC = Path(__file__).resolve().parent.parent
+ANSWERS_PER_SESSION = 4
+# _share_runtime() replaces Streamlit internals that are not public API.
+# They are those of the release pinned in requirements.txt; on any other the
+# harness refuses to run instead of quietly measuring something else.
+STREAMLIT_VERSION = "1.50.0"
+
+
+def check_streamlit_version() -> None:
+    import streamlit
+
+    if streamlit.__version__ != STREAMLIT_VERSION:
+        raise RuntimeError(
+            f"bench sessions patches Streamlit {STREAMLIT_VERSION} internals, but {streamlit.__version__} "
+            "is installed: install the version from requirements.txt or update _share_runtime()"
+        )
+
+
+def _button(at, label: str):
+    return next(b for b in at.button if b.label == label)
+
+
+def _text_input(at, label: str):
+    return next(t for t in at.text_input if t.label == label)
+
+
+def _component_args(at, name: str) -> dict:
+    for el in at.main:
+        proto = getattr(el, "proto", None)
+        if getattr(proto, "component_name", None) == name:
+            return json.loads(proto.json_args)
+    return {}
+
+
+# Each step acts on the session's AppTest and reruns it; the step's time is
+# what the user would wait for. Widgets are looked up inside the step: an
+# element from an earlier run carries that run's widget states.
+def learner_flow(at, rng: random.Random, me: str):
+    yield "open app", lambda: at.run()
+    yield "save quiz", lambda: _button(at, "Save Table").click().run()
+    yield "open quiz", lambda: at.switch_page("pages/test.py").run()
+    for i in range(ANSWERS_PER_SESSION):
+        batch = [{
+            "questionId": f"q{i}",
+            "choice": rng.choice(["x", "y"]),
+            "correct": rng.random() < 0.6,
+            "answered_at": f"2026-01-01T00:00:{i:02d}Z",
+            "at_seconds": 10 * (i + 1),
+        }]
+
+        def answer(batch=batch, seq=i + 1):
+            at.session_state["yt_answer_bridge"] = {"seq": seq, "answers": batch}
+            at.run()
+
+        yield "answer", answer
+
+
+def forum_flow(at, rng: random.Random, me: str):
+    def open_forum():
+        at.session_state["user"] = me
+        at.switch_page("pages/forum.py").run()
+
+    yield "open forum", open_forum
+    yield "search", lambda: _text_input(at, "Type to search").input(words(rng, 1)[0][:4]).run()
+    yield "clear search", lambda: _text_input(at, "Type to search").input("").run()
+    rows = _component_args(at, "thread_list.thread_list").get("rows") or []
+    if not rows:
+        # The remaining steps need a thread; skipping them silently would
+        # report a run that never opened, saved or replied as clean.
+        raise RuntimeError("thread list is empty after clearing the search")
+    tid = rng.choice(rows[: min(len(rows), 10)])[0]
+
+    def open_thread():
+        at.session_state["thread_list_event"] = {"action": "open", "id": tid, "nonce": rng.random()}
+        at.run()
+
+    yield "open thread", open_thread
+    yield "save", lambda: at.button(key=f"save_{tid}").click().run()
+
+    def reply():
+        at.text_area(key=f"reply_text_{tid}").input(" ".join(words(rng, 12)))
+        _button(at, "Add Response").click().run()
+
+    yield "reply", reply
+    yield "back", lambda: _button(at, "← Back to all threads").click().run()
+
+
+FLOWS = (learner_flow, forum_flow)
+
+
+def _rss_kb() -> int:
+    """Resident memory now (Linux), else the peak so far."""
+    gc.collect()
+    try:
+        resident_pages = int(Path("/proc/self/statm").read_text().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS, KiB on Linux
+
+
+def _share_runtime():
+    """Make concurrent AppTests behave like sessions of one server.
+
+    Each AppTest run installs a mock Runtime in ``Runtime._instance`` and
+    clears it when done, which breaks any other session still running. Give
+    the process one shared mock instead, and point AppTest's own reference
+    at a subclass so its per-run set/clear lands there, not on Runtime.
+    Page bytecode is shared too, as a server's ScriptCache is; compiling
+    the pages again on every run of every session is not what a server
+    does (and concurrent compiles can crash CPython 3.11's parser).
+    """
+    check_streamlit_version()
+    from unittest.mock import MagicMock
+
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test
+
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = shared
+    app_test.Runtime = type("PerRunRuntime", (Runtime,), {})
+    script_cache = ScriptCache()
+    app_test.ScriptCache = lambda: script_cache
+    config.set_option("global.appTest", True)  # AppTest patches it per run; keep it on in between
+
+
+def _session(index: int, seed: int, start: threading.Barrier, samples: dict, errors: list, keep: list, lock):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed + index)
+    at = AppTest.from_file(str(SRC / "streamlit_app.py"), default_timeout=300)
+    local: dict[str, list] = {}
+    start.wait()
+    for flow in FLOWS:
+        try:
+            for name, step in flow(at, rng, f"load{index}"):
+                t = time.perf_counter_ns()
+                step()
+                local.setdefault(name, []).append(time.perf_counter_ns() - t)
+                if at.exception:
+                    errors.append(f"{name}: {at.exception[0].message}")
+        except Exception as e:  # a failed step ends this flow, not the run
+            errors.append(f"{flow.__name__}: {type(e).__name__}: {e}")
+    with lock:
+        for name, values in local.items():
+            samples.setdefault(name, []).extend(values)
+        keep.append(at)  # sessions stay alive until the RSS reading
+
+
+def measure(sessions: int, seed: int = 0) -> dict:
+    """Run ``sessions`` concurrent sessions in this (fresh) process."""
+    sys.path.insert(0, str(SRC))
+    import metrics
+    from bootstrap import bootstrap
+
+    bootstrap()
+    _share_runtime()
+    # One full session first, so lazy imports, pool connections and shared
+    # caches are not charged to the sessions being measured.
+    _session(-1, seed, threading.Barrier(1), {}, [], [], threading.Lock())
+    metrics.reset()
+    rss_before = _rss_kb()
+
+    samples, errors, keep, lock = {}, [], [], threading.Lock()
+    start = threading.Barrier(sessions + 1)
+    threads = [
+        threading.Thread(target=_session, args=(i, seed, start, samples, errors, keep, lock))
+        for i in range(sessions)
+    ]
+    for t in threads:
+        t.start()
+    start.wait()
+    began = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - began
+
+    results = [summarize(name, values, elapsed) for name, values in samples.items()]
+    results.append(summarize("ALL steps", [v for vs in samples.values() for v in vs], elapsed, len(errors)))
+    pages = {
+        p["page"]: {
+            "reruns": p["reruns"],
+            "queries_per_rerun": round(p["queries"] / p["reruns"], 2) if p["reruns"] else 0.0,
+            "mean_ms": round(p["seconds"] / p["reruns"] * 1000, 3) if p["reruns"] else 0.0,
+        }
+        for p in metrics.snapshot()["pages"]
+    }
+    return {
+        "sessions": sessions,
+        "elapsed_s": round(elapsed, 3),
+        "rss_per_session_kb": round((_rss_kb() - rss_before) / sessions, 1),
+        "errors": errors[:20],
+        "results": results,
+        "pages": pages,
+    }
+
+
+def run(levels=(1, 10, 50), seed: int = 0, threads: int = 2000, posts: int = 10000, log=print) -> list[dict]:
+    """Measure each session count in its own interpreter, on identical data."""
+    from bench.seed import seed as seed_forum
+    from db import connect
+
+    check_streamlit_version()
+    reports = []
+    with tempfile.TemporaryDirectory() as tmp:
+        seeded, template = Path(tmp) / "seeded.db", Path(tmp) / "template.db"
+        seed_forum(seeded, threads=threads, posts=posts, users=200, saves=2000, seed=seed, log=lambda *_: None)
+        # The seeder's pool and writer still hold pages in the -wal
+        # file, which a plain copy would leave behind; VACUUM INTO writes one
+        # self-contained file from a consistent read.
+        source = connect(seeded, timed=False)
+        try:
+            source.execute("VACUUM INTO ?", (str(template),))
+        finally:
+            source.close()
+        for n in levels:
+            level = Path(tmp) / str(n)
+            level.mkdir()
+            shutil.copy(template, level / "forum.db")
+            env = {**os.environ, "FORUM_DB_PATH": str(level / "forum.db"), "QUIZ_DB_PATH": str(level / "quiz.db"),
+                   "FORUM_DB_BACKEND": "sqlite"}
+            log(f"{n} sessions…")
+            proc = subprocess.run(
+                [sys.executable, "-m", "bench.sessions", str(n), str(seed)],
+                cwd=SRC, env=env, capture_output=True, text=True,
+            )
+            if proc.returncode:
+                reports.append({"sessions": n, "error": proc.stderr.strip().splitlines()[-1:]})
+                continue
+            reports.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return reports
+
+
+if __name__ == "__main__":  # child process: python -m bench.sessions <sessions> <seed>
+    print(json.dumps(measure(int(sys.argv[1]), int(sys.argv[2]))))
@@ -0,0 +1,132 @@
+import ast
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# ---------- Startup / rerun timing ----------
+# Each page is measured in a fresh interpreter so nothing is pre-imported:
+#   streamlit_ms  importing streamlit itself (shared by every page)
+#   imports       cold import time of each module the page imports
+#   bootstrap_ms  one-time setup (bootstrap.py)
+#   first_run_ms  first execution of the page script
+#   rerun_*       later reruns, which is what users feel on every click
+#   queries_per_rerun  SQL statements issued per rerun
+# The forum runs on an in-memory backend and the quiz store in a temp dir,
+# so measuring never touches the real databases.
+
+SRC = Path(__file__).resolve().parent.parent
+PAGES = ["pages/setting.py", "pages/test.py", "pages/forum.py", "pages/analytics.py", "pages/admin.py"]
+
+
+def page_imports(page: str) -> list[str]:
+    """Top-level absolute imports of a page script, in order."""
+    tree = ast.parse((SRC / page).read_text(encoding="utf-8"))
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names += [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.append(node.module)
+    return list(dict.fromkeys(names))
+
+
+def _ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+def _session_state(page: str) -> dict:
+    if page != "pages/test.py":
+        return {"user": "bench"}
+    import pandas as pd
+
+    table = pd.DataFrame({
+        "Time": ["0:10", "0:25", "0:45"],
+        "Question": ["What topic is being discussed?", "What is the keyword?", "Which statement is correct?"],
+        "Option A": ["AI", "Alpha", "Yes"],
+        "Option B": ["Cloud", "Beta", "No"],
+        "Option C": ["Security", "Gamma", ""],
+        "Correct Answer": ["AI", "Beta", "Yes"],
+    })
+    return {"user": "bench", "video_url": "https://www.youtube.com/watch?v=4dCrkp8qgLU", "quiz_table": table}
+
+
+def measure_page(page: str, reruns: int) -> dict:
+    """Measure ``page`` in this (fresh) process."""
+    start = time.perf_counter()
+    import streamlit  # noqa: F401
+
+    streamlit_ms = _ms(start)
+    from streamlit.testing.v1 import AppTest
+
+    sys.path.insert(0, str(SRC))
+    imports = {}
+    for name in page_imports(page):
+        already = name in sys.modules
+        start = time.perf_counter()
+        importlib.import_module(name)
+        imports[name] = 0.0 if already else _ms(start)
+
+    from bootstrap import bootstrap
+
+    start = time.perf_counter()
+    bootstrap()
+    bootstrap_ms = _ms(start)
+
+    import metrics
+
+    at = AppTest.from_file(str(SRC / page), default_timeout=60)
+    for key, value in _session_state(page).items():
+        at.session_state[key] = value
+    start = time.perf_counter()
+    at.run()
+    first_run_ms = _ms(start)
+
+    def statements() -> int:
+        return sum(q["count"] for q in metrics.snapshot()["queries"])
+
+    times, queries = [], []
+    for _ in range(reruns):
+        before = statements()
+        start = time.perf_counter()
+        at.run()
+        times.append(_ms(start))
+        queries.append(statements() - before)
+    return {
+        "page": page,
+        "streamlit_ms": streamlit_ms,
+        "imports_ms": round(sum(imports.values()), 3),
+        "imports": imports,
+        "bootstrap_ms": bootstrap_ms,
+        "first_run_ms": first_run_ms,
+        "rerun_p50_ms": round(statistics.median(times), 3) if times else None,
+        "rerun_max_ms": max(times) if times else None,
+        "queries_per_rerun": statistics.mean(queries) if queries else None,
+        "exceptions": [e.message for e in at.exception],
+    }
+
+
+def run(pages=None, reruns: int = 10) -> list[dict]:
+    """Measure every page, each in its own interpreter."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "FORUM_DB_BACKEND": "memory", "QUIZ_DB_PATH": str(Path(tmp) / "quiz.db")}
+        for page in pages or PAGES:
+            proc = subprocess.run(
+                [sys.executable, "-m", "bench.startup", page, str(reruns)],
+                cwd=SRC, env=env, capture_output=True, text=True,
+            )
+            if proc.returncode:
+                results.append({"page": page, "error": proc.stderr.strip().splitlines()[-1:]})
+                continue
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return results
+
+
+if __name__ == "__main__":  # child process: python -m bench.startup <page> <reruns>
+    print(json.dumps(measure_page(sys.argv[1], int(sys.argv[2]))))
@@ -0,0 +1,168 @@
+import random
+import threading
+import time
+from itertools import product
+
+import forum_db
+from bench.seed import words
+
+# ---------- Operations ----------
+# Each op takes (rng, ctx) and performs one call against forum_db. The
+# benchmark bypasses READ_CACHE by default (``.uncached``) so it measures
+# the storage layer; pass cached=True to measure what the UI sees.
+
+
+def _fn(name: str, cached: bool):
+    fn = getattr(forum_db, name)
+    return fn if cached else getattr(fn, "uncached", fn)
+
+
+def _context() -> dict:
+    with forum_db._conn() as c:
+        max_id = c.execute("SELECT MAX(id) FROM threads").fetchone()[0] or 0
+        users = [r[0] for r in c.execute("SELECT DISTINCT author FROM threads LIMIT 1000")]
+    return {"max_id": max_id, "users": users or ["user0"]}
+
+
+def _thread_id(rng, ctx) -> int:
+    # Bias towards low ids, matching the seeder's hot threads.
+    return max(1, min(ctx["max_id"], int(rng.paretovariate(1.2))))
+
+
+def read_ops(cached: bool = False) -> dict:
+    """Read operations, including every query_threads filter combination."""
+    qt = _fn("query_threads", cached)
+    page = _fn("query_thread_page", cached)
+    ops = {}
+    for search, category, author, saved, sort in product(
+        (False, True), (False, True), (False, True), (False, True), forum_db.SORT_ORDERS
+    ):
+        name = "query_threads[" + ",".join(
+            f for f, on in (("search", search), ("category", category), ("author", author), ("saved", saved)) if on
+        ) + f"|{sort}]"
+
+        def op(rng, ctx, search=search, category=category, author=author, saved=saved, sort=sort):
+            return qt(
+                search=words(rng, 1)[0][:4] if search else "",
+                category=rng.choice(forum_db.CATEGORIES) if category else None,
+                author=rng.choice(ctx["users"]) if author else None,
+                saved_by=rng.choice(ctx["users"]) if saved else None,
+                sort=sort, limit=25,
+            )
+
+        ops[name] = op
+    ops["query_thread_page"] = lambda rng, ctx: page(rng.choice(ctx["users"]), limit=25)
+    ops["query_thread_page[deep]"] = lambda rng, ctx: page(
+        rng.choice(ctx["users"]), limit=25, cursor=(rng.randint(1, ctx["max_id"] or 1),)
+    )
+    ops["search_threads"] = lambda rng, ctx: _fn("search_threads", cached)(" ".join(words(rng, 2)), limit=25)
+    ops["get_thread_view"] = lambda rng, ctx: _fn("get_thread_view", cached)(_thread_id(rng, ctx), rng.choice(ctx["users"]))
+    ops["list_posts"] = lambda rng, ctx: _fn("list_posts", cached)(_thread_id(rng, ctx), limit=20)
+    ops["post_count"] = lambda rng, ctx: _fn("post_count", cached)(_thread_id(rng, ctx))
+    ops["is_saved"] = lambda rng, ctx: _fn("is_saved", cached)(rng.choice(ctx["users"]), _thread_id(rng, ctx))
+    return ops
+
+
+def write_ops() -> dict:
+    return {
+        "create_thread": lambda rng, ctx: forum_db.create_thread(
+            " ".join(words(rng, 5)), " ".join(words(rng, 60)), rng.choice(forum_db.CATEGORIES), rng.choice(ctx["users"])
+        ),
+        "add_post": lambda rng, ctx: forum_db.add_post(_thread_id(rng, ctx), " ".join(words(rng, 30)), rng.choice(ctx["users"])),
+        "toggle_save": lambda rng, ctx: forum_db.toggle_save(rng.choice(ctx["users"]), _thread_id(rng, ctx)),
+    }
+
+
+# ---------- Measurement ----------
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+def summarize(name: str, latencies_ns: list, elapsed_s: float, errors: int = 0) -> dict:
+    ms = sorted(v / 1e6 for v in latencies_ns)
+    return {
+        "op": name,
+        "count": len(ms),
+        "errors": errors,
+        "p50_ms": round(percentile(ms, 50), 4),
+        "p95_ms": round(percentile(ms, 95), 4),
+        "p99_ms": round(percentile(ms, 99), 4),
+        "max_ms": round(ms[-1], 4) if ms else 0.0,
+        "ops_per_s": round(len(ms) / elapsed_s, 1) if elapsed_s else 0.0,
+    }
+
+
+def run_single(ops: dict, iterations: int = 200, seed: int = 0, match: str = "") -> list[dict]:
+    """Run each op ``iterations`` times back to back on one thread."""
+    ctx = _context()
+    results = []
+    for name, op in ops.items():
+        if match and match not in name:
+            continue
+        rng = random.Random(seed)
+        latencies, errors = [], 0
+        start = time.perf_counter()
+        for _ in range(iterations):
+            t = time.perf_counter_ns()
+            try:
+                op(rng, ctx)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter_ns() - t)
+        results.append(summarize(name, latencies, time.perf_counter() - start, errors))
+    return results
+
+
+def run_concurrent(readers: int = 4, writers: int = 1, duration: float = 10.0, seed: int = 0, cached: bool = False) -> list[dict]:
+    """Mixed workload: reader threads pick random read ops, writers random writes.
+
+    SQLite releases the GIL while executing a statement, so threads are
+    enough to expose lock contention between readers and the writer.
+    """
+    ctx = _context()
+    reads, writes = read_ops(cached), write_ops()
+    samples: dict[str, list] = {}
+    errors: dict[str, int] = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(i: int, ops: dict):
+        rng = random.Random(seed + i)
+        names = list(ops)
+        local: dict[str, list] = {}
+        local_err: dict[str, int] = {}
+        while time.perf_counter() < deadline:
+            name = rng.choice(names)
+            t = time.perf_counter_ns()
+            try:
+                ops[name](rng, ctx)
+            except Exception:
+                local_err[name] = local_err.get(name, 0) + 1
+                continue
+            local.setdefault(name, []).append(time.perf_counter_ns() - t)
+        with lock:
+            for name, vals in local.items():
+                samples.setdefault(name, []).extend(vals)
+            for name, n in local_err.items():
+                errors[name] = errors.get(name, 0) + n
+
+    threads = [threading.Thread(target=worker, args=(i, reads)) for i in range(readers)]
+    threads += [threading.Thread(target=worker, args=(readers + i, writes)) for i in range(writers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    names = sorted(set(samples) | set(errors))
+    results = [summarize(n, samples.get(n, []), elapsed, errors.get(n, 0)) for n in names]
+    all_reads = [v for n in reads for v in samples.get(n, [])]
+    all_writes = [v for n in writes for v in samples.get(n, [])]
+    results.append(summarize("ALL reads", all_reads, elapsed, sum(errors.get(n, 0) for n in reads)))
+    results.append(summarize("ALL writes", all_writes, elapsed, sum(errors.get(n, 0) for n in writes)))
+    return results
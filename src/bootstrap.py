@@ -0,0 +1,46 @@
+import threading
+import time
+
+import metrics
+
+# ---------- Process bootstrap ----------
+# Page scripts are re-executed on every rerun, but schemas and shared
+# resources only need setting up once per server process. Every page calls
+# bootstrap(); after the first call it is a flag check. The store modules
+# are imported inside it so that importing this module stays cheap.
+
+_lock = threading.Lock()
+_done = False
+TIMINGS: dict[str, float] = {}  # step -> milliseconds, for the Admin page
+
+
+def _steps():
+    import forum_db
+    import quiz_db
+    from db import get_writer
+
+    return [
+        ("forum schema", forum_db.init_db),
+        ("quiz schema", quiz_db.init_quiz_db),
+        ("forum search index", forum_db._fts_enabled),
+        ("forum writer", forum_db._backend.writer),
+        ("quiz writer", lambda: get_writer(quiz_db.DB_PATH)),
+    ]
+
+
+def bootstrap() -> dict:
+    """Run the one-time setup if this process has not done so; returns step timings."""
+    global _done
+    if _done:
+        return TIMINGS
+    with _lock:
+        if not _done:
+            for name, step in _steps():
+                start = time.perf_counter()
+                step()
+                TIMINGS[name] = round((time.perf_counter() - start) * 1000, 3)
+            _done = True
+    return TIMINGS
+
+
+metrics.register_gauge("bootstrap_ms", lambda: dict(TIMINGS))
@@ -0,0 +1,94 @@
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+# ---------- Read-through cache ----------
+# Process-wide, so every Streamlit session shares the same hot entries.
+# Writes never touch cached values directly: they bump generation counters
+# for the scopes they affect ("threads", "thread:42", "saves:alice", ...).
+# Every cache key embeds the current generations of the scopes it reads, so
+# the next read after a write simply misses and reloads; superseded entries
+# age out through LRU eviction or the TTL. Counters only ever go up: a read
+# that started before a bump (or a clear) stores its rows under the old
+# generations, where no later lookup will find them.
+
+
+class ReadCache:
+    def __init__(self, maxsize: int = 2048, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._epoch = 0  # bumped by clear(); part of every key, like a scope
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def generations(self, scopes) -> tuple:
+        with self._lock:
+            return (self._epoch, *(self._generations.get(s, 0) for s in scopes))
+
+    def bump(self, *scopes: str) -> None:
+        """Invalidate every entry that depends on any of ``scopes``."""
+        with self._lock:
+            for s in scopes:
+                self._generations[s] = self._generations.get(s, 0) + 1
+
+    def clear(self) -> None:
+        """Invalidate every entry."""
+        with self._lock:
+            self._data.clear()
+            self._epoch += 1
+
+    def get_or_load(self, key, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = loader()
+        with self._lock:
+            self._data[key] = (now + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+def cached(cache: ReadCache, *scopes: str, namespace=None):
+    """Memoize a read function in ``cache``.
+
+    ``scopes`` are format strings filled from the call's bound arguments,
+    e.g. ``"thread:{thread_id}"``. ``namespace`` is an optional callable
+    whose result is added to the key (used to tell databases apart).
+    """
+
+    def decorate(fn):
+        sig = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            names = [s.format(**bound.arguments) for s in scopes]
+            key = (
+                fn.__name__,
+                namespace() if namespace else None,
+                tuple(bound.arguments.items()),
+                cache.generations(names),
+            )
+            return cache.get_or_load(key, lambda: fn(*args, **kwargs))
+
+        wrapper.uncached = fn
+        return wrapper
+
+    return decorate
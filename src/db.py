@@ -0,0 +1,534 @@
+import contextvars
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from queue import Empty, LifoQueue, Queue
+
+import metrics
+
+# ---------- SQLite connection pool ----------
+# Page scripts are re-executed on every Streamlit rerun, but imported modules
+# live for the whole server process. Pools kept here are therefore shared by
+# every session and every rerun, so connections are opened once and reused.
+
+PRAGMAS = {
+    # Must precede journal_mode, whose header write fixes the mode of a new
+    # file; on existing files it is a no-op (see forum_db "Retention").
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",      # readers never block on the writer
+    "synchronous": "NORMAL",    # safe with WAL, avoids an fsync per commit
+    "cache_size": -16000,       # ~16 MB page cache per connection
+    "mmap_size": 268435456,     # 256 MB memory-mapped reads
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,       # wait for locks instead of failing at once
+}
+STATEMENT_CACHE = 256           # prepared statements kept per connection
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Reports each statement to ``metrics`` once its rows are consumed.
+
+    Rows may be read with fetchone/fetchmany/fetchall or by iterating; a
+    statement left part way is reported with the rows read so far at the
+    next execute(), at close() or when the cursor is garbage collected.
+    """
+
+    _pending = None  # [sql, seconds so far, rows so far]
+
+    def execute(self, sql, parameters=()):
+        self._flush()
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        elapsed = time.perf_counter() - start
+        if self.description is None:  # no result set: the statement is done
+            metrics.record_query(sql, elapsed, max(self.rowcount, 0))
+        else:
+            self._pending = [sql, elapsed, 0]
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._flush()
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        metrics.record_query(sql, time.perf_counter() - start, max(self.rowcount, 0))
+        return self
+
+    def _flush(self) -> None:
+        if self._pending is not None:
+            sql, elapsed, rows = self._pending
+            self._pending = None
+            metrics.record_query(sql, elapsed, rows)
+
+    def _track(self, start: float, rows: int, done: bool) -> None:
+        if self._pending is not None:
+            self._pending[1] += time.perf_counter() - start
+            self._pending[2] += rows
+            if done:
+                self._flush()
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._track(start, row is not None, True)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._track(start, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._track(start, len(rows), True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._track(start, 0, True)
+            raise
+        self._track(start, 1, False)
+        return row
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        self._flush()
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        # sqlite3.Connection.execute bypasses an overridden cursor(); route
+        # it through ours so shortcut calls are timed as well.
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _is_uri(path) -> bool:
+    return str(path).startswith("file:")
+
+
+def _key(path) -> str:
+    """Registry key: URIs as given, file paths resolved."""
+    return str(path) if _is_uri(path) else str(Path(path).resolve())
+
+
+def connect(path, pragmas: dict | None = None, timed: bool = True) -> sqlite3.Connection:
+    """Open a connection with the shared pragma set applied.
+
+    ``path`` may also be a ``file:`` URI (in-memory or read-only databases).
+    ``timed=False`` keeps its statements out of ``metrics`` (housekeeping
+    connections that are not serving a page). The pragmas go in as one
+    script, so a pool growing during a rerun adds one call, not one
+    counted statement per pragma.
+    """
+    conn = sqlite3.connect(
+        str(path),
+        uri=_is_uri(path),
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE,
+        factory=TimedConnection if metrics.ENABLED and timed else sqlite3.Connection,
+    )
+    conn.executescript("".join(f"PRAGMA {name}={value};" for name, value in (pragmas or PRAGMAS).items()))
+    return conn
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """No pooled connection became free within the pool's timeout."""
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived connections to one database file.
+
+    ``connection()`` checks a connection out, commits on success, rolls back
+    on error and hands it back. Connections are created lazily up to
+    ``size``; callers beyond that wait for one to be returned, at most the
+    connections' ``busy_timeout``, then get PoolTimeout.
+    """
+
+    def __init__(self, path, size: int = 8, pragmas: dict | None = None):
+        self.path = path if _is_uri(path) else Path(path)
+        self.size = size
+        self.pragmas = pragmas or PRAGMAS
+        self.timeout = self.pragmas.get("busy_timeout", 5000) / 1000
+        self._idle: LifoQueue = LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+
+    def _acquire(self) -> sqlite3.Connection:
+        self.checkouts += 1
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return connect(self.path, self.pragmas)
+                except Exception:
+                    self._opened -= 1
+                    raise
+        self.waits += 1
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except Empty:
+            raise PoolTimeout(
+                f"no connection to {self.path} free after {self.timeout:g}s "
+                f"({self.size} in use; a checkout was leaked or held too long)"
+            ) from None
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    @property
+    def idle_count(self) -> int:
+        return self._idle.qsize()
+
+    @property
+    def in_use(self) -> int:
+        return self._opened - self._idle.qsize()
+
+    def close(self) -> None:
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except Empty:
+                    break
+                self._opened -= 1
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path, size: int = 8, pragmas: dict | None = None) -> ConnectionPool:
+    """Return the process-wide pool for ``path``, creating it on first use."""
+    key = _key(path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(key, size=size, pragmas=pragmas)
+        return pool
+
+
+# ---------- Migrations ----------
+# Schemas are versioned with PRAGMA user_version; each store keeps its own
+# append-only list of steps and calls migrate() from its init function.
+
+def schema_version(c) -> int:
+    return c.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _statements(script: str):
+    """Split a SQL script into complete statements (trigger bodies included)."""
+    buf = ""
+    for line in script.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            yield buf.strip()
+            buf = ""
+    if buf.strip():
+        yield buf.strip()
+
+
+def migrate(c, migrations) -> int:
+    """Apply pending ``migrations`` on connection ``c``; returns the new version.
+
+    ``migrations`` is a list of ``(version, description, script, required)``.
+    An optional step that fails (e.g. SQLite built without FTS5) is skipped.
+
+    Every step runs in its own ``BEGIN IMMEDIATE`` transaction and re-reads
+    the version once it holds the write lock, so concurrent processes
+    starting at the same time apply each migration exactly once.
+    """
+    version = schema_version(c)
+    for target, description, script, required in migrations:
+        if target <= version:
+            continue
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(c) < target:
+                for stmt in _statements(script):
+                    c.execute(stmt)
+                c.execute(f"PRAGMA user_version={target}")
+            c.commit()
+        except sqlite3.Error:
+            c.rollback()
+            if required:
+                raise
+            c.execute(f"PRAGMA user_version={target}")
+        version = target
+    return version
+
+
+# ---------- Single writer ----------
+# SQLite allows one writer at a time. Instead of every session opening its
+# own write transaction (and racing into "database is locked"), writes are
+# funnelled into one background thread per database file. It drains the
+# queue into short batched transactions and reports each result through a
+# Future, so callers can block on it or carry on.
+#
+# A busy writer must not starve readers: a batch commits once it has run for
+# BATCH_SECONDS (the rest goes into the next one), and while any reader holds
+# a pooled connection to the same file and more writes are waiting, the
+# writer pauses after each batch for as long as the batch took.
+
+BUSY_RETRIES = 6
+log = logging.getLogger("db.writer")
+BATCH_SECONDS = 0.02
+
+
+def _is_busy(e: Exception) -> bool:
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in str(e) or "busy" in str(e))
+
+
+class WriteQueue:
+    def __init__(self, path, max_batch: int = 64, pragmas: dict | None = None, batch_seconds: float = BATCH_SECONDS):
+        self.path = path if _is_uri(path) else Path(path)
+        self.max_batch = max_batch
+        self.batch_seconds = batch_seconds
+        self._pool_key = _key(path)
+        self.pragmas = pragmas or PRAGMAS
+        self.batches = 0
+        self.jobs = 0
+        self.retries = 0
+        self.pauses = 0
+        self._queue: Queue = Queue()
+        self._conn: sqlite3.Connection | None = None
+        self._conn_lock = threading.Lock()  # held while a batch runs
+        self._data_version = 0
+        self._thread = threading.Thread(target=self._run, name=f"sqlite-writer:{Path(str(self.path)).name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, on_commit=None, transaction: bool = True) -> Future:
+        """Queue ``fn(conn)`` to run inside the next write transaction.
+
+        ``on_commit(result)`` runs after COMMIT and before the future
+        resolves, e.g. to invalidate caches that depend on the write. If it
+        raises, the error is logged and the future still gets the result.
+        ``transaction=False`` runs ``fn`` on its own, outside BEGIN/COMMIT,
+        for statements SQLite refuses inside a transaction (VACUUM, WAL
+        checkpoints); it still waits its turn behind the writes queued
+        before it, so it never competes with them for the lock.
+        """
+        future: Future = Future()
+        # Run in the caller's context so metrics attribute the SQL to the
+        # helper that queued it rather than to the writer thread.
+        ctx = contextvars.copy_context()
+        self._queue.put((lambda conn: ctx.run(fn, conn), future, on_commit, transaction))
+        return future
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def data_version(self) -> int:
+        """PRAGMA data_version as seen by the writer's own connection.
+
+        It moves when any *other* connection commits and never for this
+        queue's own commits, so a change always means a write made elsewhere.
+        While a batch runs, the value read at its BEGIN IMMEDIATE is returned
+        instead of waiting. The pragma bypasses metrics: it is housekeeping.
+        """
+        if not self._conn_lock.acquire(blocking=False):
+            return self._data_version
+        try:
+            if self._conn is None:
+                self._conn = self._connect()
+            self._data_version = sqlite3.Connection.execute(self._conn, "PRAGMA data_version").fetchone()[0]
+            return self._data_version
+        finally:
+            self._conn_lock.release()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = connect(self.path, self.pragmas)
+        conn.isolation_level = None  # transactions are managed explicitly
+        return conn
+
+    def _readers_active(self) -> bool:
+        pool = _pools.get(self._pool_key)
+        return pool is not None and pool.in_use > 0
+
+    def _next_batch(self, backlog: deque) -> list | None:
+        """Jobs for the next transaction (a bare job runs alone); None to stop."""
+        if backlog:
+            first = backlog.popleft()
+        else:
+            first = self._queue.get()
+            if first is None:
+                return None
+        batch = [first]
+        while first[3] and len(batch) < self.max_batch:
+            if backlog:
+                job = backlog.popleft()
+            else:
+                try:
+                    job = self._queue.get_nowait()
+                except Empty:
+                    break
+                if job is None:
+                    self._queue.put(None)  # stop once the backlog is done
+                    break
+            if not job[3]:
+                backlog.appendleft(job)
+                break
+            batch.append(job)
+        return batch
+
+    def _run(self) -> None:
+        backlog: deque = deque()  # jobs left over when a batch hit its time limit
+        while (batch := self._next_batch(backlog)) is not None:
+            started = time.perf_counter()
+            try:
+                with self._conn_lock:
+                    # (Re)connect lazily: if the file cannot be opened, this
+                    # batch fails and the next one tries again.
+                    if self._conn is None:
+                        self._conn = self._connect()
+                    if batch[0][3]:
+                        backlog.extendleft(reversed(self._commit(self._conn, batch)))
+                    else:
+                        fn, future, on_commit, _ = batch[0]
+                        try:
+                            value = fn(self._conn)
+                        except Exception as e:
+                            future.set_exception(e)
+                        else:
+                            self._resolve(on_commit, future, value)
+            except Exception as e:  # never leave a caller waiting forever
+                for job in batch:
+                    if not job[1].done():
+                        job[1].set_exception(e)
+            if (backlog or self._queue.qsize()) and self._readers_active():
+                self.pauses += 1
+                time.sleep(min(time.perf_counter() - started, self.batch_seconds))
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _resolve(self, on_commit, future: Future, value) -> None:
+        if on_commit is not None:
+            # The write is durable whatever the callback does: a failure
+            # here must not tell the caller it was not.
+            try:
+                on_commit(value)
+            except Exception:
+                log.exception("on_commit callback failed after a committed write to %s", self.path)
+        future.set_result(value)
+
+    def _commit(self, conn: sqlite3.Connection, batch: list) -> list:
+        """Run ``batch`` in one transaction; returns the jobs it had no time for."""
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                results = self._apply(conn, batch)
+                break
+            except sqlite3.OperationalError as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                if not _is_busy(e) or attempt == BUSY_RETRIES:
+                    for job in batch:
+                        job[1].set_exception(e)
+                    return []
+                self.retries += 1
+                time.sleep(min(0.01 * 2 ** attempt, 0.5))
+        self.batches += 1
+        self.jobs += len(results)
+        # Futures resolve only after COMMIT, so a caller that waits on one
+        # and then reads is guaranteed to see its own write.
+        for (_, future, on_commit, _), (ok, value) in zip(batch, results):
+            if ok:
+                self._resolve(on_commit, future, value)
+            else:
+                future.set_exception(value)
+        return batch[len(results):]
+
+    def _apply(self, conn: sqlite3.Connection, batch: list) -> list:
+        conn.execute("BEGIN IMMEDIATE")
+        # Nobody else can commit while we hold the lock: this is current.
+        self._data_version = sqlite3.Connection.execute(conn, "PRAGMA data_version").fetchone()[0]
+        deadline = time.perf_counter() + self.batch_seconds
+        results = []
+        for fn, _, _, _ in batch:
+            if results and time.perf_counter() > deadline:
+                break
+            # A savepoint per job: one failing write does not sink the batch.
+            conn.execute("SAVEPOINT job")
+            try:
+                results.append((True, fn(conn)))
+                conn.execute("RELEASE job")
+            except Exception as e:
+                if _is_busy(e):
+                    raise  # retry the whole batch
+                conn.execute("ROLLBACK TO job")
+                conn.execute("RELEASE job")
+                results.append((False, e))
+        conn.execute("COMMIT")
+        return results
+
+
+_writers: dict[str, WriteQueue] = {}
+
+
+def get_writer(path, pragmas: dict | None = None) -> WriteQueue:
+    """Return the process-wide writer thread for ``path``."""
+    key = _key(path)
+    with _pools_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = WriteQueue(key, pragmas=pragmas)
+        return writer
+
+
+def _pool_stats() -> dict:
+    return {
+        f"{Path(k).name}:{field}": getattr(p, attr)
+        for k, p in list(_pools.items())
+        for field, attr in (("open", "_opened"), ("idle", "idle_count"), ("checkouts", "checkouts"), ("waits", "waits"))
+    }
+
+
+def _writer_stats() -> dict:
+    return {
+        f"{Path(k).name}:{field}": getattr(w, field)
+        for k, w in list(_writers.items())
+        for field in ("jobs", "batches", "retries", "pauses", "queued")
+    }
+
+
+metrics.register_gauge("sqlite_pool", _pool_stats)
+metrics.register_gauge("sqlite_writer", _writer_stats)
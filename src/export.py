@@ -0,0 +1,161 @@
+import csv
+import io
+import json
+
+import forum_db
+import quiz_db
+
+# ---------- Bulk export ----------
+# Every dataset is read in keyset-ordered chunks: each chunk is one short
+# query on a pooled connection that resumes after the last key of the
+# previous one, so an export never holds a read transaction open (which
+# would pin the WAL) and memory stays at one chunk however large the table.
+# Writers consume the chunk generator and emit as they go: CSV and JSONL
+# row by row, Parquet as one row group per chunk.
+
+CHUNK_ROWS = 5000
+FORMATS = {  # format -> (file suffix, MIME type)
+    "csv": (".csv", "text/csv"),
+    "jsonl": (".jsonl", "application/x-ndjson"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+# name -> (store, FROM clause, key columns, [(column, SQL expression, type)]).
+# The key must be unique and ordered by an index (here, a primary key).
+DATASETS = {
+    "threads": ("forum", "threads t", ["t.id"], [
+        ("id", "t.id", "int"),
+        ("title", "t.title", "text"),
+        ("body", "t.body", "text"),
+        ("category", "t.category", "text"),
+        ("author", "t.author", "text"),
+        ("created_at", "t.created_at", "text"),
+        ("reply_count", "t.reply_count", "int"),
+        ("last_activity_at", "t.last_activity_at", "text"),
+    ]),
+    "posts": ("forum", "posts p", ["p.id"], [
+        ("id", "p.id", "int"),
+        ("thread_id", "p.thread_id", "int"),
+        ("author", "p.author", "text"),
+        ("body", "p.body", "text"),
+        ("created_at", "p.created_at", "text"),
+    ]),
+    "saves": ("forum", "saves s", ["s.user", "s.thread_id"], [
+        ("user", "s.user", "text"),
+        ("thread_id", "s.thread_id", "int"),
+    ]),
+    "quiz_attempts": (
+        "quiz",
+        "attempts a JOIN learners l ON l.id=a.learner_id JOIN videos v ON v.id=a.video_id",
+        ["a.learner_id", "a.video_id", "a.question_id"],
+        [
+            ("learner", "l.name", "text"),
+            ("youtube_id", "v.youtube_id", "text"),
+            ("question_id", "a.question_id", "text"),
+            ("choice", "a.choice", "text"),
+            ("correct", "a.correct", "int"),
+            ("at_seconds", "a.at_seconds", "real"),
+            ("answered_at", "a.answered_at", "text"),
+            ("revisions", "a.revisions", "int"),
+            ("received_at", "a.received_at", "text"),
+        ],
+    ),
+    "quiz_banks": (
+        "quiz",
+        "bank_questions q JOIN bank_versions b ON b.video_id=q.video_id AND b.version=q.version AND b.published=1 "
+        "JOIN videos v ON v.id=q.video_id",
+        ["q.video_id", "q.version", "q.at_seconds", "q.question"],
+        [
+            ("youtube_id", "v.youtube_id", "text"),
+            ("version", "q.version", "int"),
+            ("at_seconds", "q.at_seconds", "real"),
+            ("question", "q.question", "text"),
+            ("option_a", "q.option_a", "text"),
+            ("option_b", "q.option_b", "text"),
+            ("option_c", "q.option_c", "text"),
+            ("answer", "q.answer", "text"),
+        ],
+    ),
+}
+
+
+def columns(dataset: str) -> list[str]:
+    return [name for name, _, _ in DATASETS[dataset][3]]
+
+
+def _connect(store: str):
+    return forum_db._conn() if store == "forum" else quiz_db._conn()
+
+
+def iter_chunks(dataset: str, chunk_rows: int = CHUNK_ROWS):
+    """Yield lists of row tuples (see ``columns``) of at most ``chunk_rows`` rows."""
+    store, source, key, cols = DATASETS[dataset]
+    select = f"SELECT {', '.join(key)}, {', '.join(expr for _, expr, _ in cols)} FROM {source}"
+    order = f" ORDER BY {', '.join(key)} LIMIT ?"
+    after = f" WHERE ({', '.join(key)}) > ({', '.join('?' * len(key))})"
+    last = None
+    while True:
+        with _connect(store) as c:
+            if last is None:
+                rows = c.execute(select + order, (chunk_rows,)).fetchall()
+            else:
+                rows = c.execute(select + after + order, (*last, chunk_rows)).fetchall()
+        if not rows:
+            return
+        last = rows[-1][: len(key)]
+        yield [row[len(key):] for row in rows]
+        if len(rows) < chunk_rows:
+            return
+
+
+def _write_csv(dataset: str, chunks, out) -> None:
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+    writer = csv.writer(text)
+    writer.writerow(columns(dataset))
+    for chunk in chunks:
+        writer.writerows(chunk)
+    text.detach()  # leave ``out`` open for the caller
+
+
+def _write_jsonl(dataset: str, chunks, out) -> None:
+    names = columns(dataset)
+    for chunk in chunks:
+        out.write("".join(json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n" for row in chunk).encode("utf-8"))
+
+
+def _write_parquet(dataset: str, chunks, out) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {"int": pa.int64(), "real": pa.float64(), "text": pa.string()}
+    schema = pa.schema([(name, types[kind]) for name, _, kind in DATASETS[dataset][3]])
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)], schema=schema,
+            ))
+
+
+WRITERS = {"csv": _write_csv, "jsonl": _write_jsonl, "parquet": _write_parquet}
+
+
+def export(dataset: str, fmt: str, out, chunk_rows: int = CHUNK_ROWS) -> int:
+    """Write ``dataset`` as ``fmt`` to ``out`` (a path or binary file object); returns the row count."""
+    if dataset not in DATASETS:
+        raise ValueError(f"unknown dataset {dataset!r} (expected {', '.join(DATASETS)})")
+    if fmt not in WRITERS:
+        raise ValueError(f"unknown format {fmt!r} (expected {', '.join(WRITERS)})")
+    count = 0
+
+    def counted():
+        nonlocal count
+        for chunk in iter_chunks(dataset, chunk_rows):
+            count += len(chunk)
+            yield chunk
+
+    if isinstance(out, (str, bytes)) or hasattr(out, "__fspath__"):
+        with open(out, "wb") as fh:
+            WRITERS[fmt](dataset, counted(), fh)
+    else:
+        WRITERS[fmt](dataset, counted(), out)
+    return count
@@ -0,0 +1,976 @@
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from datetime import datetime, timedelta
+
+import metrics
+from cache import ReadCache, cached
+from db import connect, migrate
+from storage import backend_from_env
+
+# ---------- Storage ----------
+DB_PATH = Path(__file__).parent / "pages" / "forum.db"
+CATEGORIES = [
+    "Accounting",
+    "Corporate law",
+    "Public finance",
+    "Controlling",
+    "Acquisition",
+    "Education",
+    "General",
+]
+
+
+# Where connections come from (see storage.py). Swap with set_backend().
+_backend = backend_from_env(DB_PATH)
+
+
+def _conn():
+    """Borrow a pooled read connection; commits when the ``with`` block exits."""
+    return _backend.read()
+
+
+def set_backend(backend) -> None:
+    """Point every helper at ``backend`` (tests, benchmarks, replicas)."""
+    global _backend
+    _backend = backend
+    READ_CACHE.clear()
+
+
+# ---------- Read cache ----------
+# Reads below are memoized in READ_CACHE (see cache.py) and invalidated by
+# the write helpers through _invalidate(). Writes made by other processes
+# are caught by the backend's data_version(): PRAGMA data_version on the
+# writer thread's own connection (WriteQueue.data_version), which changes
+# whenever any other connection commits but never for the writer's own
+# commits, plus, for replicas, each replica's version, so rows read from
+# a replica that was still behind retire once it catches up. A change
+# retires every cached entry for that database. It is polled at most every
+# DATA_VERSION_INTERVAL seconds, so cached reads do not queue on it, and
+# its statements are not counted as page queries.
+READ_CACHE = ReadCache(maxsize=2048, ttl=60.0)
+DATA_VERSION_INTERVAL = 0.25
+_seen_versions: dict[str, int] = {}
+_checked_at: dict[str, float] = {}
+_epochs: dict[str, int] = {}
+_watch_lock = threading.Lock()
+
+
+def _cache_namespace():
+    key = _backend.key
+    now = time.monotonic()
+    if now - _checked_at.get(key, float("-inf")) < DATA_VERSION_INTERVAL:
+        return key, _epochs.get(key, 0)
+    with _watch_lock:
+        _checked_at[key] = now
+        version = _backend.data_version()
+        if _seen_versions.setdefault(key, version) != version:
+            _seen_versions[key] = version
+            _epochs[key] = _epochs.get(key, 0) + 1
+        return key, _epochs.get(key, 0)
+
+
+def _invalidate(*scopes: str) -> None:
+    """Called after a local write has committed."""
+    _backend.committed()
+    READ_CACHE.bump(*scopes)
+
+
+def _read(*scopes: str):
+    def decorate(fn):
+        return cached(READ_CACHE, *scopes, namespace=_cache_namespace)(metrics.helper(fn.__name__)(fn))
+
+    return decorate
+
+
+metrics.register_gauge("forum_read_cache", READ_CACHE.stats)
+
+
+def submit_write(fn, *scopes: str, transaction: bool = True):
+    """Queue ``fn(conn)`` on the database's single writer thread.
+
+    Returns a Future with ``fn``'s result. ``scopes`` are invalidated in
+    READ_CACHE after the batch commits and before the future resolves.
+    ``transaction=False`` is for maintenance SQLite will not run inside a
+    transaction (see WriteQueue.submit).
+    """
+    return _backend.writer().submit(fn, on_commit=lambda _: _invalidate(*scopes), transaction=transaction)
+
+
+# ---------- Schema migrations ----------
+# Each entry upgrades the schema by one version; PRAGMA user_version records
+# the last one applied, so existing forum.db files are upgraded in place and
+# every step runs exactly once. The first steps use IF NOT EXISTS because a
+# database created before versioning existed starts at version 0 with some
+# of their objects already present; later steps (ALTER TABLE ADD COLUMN,
+# DROP/CREATE TRIGGER) are not idempotent and rely on user_version alone.
+BASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  title TEXT NOT NULL,
+  body TEXT NOT NULL,
+  category TEXT,
+  author TEXT,
+  created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS posts (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  thread_id INTEGER,
+  author TEXT,
+  body TEXT,
+  created_at TEXT,
+  FOREIGN KEY(thread_id) REFERENCES threads(id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS saves (
+  user TEXT,
+  thread_id INTEGER,
+  PRIMARY KEY(user, thread_id)
+);
+"""
+
+# External-content FTS5 tables mirror threads(title, body) and posts(body);
+# triggers keep them in sync so search never scans the base tables. The
+# trailing 'rebuild' backfills rows written before the index existed.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS threads_fts USING fts5(
+  title, body, content='threads', content_rowid='id',
+  tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+  body, content='posts', content_rowid='id',
+  tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS threads_fts_ai AFTER INSERT ON threads BEGIN
+  INSERT INTO threads_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS threads_fts_ad AFTER DELETE ON threads BEGIN
+  INSERT INTO threads_fts(threads_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS threads_fts_au AFTER UPDATE OF title, body ON threads BEGIN
+  INSERT INTO threads_fts(threads_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+  INSERT INTO threads_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN
+  INSERT INTO posts_fts(rowid, body) VALUES (new.id, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN
+  INSERT INTO posts_fts(posts_fts, rowid, body) VALUES ('delete', old.id, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF body ON posts BEGIN
+  INSERT INTO posts_fts(posts_fts, rowid, body) VALUES ('delete', old.id, old.body);
+  INSERT INTO posts_fts(rowid, body) VALUES (new.id, new.body);
+END;
+INSERT INTO threads_fts(threads_fts) VALUES('rebuild');
+INSERT INTO posts_fts(posts_fts) VALUES('rebuild');
+"""
+
+# saves(user, thread_id) is already covered by the table's primary key.
+INDEX_SCHEMA = """
+CREATE INDEX IF NOT EXISTS posts_thread_id ON posts(thread_id, id);
+CREATE INDEX IF NOT EXISTS threads_category_id ON threads(category, id);
+CREATE INDEX IF NOT EXISTS threads_author_id ON threads(author, id);
+CREATE INDEX IF NOT EXISTS saves_thread_id ON saves(thread_id);
+"""
+
+# Denormalized activity counters, kept exact by triggers inside the same
+# transaction as the post write, so sorting by activity is an index scan
+# instead of an aggregate over all posts.
+ACTIVITY_SCHEMA = """
+ALTER TABLE threads ADD COLUMN reply_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE threads ADD COLUMN last_activity_at TEXT;
+UPDATE threads SET
+  reply_count = (SELECT COUNT(*) FROM posts p WHERE p.thread_id=threads.id),
+  last_activity_at = COALESCE(
+    (SELECT MAX(p.created_at) FROM posts p WHERE p.thread_id=threads.id), created_at);
+CREATE TRIGGER IF NOT EXISTS threads_activity_ai AFTER INSERT ON threads
+WHEN new.last_activity_at IS NULL BEGIN
+  UPDATE threads SET last_activity_at=new.created_at WHERE id=new.id;
+END;
+CREATE TRIGGER IF NOT EXISTS posts_activity_ai AFTER INSERT ON posts BEGIN
+  UPDATE threads SET reply_count=reply_count+1,
+    last_activity_at=MAX(COALESCE(last_activity_at, ''), new.created_at)
+  WHERE id=new.thread_id;
+END;
+CREATE TRIGGER IF NOT EXISTS posts_activity_ad AFTER DELETE ON posts BEGIN
+  UPDATE threads SET reply_count=reply_count-1,
+    last_activity_at=COALESCE(
+      (SELECT MAX(p.created_at) FROM posts p WHERE p.thread_id=old.thread_id), created_at)
+  WHERE id=old.thread_id;
+END;
+CREATE INDEX IF NOT EXISTS threads_reply_count_id ON threads(reply_count, id);
+CREATE INDEX IF NOT EXISTS threads_last_activity_id ON threads(last_activity_at, id);
+"""
+
+# List cards show a short preview, not the whole body. It is stored (and
+# kept current by triggers) so the list query never touches ``body``: the
+# column sits after ``body`` in each row, and reaching it through the table
+# would walk the overflow pages of long posts. Covering indexes hold every
+# list column for the default "Newest" order, overall and per category, so
+# that page is read from the index alone. threads_category_list starts with
+# (category, id) and replaces threads_category_id.
+PREVIEW_CHARS = 260
+_PREVIEW_SQL = f"CASE WHEN length({{0}}) > {PREVIEW_CHARS} THEN substr({{0}}, 1, {PREVIEW_CHARS}) || '…' ELSE {{0}} END"
+PREVIEW_SCHEMA = f"""
+ALTER TABLE threads ADD COLUMN preview TEXT;
+UPDATE threads SET preview = {_PREVIEW_SQL.format("body")};
+CREATE TRIGGER IF NOT EXISTS threads_preview_ai AFTER INSERT ON threads
+WHEN new.preview IS NULL BEGIN
+  UPDATE threads SET preview = {_PREVIEW_SQL.format("new.body")} WHERE id=new.id;
+END;
+CREATE TRIGGER IF NOT EXISTS threads_preview_au AFTER UPDATE OF body ON threads BEGIN
+  UPDATE threads SET preview = {_PREVIEW_SQL.format("new.body")} WHERE id=new.id;
+END;
+CREATE INDEX IF NOT EXISTS threads_list ON threads(
+  id, title, preview, category, author, created_at, reply_count, last_activity_at);
+CREATE INDEX IF NOT EXISTS threads_category_list ON threads(
+  category, id, title, preview, author, created_at, reply_count, last_activity_at);
+DROP INDEX IF EXISTS threads_category_id;
+"""
+
+
+# Change feed: triggers append one row per write that a reader might show,
+# in the writer's own transaction. ``kind`` is "thread" (created, edited or
+# deleted), "post" (reply added or removed) or "save" (``user`` saved or
+# unsaved it). Open pages remember the last id they rendered and poll for
+# newer rows (changes_since), which is a rowid seek, instead of re-running
+# their queries. Every CHANGE_LOG_PRUNE inserts the log drops all but the
+# newest CHANGE_LOG_KEEP rows.
+CHANGE_LOG_KEEP = 10000
+CHANGE_LOG_PRUNE = 1000
+CHANGES_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS forum_changes (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  kind TEXT NOT NULL,
+  thread_id INTEGER NOT NULL,
+  user TEXT
+);
+CREATE TRIGGER IF NOT EXISTS changes_thread_ai AFTER INSERT ON threads BEGIN
+  INSERT INTO forum_changes(kind, thread_id) VALUES ('thread', new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS changes_thread_au AFTER UPDATE OF title, body, category ON threads BEGIN
+  INSERT INTO forum_changes(kind, thread_id) VALUES ('thread', new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS changes_thread_ad AFTER DELETE ON threads BEGIN
+  INSERT INTO forum_changes(kind, thread_id) VALUES ('thread', old.id);
+END;
+CREATE TRIGGER IF NOT EXISTS changes_post_ai AFTER INSERT ON posts BEGIN
+  INSERT INTO forum_changes(kind, thread_id) VALUES ('post', new.thread_id);
+END;
+CREATE TRIGGER IF NOT EXISTS changes_post_ad AFTER DELETE ON posts BEGIN
+  INSERT INTO forum_changes(kind, thread_id) VALUES ('post', old.thread_id);
+END;
+CREATE TRIGGER IF NOT EXISTS changes_save_ai AFTER INSERT ON saves BEGIN
+  INSERT INTO forum_changes(kind, thread_id, user) VALUES ('save', new.thread_id, new.user);
+END;
+CREATE TRIGGER IF NOT EXISTS changes_save_ad AFTER DELETE ON saves BEGIN
+  INSERT INTO forum_changes(kind, thread_id, user) VALUES ('save', old.thread_id, old.user);
+END;
+CREATE TRIGGER IF NOT EXISTS changes_prune AFTER INSERT ON forum_changes
+WHEN new.id % {CHANGE_LOG_PRUNE} = 0 BEGIN
+  DELETE FROM forum_changes WHERE id <= new.id - {CHANGE_LOG_KEEP};
+END;
+"""
+
+
+# Retention (see below) deletes whole threads. Deleting the thread row
+# first already logs it, so the deletes of its posts and saves that follow
+# are not logged again one by one; removing a single post or save from a
+# live thread still is.
+ARCHIVE_CHANGES_SCHEMA = """
+DROP TRIGGER IF EXISTS changes_post_ad;
+DROP TRIGGER IF EXISTS changes_save_ad;
+CREATE TRIGGER changes_post_ad AFTER DELETE ON posts
+WHEN EXISTS (SELECT 1 FROM threads WHERE id=old.thread_id) BEGIN
+  INSERT INTO forum_changes(kind, thread_id) VALUES ('post', old.thread_id);
+END;
+CREATE TRIGGER changes_save_ad AFTER DELETE ON saves
+WHEN EXISTS (SELECT 1 FROM threads WHERE id=old.thread_id) BEGIN
+  INSERT INTO forum_changes(kind, thread_id, user) VALUES ('save', old.thread_id, old.user);
+END;
+"""
+
+
+# "Most active" and "Recently replied" within a category or by one author:
+# equality on the filter column, then the sort key, so such a page is an
+# index range instead of a sort of every matching thread. ANALYZE refreshes
+# the planner's statistics (bench seeds have them) to include the new
+# indexes; without that they look as selective as threads_category_list.
+FILTERED_SORT_SCHEMA = """
+CREATE INDEX IF NOT EXISTS threads_category_reply_count ON threads(category, reply_count, id);
+CREATE INDEX IF NOT EXISTS threads_category_last_activity ON threads(category, last_activity_at, id);
+CREATE INDEX IF NOT EXISTS threads_author_reply_count ON threads(author, reply_count, id);
+CREATE INDEX IF NOT EXISTS threads_author_last_activity ON threads(author, last_activity_at, id);
+ANALYZE threads;
+"""
+
+
+def make_preview(body: str) -> str:
+    """Python twin of the stored preview, for rows inserted with it filled in."""
+    return body[:PREVIEW_CHARS] + "…" if len(body) > PREVIEW_CHARS else body
+
+
+# (version, description, script, required). An optional migration that
+# fails (e.g. SQLite built without FTS5) is skipped and its feature disabled.
+MIGRATIONS = [
+    (1, "base tables", BASE_SCHEMA, True),
+    (2, "full-text search", FTS_SCHEMA, False),
+    (3, "query indexes", INDEX_SCHEMA, True),
+    (4, "thread activity counters", ACTIVITY_SCHEMA, True),
+    (5, "thread previews", PREVIEW_SCHEMA, True),
+    (6, "change feed", CHANGES_SCHEMA, True),
+    (7, "archive-aware change feed", ARCHIVE_CHANGES_SCHEMA, True),
+    (8, "filtered activity sort indexes", FILTERED_SORT_SCHEMA, True),
+]
+
+
+@metrics.helper("init_db")
+def init_db():
+    with _backend.write() as c:
+        migrate(c, MIGRATIONS)
+
+
+def explain(sql: str, params=()) -> list[str]:
+    """``EXPLAIN QUERY PLAN`` detail lines for ``sql``."""
+    with _conn() as c:
+        return [row[-1] for row in c.execute("EXPLAIN QUERY PLAN " + sql, tuple(params))]
+
+
+def query_plan_checks() -> dict:
+    """Hot query shapes as ``name -> (sql, params, may_sort, must_seek)``.
+
+    Thread lists come from the same builder the pages use, for every sort
+    order and filter, on the first page and on a later (keyset) page.
+    ``must_seek`` is set where an index range exists for the whole WHERE
+    clause (filters, cursors): walking an index and filtering is a problem
+    there too. ``may_sort`` marks saved lists in activity order: they sort
+    one user's saves, a better plan than walking every thread by activity.
+    Searches are left out: they are driven by the FTS index, not a list index.
+    """
+    checks = {
+        "list_posts": ("SELECT id, author, body, created_at FROM posts WHERE thread_id=? AND id>? ORDER BY id ASC LIMIT ?", (1, 0, 20), False, True),
+        "post_count": ("SELECT COUNT(*) FROM posts WHERE thread_id=?", (1,), False, True),
+    }
+    filters = {"all": {}, "category": {"category": "General"}, "author": {"author": "u"}, "saved": {"saved_by": "u"}}
+    for sort, order in SORT_ORDERS.items():
+        for name, filter_args in filters.items():
+            for page, cursor in (("first page", None), ("next page", (1,) * len(order))):
+                sql, params, _, _ = _thread_query(
+                    f"{LIST_COLUMNS}, {THREAD_STATE_COLUMNS}", [""], limit=26, cursor=cursor,
+                    with_key=True, sort=sort, **filter_args,
+                )
+                checks[f"{sort} / {name} / {page}"] = (
+                    sql, params, name == "saved" and sort != "Newest", name != "all" or cursor is not None,
+                )
+    return checks
+
+
+def plan_problems(plan: list[str], may_sort: bool = False, must_seek: bool = False) -> list[str]:
+    """Plan lines that mean a full scan (of the table, or with ``must_seek``
+    of any index) or, unless ``may_sort``, a sort."""
+    return [
+        line for line in plan
+        if (line.startswith("SCAN") and (must_seek or "USING" not in line) and "VIRTUAL TABLE" not in line)
+        or (line.startswith("USE TEMP B-TREE") and not may_sort)
+    ]
+
+
+def verify_query_plans() -> list[str]:
+    """Check that the hot query shapes read an index range, not a scan or sort.
+
+    Returns a list of human-readable problems; empty means every plan is OK.
+    """
+    problems = []
+    for name, (sql, params, may_sort, must_seek) in query_plan_checks().items():
+        bad = plan_problems(explain(sql, params), may_sort, must_seek)
+        if bad:
+            problems.append(f"{name}: {'; '.join(bad)}")
+    return problems
+
+
+# ---------- Full-text search ----------
+# "Best match" lists and search_threads: each FTS table is ranked on its own and only its best SEARCH_TOP hits are
+# merged, so a common word costs two bounded top-n queries, not a join and
+# GROUP BY over every matching post. bm25() has to be computed for every row
+# it orders, so ranking is further limited to the newest SEARCH_WINDOW
+# matches of each table: for a word found in most posts, "best match" means
+# best among recent posts. The best hit per thread wins; bm25() is lower for
+# better matches, so MIN() picks it and SQLite fills the bare ``src`` /
+# ``src_id`` columns (0 = thread text, 1 = reply) from that same row. Title
+# matches weigh 10x body text.
+SEARCH_WINDOW = 2000
+SEARCH_TOP = 500
+SEARCH_HITS = f"""
+SELECT thread_id, MIN(score) AS score, src, src_id FROM (
+  SELECT h.id AS thread_id, h.score, 0 AS src, h.id AS src_id FROM (
+    SELECT id, score FROM (
+      SELECT rowid AS id, rank AS score FROM threads_fts
+      WHERE threads_fts MATCH ? AND rank MATCH 'bm25(10.0, 1.0)'
+      ORDER BY rowid DESC LIMIT {SEARCH_WINDOW}
+    ) ORDER BY score LIMIT {SEARCH_TOP}
+  ) h
+  UNION ALL
+  SELECT p.thread_id, h.score, 1 AS src, h.id AS src_id FROM (
+    SELECT id, score FROM (
+      SELECT rowid AS id, rank AS score FROM posts_fts WHERE posts_fts MATCH ?
+      ORDER BY rowid DESC LIMIT {SEARCH_WINDOW}
+    ) ORDER BY score LIMIT {SEARCH_TOP}
+  ) h JOIN posts p ON p.id=h.id
+) GROUP BY thread_id
+"""
+# Lists sorted by date or activity need every matching thread, not the best
+# ranked recent ones, or older matches would drop out. Without bm25() a hit
+# is just a doclist rowid, but a word found in most posts still costs a
+# posts lookup per hit (~130 ms for 94% of 100k posts, <1 ms for rare
+# words). The snippet comes from the thread text when it matches, else
+# from a reply (MIN() picks the row).
+SEARCH_MATCHES = """
+SELECT thread_id, MIN(src) AS src, src_id FROM (
+  SELECT rowid AS thread_id, 0 AS src, rowid AS src_id FROM threads_fts WHERE threads_fts MATCH ?
+  UNION ALL
+  SELECT p.thread_id, 1 AS src, p.id AS src_id FROM posts_fts f JOIN posts p ON p.id=f.rowid
+  WHERE posts_fts MATCH ?
+) GROUP BY thread_id
+"""
+# snippet() is by far the most expensive part of a search, so it is only
+# computed for the rows of the page being returned, in one statement that
+# reads each FTS table it needs once. Looking rows up by rowid would re-read
+# the term's whole doclist for each one; instead each table does one pass
+# over the page's rowid range and ``+rowid IN`` (not usable as an index
+# constraint) keeps the page's rows.
+SNIPPET_SQL = (
+    "SELECT 0, rowid, snippet(threads_fts, -1, '<mark>', '</mark>', '…', 24) FROM threads_fts "
+    "WHERE threads_fts MATCH ? AND rowid BETWEEN ? AND ? AND +rowid IN ({})",
+    "SELECT 1, rowid, snippet(posts_fts, 0, '<mark>', '</mark>', '…', 24) FROM posts_fts "
+    "WHERE posts_fts MATCH ? AND rowid BETWEEN ? AND ? AND +rowid IN ({})",
+)
+
+
+def _attach_snippets(c, match: str, rows: list) -> list:
+    """Replace the trailing ``(src, src_id)`` of each row with its snippet."""
+    snippets = ({}, {})
+    for row in rows:
+        snippets[row[-2]][row[-1]] = None
+    arms, params = [], []
+    for sql, found in zip(SNIPPET_SQL, snippets):
+        if found:
+            arms.append(sql.format(",".join("?" * len(found))))
+            params += [match, min(found), max(found), *found]
+    if arms:
+        for src, rowid, snippet in c.execute(" UNION ALL ".join(arms), params).fetchall():
+            snippets[src][rowid] = snippet
+    return [row[:-2] + (snippets[row[-2]][row[-1]],) for row in rows]
+
+_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+MIN_PREFIX = 2  # matches the smallest prefix index
+
+
+def fts_query(text: str) -> str:
+    """Turn search-box input into a safe FTS5 MATCH expression.
+
+    ``"quoted text"`` is kept as a phrase, every other word is matched as a
+    prefix so results update while the user is still typing. Single
+    characters match whole words only: the index keeps 2- and 3-character
+    prefixes, and a 1-character prefix would read most of it. Terms are
+    ANDed together; FTS5 operators typed by the user are treated as words.
+    """
+    terms = []
+    for phrase, word in _TOKEN.findall(text or ""):
+        if phrase.strip():
+            terms.append('"' + phrase.strip().replace('"', '""') + '"')
+        elif word:
+            terms.append('"' + word.replace('"', '""') + ('"*' if len(word) >= MIN_PREFIX else '"'))
+    return " ".join(terms)
+
+
+_fts_ready: dict[str, bool] = {}
+
+
+def _fts_enabled() -> bool:
+    key = _backend.key
+    if key not in _fts_ready:
+        with _conn() as c:
+            _fts_ready[key] = c.execute(
+                "SELECT 1 FROM sqlite_master WHERE name='threads_fts'"
+            ).fetchone() is not None
+    return _fts_ready[key]
+
+
+@_read("threads")
+def search_threads(text: str, limit: int = 100):
+    """Ranked ``(id, title, category, author, created_at, snippet)`` rows."""
+    match = fts_query(text)
+    if not match:
+        return []
+    with _conn() as c:
+        rows = c.execute(
+            "SELECT t.id, t.title, t.category, t.author, t.created_at, h.src, h.src_id "
+            f"FROM ({SEARCH_HITS}) h JOIN threads t ON t.id=h.thread_id "
+            "ORDER BY h.score, t.id DESC LIMIT ?",
+            (match, match, limit),
+        ).fetchall()
+        return _attach_snippets(c, match, rows)
+
+
+# ---------- Queries ----------
+
+@metrics.helper("create_thread")
+def create_thread(title: str, body: str, category: str, author: str) -> int:
+    ts = datetime.now().isoformat(timespec="seconds")
+    return submit_write(
+        lambda c: c.execute(
+            "INSERT INTO threads (title, body, preview, category, author, created_at) VALUES (?,?,?,?,?,?)",
+            (title, body, make_preview(body), category, author, ts),
+        ).lastrowid,
+        "threads",
+    ).result()
+
+
+@metrics.helper("add_post")
+def add_post(thread_id: int, body: str, author: str) -> None:
+    ts = datetime.now().isoformat(timespec="seconds")
+    submit_write(
+        lambda c: c.execute(
+            "INSERT INTO posts (thread_id, author, body, created_at) VALUES (?,?,?,?)",
+            (thread_id, author, body, ts),
+        ),
+        "threads", f"thread:{thread_id}",
+    ).result()
+
+
+@_read("thread:{thread_id}")
+def get_thread(thread_id: int):
+    with _conn() as c:
+        return c.execute(
+            "SELECT id, title, body, category, author, created_at FROM threads WHERE id=?",
+            (thread_id,),
+        ).fetchone()
+
+
+@_read("thread:{thread_id}")
+def list_posts(thread_id: int, after_id: int | None = None, limit: int | None = None):
+    """Responses oldest first; page with ``after_id`` (last id shown) and ``limit``."""
+    with _conn() as c:
+        return c.execute(
+            "SELECT id, author, body, created_at FROM posts WHERE thread_id=? AND id>? "
+            "ORDER BY id ASC LIMIT ?",
+            (thread_id, after_id or 0, -1 if limit is None else limit),
+        ).fetchall()
+
+
+@_read("thread:{thread_id}")
+def post_count(thread_id: int) -> int:
+    with _conn() as c:
+        row = c.execute(
+            "SELECT reply_count FROM threads WHERE id=?",
+            (thread_id,),
+        ).fetchone()
+    return row[0] if row else 0
+
+
+@_read("saves:{user}")
+def is_saved(user: str, thread_id: int) -> bool:
+    if not user:
+        return False
+    with _conn() as c:
+        return (
+            c.execute(
+                "SELECT 1 FROM saves WHERE user=? AND thread_id=?",
+                (user, thread_id),
+            ).fetchone()
+            is not None
+        )
+
+
+def _toggle(c, user: str, thread_id: int) -> bool:
+    # Delete-or-insert on the writer's connection: no read-then-write race,
+    # the DELETE's row count tells us which way the toggle went.
+    if c.execute("DELETE FROM saves WHERE user=? AND thread_id=?", (user, thread_id)).rowcount:
+        return False
+    c.execute("INSERT INTO saves (user, thread_id) VALUES (?,?)", (user, thread_id))
+    return True
+
+
+@metrics.helper("toggle_save")
+def toggle_save(user: str, thread_id: int) -> bool:
+    return submit_write(lambda c: _toggle(c, user, thread_id), f"saves:{user}").result()
+
+
+# ---------- Change feed ----------
+
+def latest_change() -> int:
+    """Id of the newest change-log row (0 for none); a page's version stamp."""
+    with _conn() as c:
+        return c.execute("SELECT COALESCE(MAX(id), 0) FROM forum_changes").fetchone()[0]
+
+
+@metrics.helper("changes_since")
+def changes_since(after_id: int, limit: int = 500):
+    """``(latest_id, rows)`` for changes newer than ``after_id``.
+
+    Rows are ``(kind, thread_id, user)``, oldest first. ``rows`` is ``None``
+    when they cannot be listed (more than ``limit``, or already pruned);
+    the caller should then assume everything changed.
+    """
+    with _conn() as c:
+        rows = c.execute(
+            "SELECT id, kind, thread_id, user FROM forum_changes WHERE id>? ORDER BY id LIMIT ?",
+            (after_id, limit + 1),
+        ).fetchall()
+    if not rows:
+        return after_id, []
+    latest = rows[-1][0]
+    if len(rows) > limit or rows[0][0] != after_id + 1:
+        return latest if len(rows) <= limit else latest_change(), None
+    return latest, [r[1:] for r in rows]
+
+
+THREAD_COLUMNS = "t.id, t.title, t.body, t.category, t.author, t.created_at"
+# What list views need: the stored preview instead of the full body.
+LIST_COLUMNS = "t.id, t.title, t.preview, t.category, t.author, t.created_at"
+# Per-thread state for list/detail views, computed in the same statement so a
+# page of threads is one round trip instead of one query per card.
+THREAD_STATE_COLUMNS = (
+    "EXISTS(SELECT 1 FROM saves sv WHERE sv.user=? AND sv.thread_id=t.id), "
+    "t.reply_count, t.last_activity_at"
+)
+# List sort orders as keyset keys; "Best match" applies only when searching.
+SORT_ORDERS = {
+    "Newest": [("t.id", "DESC")],
+    "Most active": [("t.reply_count", "DESC"), ("t.id", "DESC")],
+    "Recently replied": [("t.last_activity_at", "DESC"), ("t.id", "DESC")],
+}
+RELEVANCE = "Best match"
+
+
+def _keyset(order: list[tuple[str, str]], cursor) -> tuple[str, list]:
+    """WHERE clause selecting rows strictly after ``cursor`` in ``order``.
+
+    ``order`` is a list of ``(expression, "ASC"|"DESC")``; ``cursor`` holds
+    the sort-key values of the last row already shown. Seeking on the key
+    keeps every page an index range scan, unlike OFFSET. When every key
+    sorts the same way this is a row-value comparison, which SQLite turns
+    into a range on a matching index; mixed directions need the OR form.
+    """
+    directions = {direction for _, direction in order}
+    if len(directions) == 1:
+        op = ">" if directions == {"ASC"} else "<"
+        exprs = ", ".join(expr for expr, _ in order)
+        return f"(({exprs}) {op} ({', '.join('?' * len(order))}))", list(cursor)
+    clauses, params = [], []
+    for i, (expr, direction) in enumerate(order):
+        op = ">" if direction == "ASC" else "<"
+        parts = [f"{e}=?" for e, _ in order[:i]] + [f"{expr}{op}?"]
+        clauses.append("(" + " AND ".join(parts) + ")")
+        params += list(cursor[:i]) + [cursor[i]]
+    return "(" + " OR ".join(clauses) + ")", params
+
+
+def _thread_query(columns: str, params: list, search: str = "", category: str | None = None, author: str | None = None, saved_by: str | None = None, limit: int = 100, snippet: bool = False, cursor=None, with_key: bool = False, sort: str | None = None):
+    """``(sql, params, order, match)`` for ``_select_threads`` (and the plan checks)."""
+    match = fts_query(search) if search else ""
+    use_fts = bool(match) and _fts_enabled()
+    columns += ", h.src, h.src_id" if snippet and use_fts else ", NULL" if snippet else ""
+    ranked = use_fts and sort in (None, RELEVANCE)
+    if ranked:
+        order = [("h.score", "ASC"), ("t.id", "DESC")]
+    else:
+        order = SORT_ORDERS.get(sort, SORT_ORDERS["Newest"])
+    if saved_by:
+        # The same id, but read in order from saves' (user, thread_id) key.
+        order = [("s.thread_id" if e == "t.id" else e, d) for e, d in order]
+    if with_key:
+        # Sort-key values ride along at the end of each row for next_cursor.
+        columns += ", " + ", ".join(expr for expr, _ in order)
+    sql = f"SELECT {columns} FROM threads t"
+    params = list(params)
+    if saved_by:
+        sql += " JOIN saves s ON t.id=s.thread_id AND s.user=?"
+        params.append(saved_by)
+    where = []
+    if use_fts:
+        sql += f" JOIN ({SEARCH_HITS if ranked else SEARCH_MATCHES}) h ON h.thread_id=t.id"
+        params += [match, match]
+    elif search:
+        where.append("(t.title LIKE ? OR t.body LIKE ?)")
+        params += [f"%{search}%", f"%{search}%"]
+    if category and category != "All":
+        where.append("t.category=?")
+        params.append(category)
+    if author:
+        where.append("t.author=?")
+        params.append(author)
+    if cursor:
+        clause, cursor_params = _keyset(order, cursor)
+        where.append(clause)
+        params += cursor_params
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY " + ", ".join(f"{e} {d}" for e, d in order) + " LIMIT ?"
+    params.append(limit)
+    return sql, params, order, match if use_fts else ""
+
+
+def _select_threads(columns: str, params: list, search: str = "", category: str | None = None, author: str | None = None, saved_by: str | None = None, limit: int = 100, snippet: bool = False, cursor=None, with_key: bool = False, sort: str | None = None):
+    sql, params, order, match = _thread_query(
+        columns, params, search, category, author, saved_by, limit, snippet, cursor, with_key, sort,
+    )
+    with _conn() as c:
+        rows = c.execute(sql, tuple(params)).fetchall()
+        keys = []
+        if with_key:
+            width = len(order)
+            rows, keys = [r[:-width] for r in rows], [r[-width:] for r in rows]
+        if snippet and match:
+            rows = _attach_snippets(c, match, rows)
+    return (rows, keys) if with_key else rows
+
+
+@_read("threads", "saves:{saved_by}")
+def query_threads(search: str = "", category: str | None = None, author: str | None = None, saved_by: str | None = None, limit: int = 100, before_id: int | None = None, sort: str | None = None):
+    """``(id, title, preview, category, author, created_at)`` rows.
+
+    Pass the last id seen as ``before_id`` for the next page.
+
+    ``sort`` is a key of ``SORT_ORDERS`` (default newest first, or best match
+    when searching). Ranked and activity-sorted results are paged with
+    ``query_thread_page`` instead.
+    """
+    paged_by_id = not fts_query(search) and sort in (None, "Newest")
+    cursor = (before_id,) if before_id and paged_by_id else None
+    return _select_threads(LIST_COLUMNS, [], search, category, author, saved_by, limit, cursor=cursor, sort=sort)
+
+
+@_read("threads", "saves:{user}", "saves:{saved_by}")
+def query_thread_list(user: str | None, search: str = "", category: str | None = None, author: str | None = None, saved_by: str | None = None, limit: int = 100, sort: str | None = None):
+    """Threads plus ``user``'s state in one query.
+
+    Rows are ``(id, title, preview, category, author, created_at, saved,
+    reply_count, last_activity_at, snippet)``. With a search term, rows are
+    ranked by relevance and ``snippet`` holds the highlighted match.
+    """
+    return _select_threads(
+        f"{LIST_COLUMNS}, {THREAD_STATE_COLUMNS}", [user or ""],
+        search, category, author, saved_by, limit, snippet=True, sort=sort,
+    )
+
+
+@_read("threads", "saves:{user}", "saves:{saved_by}")
+def query_thread_page(user: str | None, search: str = "", category: str | None = None, author: str | None = None, saved_by: str | None = None, limit: int = 25, cursor=None, sort: str | None = None):
+    """One page of ``query_thread_list`` rows plus the cursor for the next page.
+
+    ``cursor`` is the opaque value returned by the previous call (``None``
+    for the first page). The returned cursor is ``None`` on the last page.
+    """
+    rows, keys = _select_threads(
+        f"{LIST_COLUMNS}, {THREAD_STATE_COLUMNS}", [user or ""],
+        search, category, author, saved_by, limit + 1, snippet=True,
+        cursor=cursor, with_key=True, sort=sort,
+    )
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], tuple(keys[limit - 1])
+
+
+@_read("thread:{thread_id}", "saves:{user}")
+def get_thread_view(thread_id: int, user: str | None):
+    """Single-thread counterpart of ``query_thread_list`` for the detail view."""
+    with _conn() as c:
+        return c.execute(
+            f"SELECT {THREAD_COLUMNS}, {THREAD_STATE_COLUMNS} FROM threads t WHERE t.id=?",
+            (user or "", thread_id),
+        ).fetchone()
+
+
+# ---------- Retention ----------
+# Threads without activity for FORUM_RETENTION_DAYS (default 365) move, with
+# their posts and saves, into a separate archive database, so forum.db and
+# its page cache hold just the live forum. Each batch is copied into the
+# archive on its own connection and committed there first; then one job on
+# the writer queue deletes from forum.db the threads that are still idle,
+# as any other write would (a reply in between keeps a thread live, and so
+# does a save the copy missed). Copies of threads that stayed live are
+# dropped from the archive again. An interrupted run leaves rows in both
+# files, never in neither, and the next run copies them again. Deleting
+# fires the usual triggers (search index, change feed).
+#
+# Freed pages go back to the file system through PRAGMA incremental_vacuum,
+# which needs auto_vacuum=INCREMENTAL. New files get it from db.PRAGMAS; an
+# existing file is switched once by enable_incremental_vacuum(), a full
+# VACUUM that holds off writers while it runs.
+RETENTION_DAYS = int(os.environ.get("FORUM_RETENTION_DAYS") or 365)
+ARCHIVE_BATCH = 200  # threads per writer job
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+  id INTEGER PRIMARY KEY,
+  title TEXT NOT NULL,
+  body TEXT NOT NULL,
+  category TEXT,
+  author TEXT,
+  created_at TEXT,
+  reply_count INTEGER NOT NULL DEFAULT 0,
+  last_activity_at TEXT,
+  archived_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS posts (
+  id INTEGER PRIMARY KEY,
+  thread_id INTEGER,
+  author TEXT,
+  body TEXT,
+  created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS posts_thread_id ON posts(thread_id, id);
+CREATE TABLE IF NOT EXISTS saves (
+  user TEXT,
+  thread_id INTEGER,
+  PRIMARY KEY(user, thread_id)
+);
+"""
+
+
+def archive_path() -> Path:
+    """FORUM_ARCHIVE_PATH, else forum_archive.db next to the forum file."""
+    if os.environ.get("FORUM_ARCHIVE_PATH"):
+        return Path(os.environ["FORUM_ARCHIVE_PATH"])
+    base = DB_PATH if _backend.kind == "memory" else Path(_backend.key)
+    return base.with_name("forum_archive.db")
+
+
+def _copy_batch(c, archive, ids: list, archived_at: str) -> set:
+    """Copy threads ``ids`` with their posts and saves; returns the saves copied."""
+    marks = ",".join("?" * len(ids))
+    threads = c.execute(
+        "SELECT id, title, body, category, author, created_at, reply_count, last_activity_at, ? "
+        f"FROM threads WHERE id IN ({marks})",
+        (archived_at, *ids),
+    ).fetchall()
+    posts = c.execute(f"SELECT id, thread_id, author, body, created_at FROM posts WHERE thread_id IN ({marks})", ids).fetchall()
+    saves = c.execute(f"SELECT user, thread_id FROM saves WHERE thread_id IN ({marks})", ids).fetchall()
+    with archive:
+        archive.executemany("INSERT OR REPLACE INTO threads VALUES (?,?,?,?,?,?,?,?,?)", threads)
+        archive.executemany("INSERT OR REPLACE INTO posts VALUES (?,?,?,?,?)", posts)
+        archive.executemany("INSERT OR REPLACE INTO saves VALUES (?,?)", saves)
+    return set(saves)
+
+
+def _delete_batch(c, ids: list, cutoff: str, copied: set) -> tuple[list, dict]:
+    """Writer job: delete the threads of ``ids`` that are still idle and fully copied."""
+    marks = ",".join("?" * len(ids))
+    idle = {row[0] for row in c.execute(
+        f"SELECT id FROM threads WHERE id IN ({marks}) AND last_activity_at < ?", (*ids, cutoff),
+    )}
+    idle -= {
+        thread_id
+        for user, thread_id in c.execute(f"SELECT user, thread_id FROM saves WHERE thread_id IN ({marks})", ids)
+        if (user, thread_id) not in copied
+    }
+    moved = {"threads": 0, "posts": 0, "saves": 0}
+    if idle:
+        gone = sorted(idle)
+        marks = ",".join("?" * len(gone))
+        moved["threads"] = c.execute(f"DELETE FROM threads WHERE id IN ({marks})", gone).rowcount
+        moved["posts"] = c.execute(f"DELETE FROM posts WHERE thread_id IN ({marks})", gone).rowcount
+        moved["saves"] = c.execute(f"DELETE FROM saves WHERE thread_id IN ({marks})", gone).rowcount
+    return sorted(idle), moved
+
+
+@metrics.helper("archive_inactive")
+def archive_inactive(days: int = RETENTION_DAYS, archive=None, batch: int = ARCHIVE_BATCH, dry_run: bool = False) -> dict:
+    """Move threads idle for more than ``days`` into the archive database.
+
+    Returns the ``cutoff`` timestamp, the ``archive`` path and how many
+    ``threads``, ``posts`` and ``saves`` moved (with ``dry_run``: would move).
+    ``archive`` defaults to archive_path().
+    """
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat(timespec="seconds")
+    archive = Path(archive or archive_path())
+    report = {"cutoff": cutoff, "archive": str(archive), "threads": 0, "posts": 0, "saves": 0}
+    if dry_run:
+        with _conn() as c:
+            report["threads"], report["posts"] = c.execute(
+                "SELECT COUNT(*), COALESCE(SUM(reply_count), 0) FROM threads WHERE last_activity_at < ?", (cutoff,)
+            ).fetchone()
+            report["saves"] = c.execute(
+                "SELECT COUNT(*) FROM saves WHERE thread_id IN (SELECT id FROM threads WHERE last_activity_at < ?)",
+                (cutoff,),
+            ).fetchone()[0]
+        return report
+    archived_at = datetime.now().isoformat(timespec="seconds")
+    dst = connect(archive)
+    try:
+        dst.executescript(ARCHIVE_SCHEMA)
+        after = ("", 0)  # keyset over (last_activity_at, id): skipped threads are not picked again
+        while True:
+            # Candidates and copies come from the primary, never a lagging replica.
+            with _backend.write() as c:
+                due = c.execute(
+                    "SELECT id, last_activity_at FROM threads WHERE last_activity_at < ? "
+                    "AND (last_activity_at, id) > (?, ?) ORDER BY last_activity_at, id LIMIT ?",
+                    (cutoff, *after, batch),
+                ).fetchall()
+                if not due:
+                    break
+                after = (due[-1][1], due[-1][0])
+                ids = [row[0] for row in due]
+                copied = _copy_batch(c, dst, ids, archived_at)
+            # Readers see each batch leave as soon as it commits.
+            scopes = ["threads", *(f"thread:{i}" for i in ids), *{f"saves:{user}" for user, _ in copied}]
+            gone, moved = submit_write(lambda c: _delete_batch(c, ids, cutoff, copied), *scopes).result()
+            for name, count in moved.items():
+                report[name] += count
+            kept = sorted(set(ids) - set(gone))
+            if kept:
+                marks = ",".join("?" * len(kept))
+                with dst:
+                    for table, column in (("threads", "id"), ("posts", "thread_id"), ("saves", "thread_id")):
+                        dst.execute(f"DELETE FROM {table} WHERE {column} IN ({marks})", kept)
+    finally:
+        dst.close()
+    return report
+
+
+def _vacuum(c, pages: int | None) -> dict:
+    mode = c.execute("PRAGMA auto_vacuum").fetchone()[0]
+    before = c.execute("PRAGMA freelist_count").fetchone()[0]
+    if mode == 2:
+        # executescript steps the pragma to completion; execute() would
+        # stop after the first page. With WAL the file shrinks at the
+        # next checkpoint, so run one.
+        c.executescript(f"PRAGMA incremental_vacuum({int(pages or 0)}); PRAGMA wal_checkpoint(PASSIVE);")
+    after = c.execute("PRAGMA freelist_count").fetchone()[0]
+    page_size = c.execute("PRAGMA page_size").fetchone()[0]
+    return {
+        "auto_vacuum": ("none", "full", "incremental")[mode],
+        "free_pages_before": before,
+        "free_pages_after": after,
+        "bytes_released": (before - after) * page_size,
+    }
+
+
+@metrics.helper("incremental_vacuum")
+def incremental_vacuum(pages: int | None = None) -> dict:
+    """Return up to ``pages`` free pages (default: all) to the file system.
+
+    A no-op unless the file uses auto_vacuum=INCREMENTAL; the report says
+    which mode it is in and how many pages were free before and after.
+    Runs on the writer thread, between write batches.
+    """
+    return submit_write(lambda c: _vacuum(c, pages), transaction=False).result()
+
+
+def _enable_incremental_vacuum(c) -> bool:
+    if c.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+    c.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    c.execute("VACUUM")
+    return True
+
+
+def enable_incremental_vacuum() -> bool:
+    """Switch an existing file to auto_vacuum=INCREMENTAL; False if it already is.
+
+    Rewrites the whole file (VACUUM) on the writer thread, so every write
+    queues behind it: run it during a quiet period.
+    """
+    return submit_write(_enable_incremental_vacuum, transaction=False).result()
@@ -0,0 +1,66 @@
+import argparse
+import json
+import sys
+
+import export
+import forum_db
+from bootstrap import bootstrap
+
+# ---------- Maintenance CLI ----------
+# Run from src/ against the same stores the app uses (FORUM_DB_PATH,
+# QUIZ_DB_PATH, FORUM_ARCHIVE_PATH and FORUM_RETENTION_DAYS apply):
+#   python -m maintenance export posts --format parquet --out posts.parquet
+#   python -m maintenance archive --days 365 --dry-run
+#   python -m maintenance vacuum --enable
+
+
+def cmd_export(args) -> None:
+    out = sys.stdout.buffer if args.out == "-" else args.out
+    rows = export.export(args.dataset, args.format, out, args.chunk_rows)
+    print(f"{rows} rows", file=sys.stderr)
+
+
+def cmd_archive(args) -> None:
+    report = forum_db.archive_inactive(args.days, args.archive, args.batch, args.dry_run)
+    if args.vacuum and not args.dry_run:
+        report["vacuum"] = forum_db.incremental_vacuum()
+    print(json.dumps(report, indent=2))
+
+
+def cmd_vacuum(args) -> None:
+    report = {"converted": forum_db.enable_incremental_vacuum()} if args.enable else {}
+    report.update(forum_db.incremental_vacuum(args.pages))
+    print(json.dumps(report, indent=2))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m maintenance", description="Export and retention for the forum and quiz stores.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export", help="stream a dataset to CSV, JSONL or Parquet")
+    p.add_argument("dataset", choices=list(export.DATASETS))
+    p.add_argument("--format", choices=list(export.WRITERS), default="csv")
+    p.add_argument("--out", default="-", help="output file ('-' for stdout)")
+    p.add_argument("--chunk-rows", type=int, default=export.CHUNK_ROWS)
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("archive", help="move inactive threads into the archive database")
+    p.add_argument("--days", type=int, default=forum_db.RETENTION_DAYS, help="archive threads idle longer than this")
+    p.add_argument("--archive", help="archive database file (default: FORUM_ARCHIVE_PATH or forum_archive.db)")
+    p.add_argument("--batch", type=int, default=forum_db.ARCHIVE_BATCH, help="threads per transaction")
+    p.add_argument("--dry-run", action="store_true", help="only count what would move")
+    p.add_argument("--vacuum", action="store_true", help="run incremental vacuum afterwards")
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser("vacuum", help="return free pages of forum.db to the file system")
+    p.add_argument("--pages", type=int, help="at most this many pages (default: all)")
+    p.add_argument("--enable", action="store_true", help="first switch the file to auto_vacuum=INCREMENTAL (full VACUUM)")
+    p.set_defaults(func=cmd_vacuum)
+
+    args = parser.parse_args(argv)
+    bootstrap()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
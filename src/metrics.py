@@ -0,0 +1,243 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+# ---------- Instrumentation ----------
+# Process-wide counters for SQL statements (keyed by the helper that issued
+# them and a normalized SQL shape), page reruns and connection usage, plus a
+# slow-query log. Everything is in memory; snapshot() / prometheus_text()
+# export it and the admin page renders it.
+#
+# Environment knobs:
+#   FORUM_METRICS=0          disable statement timing
+#   SLOW_QUERY_MS=200        slow-query threshold in milliseconds
+#   SLOW_QUERY_LOG=path      also append slow queries to this file (JSON lines)
+#   METRICS_EXPORT_PATH=path write a snapshot here after reruns (.prom => text)
+#   METRICS_EXPORT_EVERY=10  minimum seconds between exported snapshots
+
+ENABLED = os.environ.get("FORUM_METRICS", "1") != "0"
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.environ.get("SLOW_QUERY_LOG")
+EXPORT_PATH = os.environ.get("METRICS_EXPORT_PATH")
+EXPORT_EVERY = float(os.environ.get("METRICS_EXPORT_EVERY", "10"))
+
+log = logging.getLogger("metrics.slow_query")
+
+_lock = threading.Lock()
+_queries: dict[tuple[str, str], dict] = {}
+_pages: dict[str, dict] = {}
+_slow: deque = deque(maxlen=200)
+_gauges: dict[str, callable] = {}
+_last_export = 0.0
+
+current_helper: contextvars.ContextVar[str] = contextvars.ContextVar("current_helper", default="-")
+# Mutable per-rerun counter: [statements]; None outside a timed page run.
+_rerun_queries: contextvars.ContextVar[list | None] = contextvars.ContextVar("rerun_queries", default=None)
+
+_WS = re.compile(r"\s+")
+_PLACEHOLDERS = re.compile(r"\?(?:\s*,\s*\?)+")
+_NUMBERS = re.compile(r"\b\d+\b")
+
+
+def sql_shape(sql: str) -> str:
+    """Collapse whitespace, placeholder lists and literals so similar SQL groups."""
+    shape = _WS.sub(" ", sql).strip()
+    shape = _PLACEHOLDERS.sub("?…", shape)
+    shape = _NUMBERS.sub("N", shape)
+    return shape[:240]
+
+
+def _new_stat() -> dict:
+    return {"count": 0, "seconds": 0.0, "max": 0.0, "rows": 0}
+
+
+def _add(stat: dict, seconds: float, rows: int = 0) -> None:
+    stat["count"] += 1
+    stat["seconds"] += seconds
+    stat["rows"] += rows
+    if seconds > stat["max"]:
+        stat["max"] = seconds
+
+
+def record_query(sql: str, seconds: float, rows: int) -> None:
+    helper = current_helper.get()
+    shape = sql_shape(sql)
+    with _lock:
+        _add(_queries.setdefault((helper, shape), _new_stat()), seconds, rows)
+    counter = _rerun_queries.get()
+    if counter is not None:
+        counter[0] += 1
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        entry = {
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "helper": helper,
+            "ms": round(seconds * 1000, 2),
+            "rows": rows,
+            "sql": shape,
+        }
+        _slow.append(entry)
+        log.warning("slow query %.1f ms in %s: %s", entry["ms"], helper, shape)
+        if SLOW_QUERY_LOG:
+            try:
+                with open(SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError:
+                pass
+
+
+def helper(name: str):
+    """Attribute statements run inside the decorated function to ``name``."""
+
+    def decorate(fn):
+        def wrapper(*args, **kwargs):
+            token = current_helper.set(name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                current_helper.reset(token)
+
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        wrapper.__wrapped__ = fn
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def page_run(page: str):
+    """Time one rerun of ``page`` and count the statements it issued.
+
+    Runs may nest (a fragment inside a full page rerun); statements counted
+    by the inner run are added to the enclosing one as well.
+    """
+    counter = [0]
+    outer = _rerun_queries.get()
+    token = _rerun_queries.set(counter)
+    start = time.perf_counter()
+    try:
+        yield counter
+    finally:
+        seconds = time.perf_counter() - start
+        _rerun_queries.reset(token)
+        if outer is not None:
+            outer[0] += counter[0]
+        with _lock:
+            _add(_pages.setdefault(page, _new_stat()), seconds, counter[0])
+        maybe_export()
+
+
+def page_region(name: str):
+    """Decorator: time each call of a page region (e.g. an ``st.fragment``) as ``name``.
+
+    Fragment reruns skip the main script, so they are not covered by the
+    ``page_run`` around ``pg.run()``; this records them on their own.
+    """
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with page_run(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def register_gauge(name: str, fn) -> None:
+    """``fn()`` returns ``{label_value: number}`` or a number; read at export time."""
+    _gauges[name] = fn
+
+
+def reset() -> None:
+    with _lock:
+        _queries.clear()
+        _pages.clear()
+        _slow.clear()
+
+
+# ---------- Export ----------
+
+def snapshot() -> dict:
+    with _lock:
+        queries = [
+            {"helper": h, "sql": s, **{k: round(v, 6) if isinstance(v, float) else v for k, v in stat.items()}}
+            for (h, s), stat in _queries.items()
+        ]
+        pages = [
+            {"page": p, "reruns": stat["count"], "seconds": round(stat["seconds"], 6),
+             "max": round(stat["max"], 6), "queries": stat["rows"]}
+            for p, stat in _pages.items()
+        ]
+        slow = list(_slow)
+    gauges = {}
+    for name, fn in list(_gauges.items()):
+        try:
+            gauges[name] = fn()
+        except Exception:
+            continue
+    queries.sort(key=lambda q: q["seconds"], reverse=True)
+    return {"at": time.strftime("%Y-%m-%dT%H:%M:%S"), "queries": queries, "pages": pages, "slow_queries": slow, "gauges": gauges}
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def prometheus_text(snap: dict | None = None) -> str:
+    snap = snap or snapshot()
+    lines = [
+        "# TYPE forum_query_seconds summary",
+    ]
+    for q in snap["queries"]:
+        labels = f'helper="{_label(q["helper"])}",sql="{_label(q["sql"])}"'
+        lines.append(f"forum_query_seconds_sum{{{labels}}} {q['seconds']}")
+        lines.append(f"forum_query_seconds_count{{{labels}}} {q['count']}")
+        lines.append(f"forum_query_seconds_max{{{labels}}} {q['max']}")
+        lines.append(f"forum_query_rows_total{{{labels}}} {q['rows']}")
+    lines.append("# TYPE forum_page_rerun_seconds summary")
+    for p in snap["pages"]:
+        labels = f'page="{_label(p["page"])}"'
+        lines.append(f"forum_page_rerun_seconds_sum{{{labels}}} {p['seconds']}")
+        lines.append(f"forum_page_rerun_seconds_count{{{labels}}} {p['reruns']}")
+        lines.append(f"forum_page_rerun_seconds_max{{{labels}}} {p['max']}")
+        lines.append(f"forum_page_rerun_queries_total{{{labels}}} {p['queries']}")
+    for name, value in snap["gauges"].items():
+        lines.append(f"# TYPE {name} gauge")
+        if isinstance(value, dict):
+            for key, v in value.items():
+                lines.append(f'{name}{{key="{_label(key)}"}} {v}')
+        else:
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_snapshot(path) -> Path:
+    """Write a snapshot to ``path``: Prometheus text for ``.prom``, else JSON."""
+    path = Path(path)
+    snap = snapshot()
+    text = prometheus_text(snap) if path.suffix == ".prom" else json.dumps(snap, indent=2)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    tmp.replace(path)
+    return path
+
+
+def maybe_export() -> None:
+    global _last_export
+    if not EXPORT_PATH or time.monotonic() - _last_export < EXPORT_EVERY:
+        return
+    _last_export = time.monotonic()
+    try:
+        write_snapshot(EXPORT_PATH)
+    except OSError as e:
+        log.warning("metrics export to %s failed: %s", EXPORT_PATH, e)
@@ -0,0 +1,141 @@
+import json
+import os
+import tempfile
+
+import pandas as pd
+import streamlit as st
+
+import export
+import forum_db
+import metrics
+from bootstrap import bootstrap
+
+st.set_page_config(page_title="Metrics", page_icon="📈", layout="wide")
+bootstrap()
+
+
+def admin_enabled() -> bool:
+    """Export and retention need FORUM_ADMIN=1 or ``admin = true`` in secrets.toml."""
+    if os.environ.get("FORUM_ADMIN") == "1":
+        return True
+    try:
+        return bool(st.secrets.get("admin", False))
+    except FileNotFoundError:  # no secrets.toml at all
+        return False
+
+
+def _discard_export() -> None:
+    previous = st.session_state.pop("export_file", None)
+    if previous and os.path.exists(previous[0]):
+        os.remove(previous[0])
+
+
+st.title("📈 Metrics")
+st.caption("Query latency, page reruns and connection usage for this server process.")
+
+snap = metrics.snapshot()
+
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.download_button("Download JSON", json.dumps(snap, indent=2), file_name="metrics.json", mime="application/json")
+with col2:
+    st.download_button("Download Prometheus", metrics.prometheus_text(snap), file_name="metrics.prom", mime="text/plain")
+with col3:
+    if metrics.EXPORT_PATH and st.button("Write snapshot now"):
+        st.toast(f"Wrote {metrics.write_snapshot(metrics.EXPORT_PATH)}")
+with col4:
+    if st.button("Reset counters"):
+        metrics.reset()
+        st.rerun()
+
+st.markdown("### Page reruns")
+if snap["pages"]:
+    pages = pd.DataFrame(snap["pages"])
+    pages["avg_ms"] = pages["seconds"] / pages["reruns"] * 1000
+    pages["queries_per_rerun"] = pages["queries"] / pages["reruns"]
+    pages["max_ms"] = pages["max"] * 1000
+    st.dataframe(pages[["page", "reruns", "avg_ms", "max_ms", "queries_per_rerun"]], width="stretch", hide_index=True)
+else:
+    st.info("No page reruns recorded yet.")
+
+st.markdown("### Queries by helper and SQL shape")
+if snap["queries"]:
+    queries = pd.DataFrame(snap["queries"])
+    queries["avg_ms"] = queries["seconds"] / queries["count"] * 1000
+    queries["max_ms"] = queries["max"] * 1000
+    queries["total_ms"] = queries["seconds"] * 1000
+    st.dataframe(queries[["helper", "count", "total_ms", "avg_ms", "max_ms", "rows", "sql"]], width="stretch", hide_index=True)
+else:
+    st.info("No queries recorded yet." if metrics.ENABLED else "Statement timing is disabled (FORUM_METRICS=0).")
+
+st.markdown(f"### Slow queries (≥ {metrics.SLOW_QUERY_MS:g} ms)")
+if snap["slow_queries"]:
+    st.dataframe(pd.DataFrame(snap["slow_queries"][::-1]), width="stretch", hide_index=True)
+else:
+    st.caption("None so far.")
+
+st.markdown("### Connections and caches")
+st.json(snap["gauges"])
+
+# Export reads every row and retention deletes them: anyone who can open
+# this page could otherwise do both, so they stay off unless configured.
+if not admin_enabled():
+    st.stop()
+
+st.markdown("### Export")
+# The export streams into a temp file, so building it takes one chunk of
+# memory; Streamlit then serves the finished file. For very large tables
+# use the CLI instead: python -m maintenance export <dataset> --out <file>.
+# Files live in a per-session temp directory, removed with the session; a
+# file is also deleted once downloaded or replaced by the next export.
+
+col1, col2, col3 = st.columns([2, 1, 1], vertical_alignment="bottom")
+with col1:
+    dataset = st.selectbox("Dataset", list(export.DATASETS), key="export_dataset")
+with col2:
+    fmt = st.selectbox("Format", list(export.FORMATS), key="export_format")
+with col3:
+    prepare = st.button("Prepare export")
+if prepare:
+    _discard_export()
+    if "export_dir" not in st.session_state:
+        st.session_state["export_dir"] = tempfile.TemporaryDirectory(prefix="forum-export-")
+    with tempfile.NamedTemporaryFile(
+        dir=st.session_state["export_dir"].name, prefix=f"{dataset}-", suffix=export.FORMATS[fmt][0], delete=False,
+    ) as fh:
+        rows = export.export(dataset, fmt, fh)
+    st.session_state["export_file"] = (fh.name, dataset, fmt, rows)
+ready = st.session_state.get("export_file")
+if ready and os.path.exists(ready[0]):
+    path, ready_dataset, ready_fmt, rows = ready
+    suffix, mime = export.FORMATS[ready_fmt]
+    with open(path, "rb") as fh:
+        st.download_button(
+            f"Download {ready_dataset}{suffix} ({rows} rows, {os.path.getsize(path) / 1e6:.1f} MB)",
+            fh, file_name=f"{ready_dataset}{suffix}", mime=mime, on_click=_discard_export,
+        )
+
+st.markdown("### Retention")
+st.caption(f"Inactive threads move, with their posts and saves, to {forum_db.archive_path()}.")
+col1, col2, col3 = st.columns([2, 1, 1], vertical_alignment="bottom")
+with col1:
+    days = st.number_input("Archive threads idle for more than (days)", min_value=1, value=forum_db.RETENTION_DAYS, step=30)
+# Counting what is due scans threads and saves, so it runs on request, not
+# on every rerun of this page; a count for another number of days is stale.
+with col2:
+    if st.button("Count due threads"):
+        st.session_state["retention_due"] = (days, forum_db.archive_inactive(days, dry_run=True))
+counted_days, due = st.session_state.get("retention_due", (None, None))
+if counted_days != days:
+    due = None
+with col3:
+    if st.button(f"Archive {due['threads']} threads" if due else "Archive", disabled=not (due and due["threads"])):
+        report = forum_db.archive_inactive(days)
+        report["vacuum"] = forum_db.incremental_vacuum()
+        st.session_state["retention_report"] = report
+        st.session_state.pop("retention_due", None)
+        st.rerun()
+if due:
+    st.caption(f"{due['posts']} posts and {due['saves']} saves with them; last activity before {due['cutoff']}.")
+if "retention_report" in st.session_state:
+    st.json(st.session_state["retention_report"])
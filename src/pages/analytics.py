@@ -0,0 +1,59 @@
+import streamlit as st
+
+from bootstrap import bootstrap
+from quiz_analytics import choice_table, dropoff_table, progress_table, question_table
+from quiz_db import (
+    list_choice_stats,
+    list_learner_progress,
+    list_question_stats,
+    list_quiz_videos,
+)
+
+st.set_page_config(page_title="Quiz Analytics", page_icon="📊", layout="wide")
+bootstrap()
+
+st.title("📊 Quiz Analytics")
+st.caption("Aggregated from stored quiz attempts; figures are maintained as answers arrive.")
+
+videos = list_quiz_videos()
+if not videos:
+    st.info("No quiz attempts recorded yet. Answers from the video quiz page show up here.")
+    st.stop()
+
+labels = {vid: f"{vid} · {learners} learners · {answers} answers" for vid, learners, answers in videos}
+video_id = st.selectbox("Video", list(labels), format_func=labels.get)
+
+questions = question_table(list_question_stats(video_id))
+learners = progress_table(list_learner_progress(video_id), total_questions=len(questions))
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Learners", len(learners))
+col2.metric("Answers", int(questions["answers"].sum()))
+col3.metric("Accuracy", f"{questions['correct'].sum() / max(questions['answers'].sum(), 1):.0%}")
+
+st.markdown("### Per-question accuracy")
+st.dataframe(
+    questions,
+    width="stretch",
+    hide_index=True,
+    column_config={"accuracy": st.column_config.ProgressColumn("accuracy", format="percent", min_value=0, max_value=1)},
+)
+
+st.markdown("### Choice distribution")
+st.dataframe(choice_table(list_choice_stats(video_id), order=questions["question_id"]).style.format("{:.0%}"), width="stretch")
+
+st.markdown("### Drop-off by timestamp")
+dropoff = dropoff_table(questions)
+st.line_chart(dropoff.set_index("question_id")["reached"])
+st.dataframe(dropoff, width="stretch", hide_index=True)
+
+st.markdown("### Learner progress")
+st.dataframe(
+    learners,
+    width="stretch",
+    hide_index=True,
+    column_config={
+        "completion": st.column_config.ProgressColumn("completion", format="percent", min_value=0, max_value=1),
+        "accuracy": st.column_config.ProgressColumn("accuracy", format="percent", min_value=0, max_value=1),
+    },
+)
@@ -1,160 +1,24 @@
 import streamlit as st
-import sqlite3
-from pathlib import Path
-from datetime import datetime
-
-# ---------- Storage ----------
-DB_PATH = Path(__file__).with_name("forum.db")
-CATEGORIES = [
-    "Accounting",
-    "Corporate law",
-    "Public finance",
-    "Controlling",
-    "Acquisition",
-    "Education",
-    "General",
-]
-
-
-def _conn():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
-
-
-def init_db():
-    with _conn() as c:
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS threads (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              title TEXT NOT NULL,
-              body TEXT NOT NULL,
-              category TEXT,
-              author TEXT,
-              created_at TEXT
-            )
-            """
-        )
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS posts (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              thread_id INTEGER,
-              author TEXT,
-              body TEXT,
-              created_at TEXT,
-              FOREIGN KEY(thread_id) REFERENCES threads(id) ON DELETE CASCADE
-            )
-            """
-        )
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS saves (
-              user TEXT,
-              thread_id INTEGER,
-              PRIMARY KEY(user, thread_id)
-            )
-            """
-        )
-
-
-init_db()
-
-# ---------- Queries ----------
-
-def create_thread(title: str, body: str, category: str, author: str) -> int:
-    ts = datetime.now().isoformat(timespec="seconds")
-    with _conn() as c:
-        cur = c.execute(
-            "INSERT INTO threads (title, body, category, author, created_at) VALUES (?,?,?,?,?)",
-            (title, body, category, author, ts),
-        )
-        return cur.lastrowid
-
-
-def add_post(thread_id: int, body: str, author: str) -> None:
-    ts = datetime.now().isoformat(timespec="seconds")
-    with _conn() as c:
-        c.execute(
-            "INSERT INTO posts (thread_id, author, body, created_at) VALUES (?,?,?,?)",
-            (thread_id, author, body, ts),
-        )
-
-
-def get_thread(thread_id: int):
-    with _conn() as c:
-        return c.execute(
-            "SELECT id, title, body, category, author, created_at FROM threads WHERE id=?",
-            (thread_id,),
-        ).fetchone()
-
-
-def list_posts(thread_id: int):
-    with _conn() as c:
-        return c.execute(
-            "SELECT id, author, body, created_at FROM posts WHERE thread_id=? ORDER BY id ASC",
-            (thread_id,),
-        ).fetchall()
-
-
-def post_count(thread_id: int) -> int:
-    with _conn() as c:
-        return c.execute(
-            "SELECT COUNT(*) FROM posts WHERE thread_id=?",
-            (thread_id,),
-        ).fetchone()[0]
-
-
-def is_saved(user: str, thread_id: int) -> bool:
-    if not user:
-        return False
-    with _conn() as c:
-        return (
-            c.execute(
-                "SELECT 1 FROM saves WHERE user=? AND thread_id=?",
-                (user, thread_id),
-            ).fetchone()
-            is not None
-        )
-
-
-def toggle_save(user: str, thread_id: int) -> bool:
-    with _conn() as c:
-        if is_saved(user, thread_id):
-            c.execute("DELETE FROM saves WHERE user=? AND thread_id=?", (user, thread_id))
-            return False
-        else:
-            c.execute("INSERT INTO saves (user, thread_id) VALUES (?,?)", (user, thread_id))
-            return True
 
+import metrics
+from bootstrap import bootstrap
+from forum_db import (
+    CATEGORIES,
+    RELEVANCE,
+    SORT_ORDERS,
+    add_post,
+    changes_since,
+    create_thread,
+    get_thread_view,
+    latest_change,
+    list_posts,
+    post_count,
+    query_thread_page,
+    toggle_save,
+)
+from thread_list import thread_list_view
 
-def query_threads(search: str = "", category: str | None = None, author: str | None = None, saved_by: str | None = None, limit: int = 100):
-    base = (
-        "SELECT id, title, body, category, author, created_at FROM threads"
-    )
-    params: list = []
-    if saved_by:
-        base = (
-            "SELECT t.id, t.title, t.body, t.category, t.author, t.created_at "
-            "FROM threads t JOIN saves s ON t.id=s.thread_id AND s.user=?"
-        )
-        params.append(saved_by)
-    where = []
-    if search:
-        where.append("(title LIKE ? OR body LIKE ?)")
-        params += [f"%{search}%", f"%{search}%"]
-    if category and category != "All":
-        where.append("category=?")
-        params.append(category)
-    if author:
-        where.append("author=?")
-        params.append(author)
-    sql = base
-    if where:
-        sql += " WHERE " + " AND ".join(where)
-    sql += " ORDER BY id DESC LIMIT ?"
-    params.append(limit)
-    with _conn() as c:
-        return c.execute(sql, tuple(params)).fetchall()
+bootstrap()
 
 
 # ---------- UI ----------
@@ -170,111 +34,254 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-st.title("💬 Community Forum")
-st.caption("Create threads, discuss, and keep learning together.")
-# User identity
-with st.expander("User settings", expanded=not bool(st.session_state.get("user"))):
-    user = st.text_input("Your display name", value=st.session_state.get("user", ""), placeholder="e.g., Elisabeth May")
-    if user:
-        st.session_state["user"] = user
+THREADS_PER_PAGE = 100  # rendered by the virtualized list, see thread_list/
+POSTS_PER_PAGE = 20
+LIVE_REFRESH_SECONDS = 5
 
-# 顶部栏：视图、分类筛选、新建线程
-col_top1, col_top2 = st.columns([1, 1])
-with col_top1:
-    view = st.radio("View", ["Home", "Your threads", "Saved"], index=0, horizontal=True)
-with col_top2:
-    selected_category = st.selectbox("Category filter", ["All"] + CATEGORIES)
 
-st.markdown("### Create a new thread")
-with st.form("new_thread"):
-    nt_title = st.text_input("Title")
-    nt_cat = st.selectbox("Category", CATEGORIES, index=0)
-    nt_body = st.text_area("Body", height=160)
-    create_submit = st.form_submit_button("Post")
-if create_submit:
-    if not st.session_state.get("user"):
-        st.warning("Set your display name first.")
-    elif nt_title.strip() and nt_body.strip():
-        tid = create_thread(nt_title.strip(), nt_body.strip(), nt_cat, st.session_state["user"])
-        st.success("Thread created.")
-        st.session_state["view_thread_id"] = tid
-        st.experimental_rerun()
-    else:
-        st.warning("Title and body are required.")
-search = st.text_input("Type to search", value=st.session_state.get("search", ""), placeholder="Search threads…")
-st.session_state["search"] = search
+# ---------- Paging ----------
+# Each pager keeps a stack of keyset cursors in session state: the last
+# entry is the cursor of the page on screen, so Previous just pops it.
+def page_cursor(name: str, signature):
+    """Cursor for the current page of ``name``; resets when ``signature`` changes."""
+    if st.session_state.get(f"{name}_sig") != signature:
+        st.session_state[f"{name}_sig"] = signature
+        st.session_state[f"{name}_pages"] = [None]
+    return st.session_state[f"{name}_pages"][-1]
 
-# Thread detail view
-if st.session_state.get("view_thread_id"):
-    tid = st.session_state.get("view_thread_id")
-    t = get_thread(tid)
-    if not t:
-        st.session_state["view_thread_id"] = None
-        st.experimental_rerun()
-    if st.button("← Back to all threads"):
-        st.session_state["view_thread_id"] = None
-        st.experimental_rerun()
-    st.markdown(f"<div class='card'><h3>{t[1]}</h3><p class='small'>{t[4]} • {t[5]} • {t[3]}</p><p>{t[2]}</p></div>", unsafe_allow_html=True)
 
-    cols = st.columns(3)
+def page_controls(name: str, next_cursor, label: str = "page"):
+    pages = st.session_state[f"{name}_pages"]
+    cols = st.columns([0.2, 0.6, 0.2])
     with cols[0]:
-        label = "Unsave" if is_saved(st.session_state.get("user"), tid) else "Save"
-        if st.button(label, key=f"save_{tid}"):
-            if st.session_state.get("user"):
-                flag = toggle_save(st.session_state["user"], tid)
-                st.toast("Saved" if flag else "Removed from saved")
-                st.experimental_rerun()
-            else:
-                st.warning("Set your display name to save threads.")
+        st.button(f"← Previous {label}", key=f"{name}_prev", disabled=len(pages) < 2, on_click=pages.pop)
     with cols[1]:
-        st.write(f"Responses: {post_count(tid)}")
+        st.caption(f"Page {len(pages)}")
+    with cols[2]:
+        st.button(f"Next {label} →", key=f"{name}_next", disabled=next_cursor is None, on_click=pages.append, args=(next_cursor,))
 
-    st.divider()
-    st.subheader("Responses")
-    for p in list_posts(tid):
+
+# ---------- Fragments ----------
+# Each region below reruns on its own: clicking Save, paging, searching or
+# replying re-executes only that function, not the whole page. Only moves
+# between the list and a thread (Open, Back, new thread) rerun the app.
+# page_region() records every region run on the Admin page as "forum/<name>".
+# Callbacks run before the fragment and must not draw elements themselves;
+# they leave a notice for the fragment body to show.
+def _notify(message: str):
+    st.session_state["forum_notice"] = message
+
+
+def _show_notice():
+    message = st.session_state.pop("forum_notice", None)
+    if message:
+        st.toast(message)
+
+
+def _toggle_saved(tid: int):
+    if st.session_state.get("user"):
+        st.session_state[f"saved_{tid}"] = toggle_save(st.session_state["user"], tid)
+        _notify("Saved" if st.session_state[f"saved_{tid}"] else "Removed from saved")
+    else:
+        _notify("Set your display name to save threads.")
+
+
+@st.fragment
+@metrics.page_region("forum/save_button")
+def save_button(tid: int, key: str):
+    """Save/Unsave toggle. The caller seeds ``saved_<tid>`` from fresh data."""
+    _show_notice()
+    label = "Unsave" if st.session_state.get(f"saved_{tid}") else "Save"
+    st.button(label, key=key, on_click=_toggle_saved, args=(tid,))
+
+
+@st.fragment
+@metrics.page_region("forum/new_thread")
+def new_thread_form():
+    st.markdown("### Create a new thread")
+    with st.form("new_thread"):
+        nt_title = st.text_input("Title")
+        nt_cat = st.selectbox("Category", CATEGORIES, index=0)
+        nt_body = st.text_area("Body", height=160)
+        create_submit = st.form_submit_button("Post")
+    if create_submit:
+        if not st.session_state.get("user"):
+            st.warning("Set your display name first.")
+        elif nt_title.strip() and nt_body.strip():
+            tid = create_thread(nt_title.strip(), nt_body.strip(), nt_cat, st.session_state["user"])
+            st.toast("Thread created.")
+            st.session_state["view_thread_id"] = tid
+            st.rerun()
+        else:
+            st.warning("Title and body are required.")
+
+
+def _add_reply(tid: int):
+    reply = st.session_state.get(f"reply_text_{tid}", "").strip()
+    if not st.session_state.get("user"):
+        _notify("Set your display name first.")
+    elif reply:
+        add_post(tid, reply, st.session_state["user"])
+        st.session_state[f"reply_text_{tid}"] = ""
+        _notify("Response added.")
+    else:
+        _notify("Response cannot be empty.")
+
+
+@st.fragment
+@metrics.page_region("forum/responses")
+def thread_responses(tid: int):
+    _show_notice()
+    st.subheader(f"Responses ({post_count(tid)})")
+    after_id = page_cursor("posts", tid)
+    posts = list_posts(tid, after_id=after_id, limit=POSTS_PER_PAGE + 1)
+    next_post = posts[POSTS_PER_PAGE - 1][0] if len(posts) > POSTS_PER_PAGE else None
+    for p in posts[:POSTS_PER_PAGE]:
         st.markdown(
             f"<div class='card'><b>{p[1]}</b> · <span class='small'>{p[3]}</span><br>{p[2]}</div>",
             unsafe_allow_html=True,
         )
+    if after_id or next_post:
+        page_controls("posts", next_post, "responses")
     with st.form(f"reply_{tid}"):
-        reply = st.text_area("Add a response", height=140)
-        rsub = st.form_submit_button("Add Response")
-    if rsub:
-        if not st.session_state.get("user"):
-            st.warning("Set your display name first.")
-        elif reply.strip():
-            add_post(tid, reply.strip(), st.session_state["user"])
-            st.success("Response added.")
-            st.experimental_rerun()
+        st.text_area("Add a response", height=140, key=f"reply_text_{tid}")
+        st.form_submit_button("Add Response", on_click=_add_reply, args=(tid,))
+
+
+# ---------- Live updates ----------
+# Opt-in. Each view takes the newest change-log id before reading (so a
+# write made meanwhile is not missed) and records what it shows. The
+# live_updates() fragment reruns on a timer but only asks for changes past
+# that id, and reruns the page, whose cached reads are then refetched only
+# where something changed, when one of those changes concerns the view.
+# An idle tab costs one indexed lookup per poll.
+def _live_version():
+    return latest_change() if st.session_state.get("forum_live") else None
+
+
+def _stamp_view(seen, thread_ids, new_threads: bool = False, any_activity: bool = False):
+    """Remember what the view shows: thread ids on screen, whether new
+    threads would appear in it, and whether any reply or save could reorder it."""
+    if seen is not None:
+        st.session_state["live_seen"] = seen
+        st.session_state["live_watch"] = (frozenset(thread_ids), new_threads, any_activity)
+
+
+def _affects_view(changes, watch, user) -> bool:
+    thread_ids, new_threads, any_activity = watch
+    for kind, tid, by in changes:
+        shown = tid in thread_ids or any_activity
+        if kind == "thread" and (shown or new_threads):
+            return True
+        if kind == "post" and shown:
+            return True
+        if kind == "save" and by == user and shown:
+            return True
+    return False
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+@metrics.page_region("forum/live")
+def live_updates():
+    st.caption(f"● Live — checking for new activity every {LIVE_REFRESH_SECONDS}s")
+    seen, watch = st.session_state.get("live_seen"), st.session_state.get("live_watch")
+    if seen is None or watch is None:
+        return
+    latest, changes = changes_since(seen)
+    if latest == seen:
+        return
+    st.session_state["live_seen"] = latest
+    if changes is None or _affects_view(changes, watch, st.session_state.get("user")):
+        st.rerun()
+
+
+def thread_detail(tid: int):
+    _stamp_view(_live_version(), [tid])
+    t = get_thread_view(tid, st.session_state.get("user"))
+    if not t:
+        st.session_state["view_thread_id"] = None
+        st.rerun()
+    if st.button("← Back to all threads"):
+        st.session_state["view_thread_id"] = None
+        st.rerun()
+    st.markdown(f"<div class='card'><h3>{t[1]}</h3><p class='small'>{t[4]} • {t[5]} • {t[3]}</p><p>{t[2]}</p></div>", unsafe_allow_html=True)
+    st.session_state[f"saved_{tid}"] = bool(t[6])
+    save_button(tid, key=f"save_{tid}")
+    st.divider()
+    thread_responses(tid)
+
+
+@st.fragment
+@metrics.page_region("forum/thread_list")
+def thread_list(view: str, selected_category: str):
+    # The component's last click is in session state before it is drawn, so
+    # act on it first and render the list with the result already applied.
+    event = st.session_state.get("thread_list_event")
+    if event and event.get("nonce") != st.session_state.get("thread_list_nonce"):
+        st.session_state["thread_list_nonce"] = event["nonce"]
+        if event["action"] == "open":
+            st.session_state["view_thread_id"] = event["id"]
+            st.rerun()
+        elif st.session_state.get("user"):
+            flag = toggle_save(st.session_state["user"], event["id"])
+            st.toast("Saved" if flag else "Removed from saved")
         else:
-            st.warning("Response cannot be empty.")
-else:
-    # Thread list
+            st.toast("Set your display name to save threads.")
+
+    search = st.text_input("Type to search", value=st.session_state.get("search", ""), placeholder="Search threads and replies… (use \"quotes\" for phrases)")
+    st.session_state["search"] = search
+
     author = st.session_state.get("user") if view == "Your threads" else None
     saved_by = st.session_state.get("user") if view == "Saved" else None
     if view in ("Your threads", "Saved") and not st.session_state.get("user"):
         st.info("Set your display name to use this view.")
 
-    threads = query_threads(search=search.strip(), category=selected_category, author=author, saved_by=saved_by)
+    sort_options = ([RELEVANCE] if search.strip() else []) + list(SORT_ORDERS)
+    sort = st.selectbox("Sort by", sort_options, key=f"sort_{bool(search.strip())}")
+    filters = dict(search=search.strip(), category=selected_category, author=author, saved_by=saved_by, sort=sort)
+    cursor = page_cursor("threads", tuple(filters.values()))
+    seen = _live_version()
+    threads, next_cursor = query_thread_page(st.session_state.get("user"), limit=THREADS_PER_PAGE, cursor=cursor, **filters)
+    # Newest-first pages only change with their own threads (and new ones
+    # on page 1); searches, activity sorts and Saved can change with any write.
+    reorders = sort != "Newest" or bool(filters["search"]) or bool(saved_by)
+    _stamp_view(seen, [t[0] for t in threads], new_threads=cursor is None, any_activity=reorders)
     if not threads:
-        st.info("No threads yet. Use the form on the left to create one.")
-    for t in threads:
-        tid, title, body, cat, author, created = t
-        preview = body[:260] + ("…" if len(body) > 260 else "")
-        st.markdown(
-            f"<div class='card'><h4>{title}</h4><p class='small'>{author} • {created} • {cat}</p><p>{preview}</p></div>",
-            unsafe_allow_html=True,
-        )
-        cols = st.columns([0.15, 0.15, 0.7])
-        with cols[0]:
-            if st.button("Open", key=f"open_{tid}"):
-                st.session_state["view_thread_id"] = tid
-                st.experimental_rerun()
-        with cols[1]:
-            label = "Unsave" if is_saved(st.session_state.get("user"), tid) else "Save"
-            if st.button(label, key=f"savebtn_{tid}"):
-                if st.session_state.get("user"):
-                    toggle_save(st.session_state["user"], tid)
-                    st.experimental_rerun()
-                else:
-                    st.warning("Set your display name to save threads.")
\ No newline at end of file
+        st.info("No threads yet. Use the form above to create one.")
+    else:
+        rows = [
+            [tid, title, f"{author} • {created} • {cat} • {replies} responses • last activity {last_activity}",
+             snippet or preview, bool(saved)]
+            for tid, title, preview, cat, author, created, saved, replies, last_activity, snippet in threads
+        ]
+        thread_list_view(rows, key="thread_list_event")
+    if cursor or next_cursor:
+        page_controls("threads", next_cursor)
+
+
+st.title("💬 Community Forum")
+st.caption("Create threads, discuss, and keep learning together.")
+# User identity
+with st.expander("User settings", expanded=not bool(st.session_state.get("user"))):
+    user = st.text_input("Your display name", value=st.session_state.get("user", ""), placeholder="e.g., Elisabeth May")
+    if user:
+        st.session_state["user"] = user
+
+# 顶部栏：视图、分类筛选、新建线程
+col_top1, col_top2, col_top3 = st.columns([1, 1, 0.4])
+with col_top1:
+    view = st.radio("View", ["Home", "Your threads", "Saved"], index=0, horizontal=True)
+with col_top2:
+    selected_category = st.selectbox("Category filter", ["All"] + CATEGORIES)
+with col_top3:
+    st.toggle("Live updates", key="forum_live", help="Refresh this view when someone posts, replies or saves.")
+
+new_thread_form()
+
+if st.session_state.get("view_thread_id"):
+    thread_detail(st.session_state["view_thread_id"])
+else:
+    thread_list(view, selected_category)
+
+if st.session_state.get("forum_live"):
+    live_updates()
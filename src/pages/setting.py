@@ -1,16 +1,20 @@
-import re
-import json
 import streamlit as st
-import streamlit.components.v1 as components
-from streamlit_js_eval import streamlit_js_eval, set_cookie, get_cookie
 import pandas as pd
 
+from bootstrap import bootstrap
+from player import OPTION_COLUMNS, extract_video_id
+from quiz_bank import import_bank, load_bank, read_chunks
+from quiz_db import list_bank_versions
+
+bootstrap()
+
 # 设置页面配置：标题为“YouTube currentTime”，图标为▶️，布局居中，侧边栏初始状态为折叠，不显示菜单项
 
 
 video_url = st.text_input("Paste YouTube link:", "https://www.youtube.com/watch?v=4dCrkp8qgLU")
 st.session_state["video_url"] = video_url
 st.video(video_url)
+video_id = extract_video_id(video_url)
 
 st.markdown('<h2>Questions</h2>', unsafe_allow_html=True)
 
@@ -22,27 +26,73 @@ checkpoints = [
     {"Time": "0:55", "Time": "0:55","Question":" Is this feature useful?", "choices": ["Very Useful", "Slightly Useful", "Not Useful"], "answer": "Very Useful"},
 ]
 
-# 将检查点数据转换为DataFrame
-data_rows = []
-for idx, cp in enumerate(checkpoints):
-    row = {
-        "Time": cp["Time"],
-        "Question": cp["Question"],
-        "Option A": cp["choices"][0] if len(cp["choices"]) > 0 else "",
-        "Option B": cp["choices"][1] if len(cp["choices"]) > 1 else "",
-        "Option C": cp["choices"][2] if len(cp["choices"]) > 2 else "",
-        "Correct Answer": cp["answer"]
-    }
-    data_rows.append(row)
-df = pd.DataFrame(data_rows)
+
+
+def default_table() -> pd.DataFrame:
+    # 将检查点数据转换为DataFrame（按列构建，不逐行拼接）
+    cps = pd.DataFrame(checkpoints)
+    options = pd.DataFrame(cps["choices"].tolist()).reindex(columns=range(len(OPTION_COLUMNS))).fillna("")
+    options.columns = OPTION_COLUMNS
+    return pd.concat([cps[["Time", "Question"]], options, cps["answer"].rename("Correct Answer")], axis=1)
+
+
+def show_report(report: dict):
+    """Outcome of an import or save (see quiz_bank.import_bank)."""
+    if report["version"]:
+        st.success(f"Saved {report['questions']} questions as version {report['version']}.")
+    else:
+        st.error("Nothing was saved: no row passed validation.")
+    cols = st.columns(4)
+    cols[0].metric("Rows read", report["rows"])
+    cols[1].metric("Rejected", report["rejected"])
+    cols[2].metric("Duplicates merged", report["duplicates"])
+    cols[3].metric("Out of order (sorted)", report["out_of_order"])
+    if len(report["issues"]):
+        st.dataframe(report["issues"], width="stretch", hide_index=True)
+
+
+# 题库按视频保存，每次保存/导入产生一个新版本
+versions = list_bank_versions(video_id)
+if versions:
+    labels = {v: f"v{v} · {n} questions · {created} · {source or 'editor'}" for v, created, source, n in versions}
+    version = st.selectbox("Question bank version", list(labels), format_func=labels.get)
+    _, df = load_bank(video_id, version)
+else:
+    version = None
+    st.caption("No saved question bank for this video yet; starting from the example questions.")
+    df = default_table()
+
+with st.expander("Import questions from CSV or Parquet"):
+    st.caption(
+        "Columns: Time, Question, Option A, Option B, Option C, Correct Answer. "
+        "Time may be seconds, m:ss or h:mm:ss, with fractions (1:02.5). "
+        "Rows are sorted by time; a repeated time and question keeps the last row."
+    )
+    upload = st.file_uploader("Question file", type=["csv", "parquet"])
+    if upload is not None and st.button("Import as new version"):
+        try:
+            report = import_bank(video_id, read_chunks(upload, upload.name), source=upload.name)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.session_state["bank_report"] = report
+            if report["version"]:
+                _, st.session_state["quiz_table"] = load_bank(video_id, report["version"])
+            st.rerun()  # the version list now has the import at the top
+
+if "bank_report" in st.session_state:
+    show_report(st.session_state.pop("bank_report"))
 
 # 使用streamlit的data_editor让用户可编辑，并允许动态添加行
-edited_df = st.data_editor(df, num_rows="dynamic", width="stretch")
+edited_df = st.data_editor(df, num_rows="dynamic", width="stretch", key=f"quiz_editor_{video_id}_{version}")
 
 # 清理空行
 cleaned_df = edited_df.dropna(how='all')
-if st.button("Save Table"):
-    st.session_state["quiz_table"] = cleaned_df
-    st.success("Table saved!")
-    st.write("Final Questions Table:")
-    st.dataframe(st.session_state["quiz_table"], width="stretch")
+if st.button("Save Table", help="Validates the table, stores it as a new version and makes it the active quiz."):
+    report = import_bank(video_id, [cleaned_df], source="editor")
+    show_report(report)
+    if report["version"]:
+        _, st.session_state["quiz_table"] = load_bank(video_id, report["version"])
+        st.success("Table saved!")
+        st.write("Final Questions Table:")
+        st.dataframe(st.session_state["quiz_table"], width="stretch")
@@ -0,0 +1,418 @@
+import hashlib
+import json
+import re
+
+import pandas as pd
+
+from cache import ReadCache
+
+# ---------- Player compilation ----------
+# The quiz page reruns on every answer. Everything derived from the quiz
+# table and video link is memoized here under a content hash of both, so a
+# rerun with unchanged inputs reuses the exact same HTML string; an
+# identical component is not remounted, so the YouTube iframe and API
+# script keep running instead of reloading.
+
+OPTION_COLUMNS = ["Option A", "Option B", "Option C"]
+VIDEO_ID_RE = re.compile(r"(?:v=|\/)([0-9A-Za-z_-]{11})(?:[?&].*)?$")
+PLAYER_CACHE = ReadCache(maxsize=64, ttl=3600.0)
+
+
+def extract_video_id(video_url: str) -> str:
+    match = VIDEO_ID_RE.search(video_url)
+    return match.group(1) if match else video_url
+
+
+# ``[[h:]m:]s`` with optional fractional seconds: "75", "1:15", "1:15.5",
+# "01:02:03". Minutes and seconds below a larger unit must be under 60.
+TIMESTAMP_RE = r"^(?:(?:(\d+):)?(\d+):)?(\d+(?:\.\d*)?)$"
+
+
+def parse_timestamps(times: pd.Series) -> pd.Series:
+    """Vectorized timestamps -> float seconds; NaN where unparseable."""
+    parts = times.astype(str).str.strip().str.extract(TIMESTAMP_RE)
+    hours, minutes, seconds = (pd.to_numeric(parts[i], errors="coerce") for i in range(3))
+    bad = (minutes.notna() & (seconds >= 60)) | (hours.notna() & (minutes >= 60))
+    total = hours.fillna(0) * 3600 + minutes.fillna(0) * 60 + seconds
+    return total.mask(bad)
+
+
+def format_timestamps(seconds: pd.Series) -> pd.Series:
+    """Inverse of ``parse_timestamps``: ``m:ss`` or ``h:mm:ss``, fractions kept."""
+    # Round before splitting, or 59.9996 would come out as "0:60".
+    whole = seconds.fillna(0).astype(float).round(3)
+    h, rest = whole // 3600, whole % 3600
+    m, sec = rest // 60, rest % 60
+    # 100 + s keeps the leading zero; repr then drops trailing zeros ("103.5").
+    # sec.round(3) only strips float noise from the modulo (61.1 % 60).
+    sec_text = (sec.round(3) + 100).astype(str).str[1:].str.replace(r"\.0$", "", regex=True)
+    short = m.astype(int).astype(str) + ":" + sec_text
+    long = h.astype(int).astype(str) + ":" + m.astype(int).astype(str).str.zfill(2) + ":" + sec_text
+    return long.where(h > 0, short)
+
+
+def time_to_seconds(times: pd.Series) -> pd.Series:
+    """Seconds for the player; anything unparseable becomes 0 (validate first, see quiz_bank)."""
+    return parse_timestamps(times).fillna(0)
+
+
+def checkpoint_id(at_seconds: float, question: str) -> str:
+    """Stable id of a question: the same time and text keep their id across
+    bank versions however rows are inserted, removed or reordered, so stored
+    attempts and rollups stay attached to the right question."""
+    key = f"{float(at_seconds):.3f}\x1f{str(question).strip()}"
+    return "q" + hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def build_checkpoints(df: pd.DataFrame) -> list[dict]:
+    """Quiz table rows -> checkpoint dicts for the player, without iterrows."""
+    options = df.reindex(columns=OPTION_COLUMNS).astype(object)
+    valid = options.apply(lambda col: col.str.strip().str.len().gt(0)).to_numpy()
+    values = options.to_numpy()
+    choices = [list(row[mask]) for row, mask in zip(values, valid)]
+    return [
+        {"id": checkpoint_id(at, prompt), "at_seconds": at, "prompt": prompt, "choices": c, "answer": answer}
+        for at, prompt, c, answer in zip(
+            time_to_seconds(df["Time"]).tolist(),
+            df["Question"].tolist(),
+            choices,
+            df["Correct Answer"].tolist(),
+        )
+    ]
+
+
+def fingerprint(df: pd.DataFrame, video_url: str) -> str:
+    """Content hash of the quiz table (values, index and columns) plus the video link."""
+    h = hashlib.sha1()
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    h.update(json.dumps([str(c) for c in df.columns]).encode())
+    h.update(video_url.encode())
+    return h.hexdigest()
+
+
+def compile_player(df: pd.DataFrame, video_url: str) -> tuple[str, list[dict], str]:
+    """``(video_id, checkpoints, html)`` for a quiz table and video link, memoized by content."""
+
+    def load():
+        video_id = extract_video_id(video_url)
+        checkpoints = build_checkpoints(df)
+        # "</" would end the inline <script> early if it appeared in a question
+        data = json.dumps(checkpoints).replace("</", "<\\/")
+        html = PLAYER_TEMPLATE.replace("__CHECKPOINTS_JSON__", data).replace("__VIDEO_ID__", video_id)
+        return video_id, checkpoints, html
+
+    return PLAYER_CACHE.get_or_load(fingerprint(df, video_url), load)
+
+
+# Doubled braces are kept from when this was an f-string-style template;
+# they are collapsed once at import, before any quiz text is substituted.
+_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+  <style>
+    body {{
+      margin: 0; background: #0e1117; color: white;
+      font-family: -apple-system, BlinkMacSystemFont,"Segoe UI",Roboto,Helvetica,Arial;
+    }}
+    #player-container {{ max-width:720px; margin:16px auto; position:relative; }}
+    #player {{ width:100%; height:405px; }}
+    #question-box {{
+      position:absolute; top:50%; left:50%; transform:translate(-50%,-50%);
+      background:rgba(20,20,20,0.95); border:2px solid #00ffaa; border-radius:10px;
+      padding:20px; width:90%; max-width:420px; text-align:center; z-index:999;
+    }}
+    #record-panel {{
+      max-width:720px; margin:8px auto 24px; padding:12px 16px; background:#12151d; border:1px solid #293241; border-radius:10px;
+    }}
+    .stats {{ display:flex; gap:12px; margin-bottom:10px; }}
+    .stat {{ background:#1b1f2a; padding:10px 12px; border-radius:8px; }}
+    .stat strong {{ color:#00ffaa; }}
+    .record-item {{ padding:8px 6px; border-bottom:1px dashed #2a2f3a; }}
+    .record-item:last-child {{ border-bottom:none; }}
+    .ok {{ color:#00ffaa; }}
+    .bad {{ color:#ff5555; }}
+    button {{ background:#00ffaa; border:none; border-radius:6px; padding:8px 12px; margin-top:6px; cursor:pointer; }}
+  </style>
+</head>
+<body>
+  <div id="player-container">
+    <div id="player"></div>
+    <div id="question-box" style="display:none"></div>
+  </div>
+
+  <div id="record-panel">
+    <div class="stats" id="stats"></div>
+    <div id="records"></div>
+  </div>
+
+  <script>
+    const checkpoints = __CHECKPOINTS_JSON__;
+    let player; let lastShownAt = {{}};
+    const COOLDOWN_MS = 2000; // cooldown for unanswered popup
+
+    // Map for quick lookup
+    const promptMap = Object.fromEntries(checkpoints.map(cp => [cp.id, cp.prompt]));
+    const correctMap = Object.fromEntries(checkpoints.map(cp => [cp.id, cp.answer]));
+    const timeMap = Object.fromEntries(checkpoints.map(cp => [cp.id, cp.at_seconds]));
+
+    // ---------- Answer store ----------
+    // Answers live in a Map keyed by question id, loaded from localStorage
+    // once. Stats are running counters and each answer touches only its own
+    // record row, so answering stays O(1) however many questions there are.
+    // localStorage keeps the original array format and is written debounced.
+    const SAVE_DEBOUNCE_MS = 250;
+    const answers = new Map();
+    const rows = new Map();
+    let answeredCount = 0, correctCount = 0, saveHandle = null, unsent = [];
+
+    function isCorrect(a) {{ return !!a && a.choice === (correctMap[a.questionId] || ''); }}
+    function loadAnswers() {{
+      try {{
+        const raw = localStorage.getItem('yt_question_answers');
+        for (const a of (raw ? JSON.parse(raw) : [])) putAnswer(a);
+      }} catch(e) {{}}
+    }}
+    function putAnswer(rec) {{
+      const prev = answers.get(rec.questionId);
+      if (prev) {{ correctCount -= isCorrect(prev); }} else {{ answeredCount++; }}
+      correctCount += isCorrect(rec);
+      answers.set(rec.questionId, rec);
+    }}
+    function flushAnswers() {{
+      if (saveHandle) {{ clearTimeout(saveHandle); saveHandle = null; }}
+      try {{ localStorage.setItem('yt_question_answers', JSON.stringify(Array.from(answers.values()))); }} catch(e) {{}}
+      // notify parent page once the answers are persisted (single Python rerun per flush)
+      if (unsent.length) {{
+        const payload = unsent; unsent = [];
+        try {{ (window.top || window.parent || window).postMessage({{ type: 'yt-quiz-answer', payload: payload }}, '*'); }} catch(e) {{}}
+      }}
+    }}
+    function saveAnswersSoon() {{
+      if (saveHandle) clearTimeout(saveHandle);
+      saveHandle = setTimeout(flushAnswers, SAVE_DEBOUNCE_MS);
+    }}
+    function isAlreadyAnswered(qid) {{
+      return answers.has(qid);
+    }}
+    loadAnswers();
+
+    function renderStats() {{
+      const acc = answeredCount > 0 ? (correctCount/answeredCount*100).toFixed(1) : '0.0';
+      document.getElementById('stat-answered').textContent = answeredCount;
+      document.getElementById('stat-correct').textContent = correctCount;
+      document.getElementById('stat-accuracy').textContent = acc + '%';
+    }}
+    function renderRecord(a) {{
+      let line = rows.get(a.questionId);
+      if (!line) {{
+        line = document.createElement('div');
+        line.className = 'record-item';
+        document.getElementById('records').appendChild(line);
+        rows.set(a.questionId, line);
+      }}
+      const prompt = promptMap[a.questionId] || a.questionId;
+      line.innerHTML = `Question: <strong>${{prompt}}</strong> — Answer: <strong>${{a.choice}}</strong> ${{ isCorrect(a) ? '<span class=\"ok\">✅</span>' : '<span class=\"bad\">❌</span>' }}`;
+    }}
+    function renderRecordPanel() {{
+      // Full render, used once on load; answers afterwards update one row.
+      document.getElementById('stats').innerHTML = `
+        <div class=\"stat\"><strong>Answered</strong><br><span id=\"stat-answered\"></span></div>
+        <div class=\"stat\"><strong>Correct</strong><br><span id=\"stat-correct\"></span></div>
+        <div class=\"stat\"><strong>Accuracy</strong><br><span id=\"stat-accuracy\"></span></div>
+      `;
+      const recEl = document.getElementById('records');
+      recEl.innerHTML = '';
+      rows.clear();
+      for (const a of answers.values()) renderRecord(a);
+      renderStats();
+    }}
+
+    function showQuestion(cp) {{
+      const box = document.getElementById('question-box');
+      try {{ player.pauseVideo(); }} catch(e) {{}}
+      box.style.display = 'block';
+      box.innerHTML = '';
+
+      const prev = answers.get(cp.id);
+      const prevChoice = prev ? prev.choice : null;
+
+      let html = `<h3>${{cp.prompt}}</h3>`;
+      if (prevChoice) {{
+        html += `<p>Previous choice: <strong>${{prevChoice}}</strong></p>`;
+      }}
+      for (const c of cp.choices) {{
+        const highlight = (prevChoice === c) ? ' style="background:#ffaa00;color:#000"' : '';
+        html += `<button${{highlight}} onclick="answer('${{cp.id}}','${{c}}','${{cp.answer}}')">${{c}}</button><br>`;
+      }}
+      box.innerHTML = html;
+    }}
+
+    function closeQuestion() {{
+      const box = document.getElementById('question-box');
+      box.style.display = 'none';
+      box.innerHTML = '';
+    }}
+
+    function answer(qid, choice, correct) {{
+      const rec = {{
+        questionId: qid,
+        choice: choice,
+        correct: choice === correct,
+        at_seconds: timeMap[qid],
+        answered_at: new Date().toISOString()
+      }};
+      putAnswer(rec);
+      unsent.push(rec);
+      saveAnswersSoon();
+      lastShownAt[qid] = Date.now();  // resuming must not re-open it at once
+      closeQuestion();
+      try {{ player.playVideo(); }} catch(e) {{}}
+      renderRecord(rec);
+      renderStats();
+    }}
+
+    // ---------- Checkpoint scheduler ----------
+    // Checkpoints are indexed by time once; a single timer is armed for the
+    // next one and re-armed on play/pause/seek/rate-change instead of
+    // polling, so an idle or playing video costs no CPU between questions.
+    const EPS = 0.25;               // tolerance for timers waking slightly early
+    const SAVE_EVERY_MS = 5000;     // position persistence while playing
+    const DRIFT_S = 1.0;            // larger jumps are treated as a seek
+    const order = checkpoints.map((cp, i) => i).sort((a, b) => checkpoints[a].at_seconds - checkpoints[b].at_seconds);
+    const times = order.map(i => checkpoints[i].at_seconds);
+    let nextIdx = 0, timer = null, saveTimer = null;
+    let known = {{ pos: 0, at: performance.now(), playing: false }};
+
+    function lowerBound(t) {{
+      let lo = 0, hi = times.length;
+      while (lo < hi) {{
+        const mid = (lo + hi) >> 1;
+        if (times[mid] < t) lo = mid + 1; else hi = mid;
+      }}
+      return lo;
+    }}
+    function currentTime() {{ try {{ return player.getCurrentTime() || 0; }} catch(e) {{ return 0; }} }}
+    function playbackRate() {{ try {{ return player.getPlaybackRate() || 1; }} catch(e) {{ return 1; }} }}
+    function isPlaying() {{ try {{ return player.getPlayerState() === YT.PlayerState.PLAYING; }} catch(e) {{ return false; }} }}
+    function questionOpen() {{
+      const box = document.getElementById('question-box');
+      return !!box && box.style.display === 'block';
+    }}
+
+    function remember(pos, playing) {{ known = {{ pos: pos, at: performance.now(), playing: playing }}; }}
+    function expectedPos() {{
+      return known.playing ? known.pos + (performance.now() - known.at) / 1000 * playbackRate() : known.pos;
+    }}
+    function savePosition() {{
+      try {{ localStorage.setItem('yt_current_time', currentTime().toFixed(2)); }} catch(e) {{}}
+    }}
+
+    function disarm() {{ if (timer) {{ clearTimeout(timer); timer = null; }} }}
+    function arm() {{
+      disarm();
+      if (!isPlaying() || questionOpen() || nextIdx >= times.length) return;
+      const delay = (times[nextIdx] - currentTime()) / playbackRate() * 1000;
+      timer = setTimeout(fire, Math.max(0, delay));
+    }}
+    function fire() {{
+      timer = null;
+      if (!isPlaying() || nextIdx >= times.length) return;
+      const t = currentTime();
+      if (t < times[nextIdx] - EPS) {{ remember(t, true); arm(); return; }}  // woke early
+      const cp = checkpoints[order[nextIdx++]];
+      remember(t, true);
+      trigger(cp);
+    }}
+    function trigger(cp) {{
+      if (Date.now() - (lastShownAt[cp.id] || 0) <= COOLDOWN_MS) {{ arm(); return; }}
+      lastShownAt[cp.id] = Date.now();
+      showQuestion(cp);  // pauses the video; answering resumes and re-syncs
+    }}
+
+    // Re-derive the next checkpoint from the real position. A forward jump
+    // past unanswered questions (seek, throttled background tab) asks the
+    // first skipped one instead of silently missing it.
+    function resync() {{
+      const t = currentTime();
+      const prev = expectedPos();
+      const idx = lowerBound(t - EPS);
+      if (t > prev + DRIFT_S) {{
+        for (let i = lowerBound(prev - EPS); i < idx; i++) {{
+          const cp = checkpoints[order[i]];
+          if (!isAlreadyAnswered(cp.id) && Date.now() - (lastShownAt[cp.id] || 0) > COOLDOWN_MS) {{
+            nextIdx = i + 1;
+            remember(t, isPlaying());
+            trigger(cp);
+            return;
+          }}
+        }}
+      }}
+      nextIdx = idx;
+      remember(t, isPlaying());
+      arm();
+    }}
+
+    function startSaving() {{
+      if (saveTimer) return;
+      saveTimer = setInterval(() => {{
+        savePosition();
+        // Seeks do not always raise a state change: catch them here.
+        if (Math.abs(currentTime() - expectedPos()) > DRIFT_S) resync();
+      }}, SAVE_EVERY_MS);
+    }}
+    function stopSaving() {{
+      if (saveTimer) {{ clearInterval(saveTimer); saveTimer = null; }}
+      savePosition();
+    }}
+
+    function onPlayerStateChange(e) {{
+      if (e.data === YT.PlayerState.PLAYING) {{
+        startSaving();
+        resync();
+      }} else if (e.data === YT.PlayerState.BUFFERING) {{
+        // Keep the pre-seek position so resync can see what was skipped.
+        disarm();
+        remember(expectedPos(), false);
+      }} else {{
+        disarm();
+        stopSaving();
+        remember(currentTime(), false);
+      }}
+    }}
+    function onPlaybackRateChange() {{ remember(currentTime(), isPlaying()); arm(); }}
+
+    function onYouTubeIframeAPIReady() {{
+      player = new YT.Player('player', {{
+        height: '405', width: '720',
+        videoId: '__VIDEO_ID__',
+        events: {{
+          'onReady': onPlayerReady,
+          'onStateChange': onPlayerStateChange,
+          'onPlaybackRateChange': onPlaybackRateChange
+        }}
+      }});
+    }}
+
+    function onPlayerReady() {{
+      // restore playback time
+      try {{
+        const last = parseFloat(localStorage.getItem('yt_current_time') || '0');
+        if (!isNaN(last) && last > 0) {{ player.seekTo(last, true); remember(last, false); }}
+      }} catch(e) {{}}
+      try {{ player.playVideo(); }} catch(e) {{}}
+      renderRecordPanel();
+      window.addEventListener('pagehide', () => {{ savePosition(); flushAnswers(); }});
+      document.addEventListener('visibilitychange', () => {{
+        if (document.visibilityState === 'hidden') {{ savePosition(); flushAnswers(); }} else if (isPlaying()) resync();
+      }});
+    }}
+
+    const tag = document.createElement('script');
+    tag.src = "https://www.youtube.com/iframe_api";
+    document.body.appendChild(tag);
+  </script>
+</body>
+</html>
+"""
+PLAYER_TEMPLATE = _TEMPLATE.replace("{{", "{").replace("}}", "}")
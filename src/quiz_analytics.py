@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+# ---------- Quiz analytics ----------
+# Turn rollup rows from quiz_db into display tables. The inputs are already
+# aggregated per question / choice / learner, so everything here is a few
+# column-wise operations over small frames: no per-row Python loops.
+
+
+def _ratio(num, den):
+    num = np.asarray(num, dtype=float)
+    den = np.asarray(den, dtype=float)
+    return np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+
+
+def question_table(rows) -> pd.DataFrame:
+    """Per-question answers and accuracy, in video order."""
+    df = pd.DataFrame(rows, columns=["question_id", "at_seconds", "answers", "correct"])
+    # Old positional ids (q12 sorts after q2): fall back to the numeric suffix
+    # when no timestamp is known; newer ids always come with one
+    order = pd.to_numeric(df["question_id"].str.extract(r"(\d+)$", expand=False), errors="coerce")
+    df = df.assign(_order=order).sort_values(["at_seconds", "_order"], na_position="last").drop(columns="_order")
+    df["accuracy"] = _ratio(df["correct"], df["answers"])
+    return df.reset_index(drop=True)
+
+
+def choice_table(rows, order=None) -> pd.DataFrame:
+    """Choice distribution: one row per question, one column per choice (share of answers).
+
+    ``order`` lists question ids in display order (e.g. from ``question_table``).
+    """
+    df = pd.DataFrame(rows, columns=["question_id", "choice", "answers"])
+    if df.empty:
+        return df
+    totals = df.groupby("question_id")["answers"].transform("sum")
+    df["share"] = _ratio(df["answers"], totals)
+    table = df.pivot_table(index="question_id", columns="choice", values="share", fill_value=0.0)
+    return table if order is None else table.reindex(pd.Index(order).intersection(table.index, sort=False))
+
+
+def dropoff_table(questions: pd.DataFrame) -> pd.DataFrame:
+    """Learners reaching each checkpoint (as ordered by ``question_table``) and the loss since the previous one."""
+    reached = questions["answers"].to_numpy()
+    first = reached[0] if len(reached) else 0
+    prev = np.concatenate(([first], reached[:-1])) if len(reached) else reached
+    return pd.DataFrame({
+        "question_id": questions["question_id"],
+        "at_seconds": questions["at_seconds"],
+        "reached": reached,
+        "retention": _ratio(reached, np.full(len(reached), first)),
+        "dropped": np.maximum(prev - reached, 0),
+    })
+
+
+def progress_table(rows, total_questions: int) -> pd.DataFrame:
+    """Per-learner completion and accuracy, most recent activity first."""
+    df = pd.DataFrame(rows, columns=["learner", "answered", "correct", "last_answered_at"])
+    df["completion"] = _ratio(df["answered"], np.full(len(df), total_questions))
+    df["accuracy"] = _ratio(df["correct"], df["answered"])
+    return df.sort_values("last_answered_at", ascending=False).reset_index(drop=True)
@@ -0,0 +1,148 @@
+from pathlib import Path
+
+import pandas as pd
+
+import quiz_db
+from cache import ReadCache
+from player import OPTION_COLUMNS, format_timestamps, parse_timestamps
+
+# ---------- Quiz bank import / load ----------
+# Question files are read in chunks (CSV via pandas, Parquet by record
+# batch), each chunk is validated with column-wise pandas operations and
+# its good rows are queued on the quiz store's writer right away, so a file
+# of tens of thousands of questions never sits in memory twice and the
+# writer is never held for long. The version becomes visible only once
+# every chunk has been written (see quiz_db "Quiz banks").
+
+BANK_COLUMNS = ["Time", "Question", *OPTION_COLUMNS, "Correct Answer"]
+CHUNK_ROWS = 5000
+MAX_ISSUES = 1000  # kept per import; counts are always complete
+# Published versions never change, so a loaded bank stays valid; callers
+# share the cached DataFrame and must not modify it in place.
+BANK_CACHE = ReadCache(maxsize=32, ttl=3600.0)
+
+
+def read_chunks(source, name: str = "", chunk_rows: int = CHUNK_ROWS):
+    """Yield DataFrames of at most ``chunk_rows`` rows from a CSV or Parquet file.
+
+    ``source`` is a path or a binary file object (e.g. a Streamlit upload);
+    ``name`` decides the format when ``source`` has no usable suffix.
+    """
+    suffix = Path(name or str(source)).suffix.lower()
+    if suffix in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+
+
+def _text(df: pd.DataFrame, column: str) -> pd.Series:
+    return df[column].astype(object).where(df[column].notna(), "").astype(str).str.strip()
+
+
+def validate_chunk(chunk: pd.DataFrame, first_row: int = 1) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Split a chunk into clean rows and issues.
+
+    Clean rows carry ``at_seconds`` plus the bank columns, stripped. Issues
+    are ``(row, column, problem)`` with ``row`` numbered from ``first_row``.
+    Raises ValueError if a bank column is missing altogether.
+    """
+    missing = [c for c in BANK_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"missing column(s): {', '.join(missing)} (expected {', '.join(BANK_COLUMNS)})")
+    rows = pd.RangeIndex(first_row, first_row + len(chunk))
+    text = pd.DataFrame({c: _text(chunk, c) for c in BANK_COLUMNS}).set_index(rows)
+    at = parse_timestamps(text["Time"])
+    options = text[OPTION_COLUMNS]
+    checks = {
+        ("Time", "not a timestamp ([h:]m:ss[.fff])"): at.isna(),
+        ("Question", "empty"): text["Question"].eq(""),
+        ("Option A", "fewer than two options"): options.ne("").sum(axis=1).lt(2),
+        ("Correct Answer", "not one of the options"): ~options.eq(text["Correct Answer"], axis=0).any(axis=1),
+    }
+    blank = text.eq("").all(axis=1)  # empty editor/spreadsheet rows are skipped silently
+    bad = pd.Series(False, index=rows)
+    issues = []
+    for (column, problem), mask in checks.items():
+        mask = mask & ~blank
+        bad |= mask
+        if mask.any():
+            issues.append(pd.DataFrame({"row": mask.index[mask], "column": column, "problem": problem}))
+    clean = text[~bad & ~blank].assign(at_seconds=at[~bad & ~blank])
+    issues = pd.concat(issues, ignore_index=True) if issues else pd.DataFrame(columns=["row", "column", "problem"])
+    return clean[["at_seconds", *BANK_COLUMNS]], issues
+
+
+def import_bank(youtube_id: str, chunks, source: str = "") -> dict:
+    """Validate and store ``chunks`` as a new published bank version for ``youtube_id``.
+
+    Returns a report: ``version`` (None if nothing was importable), row
+    counts (``rows``, ``rejected``, ``duplicates``, ``out_of_order``,
+    ``questions``) and up to MAX_ISSUES ``issues`` as a DataFrame.
+    A file without the bank columns raises ValueError and stores nothing.
+    Duplicate (time, question) rows keep the last one; rows are stored in
+    time order whatever order the file was in.
+    """
+    version = quiz_db.begin_bank_version(youtube_id, source).result()
+    report = {"version": version, "rows": 0, "rejected": 0, "duplicates": 0, "out_of_order": 0, "questions": 0}
+    issues, kept, pending, last_at = [], 0, [], None
+    try:
+        for chunk in chunks:
+            clean, chunk_issues = validate_chunk(chunk, report["rows"] + 1)
+            report["rows"] += len(chunk)
+            report["rejected"] += chunk_issues["row"].nunique() if len(chunk_issues) else 0
+            if len(chunk_issues) and sum(map(len, issues)) < MAX_ISSUES:
+                issues.append(chunk_issues)
+            if clean.empty:
+                continue
+            at = clean["at_seconds"]
+            report["out_of_order"] += int(at.diff().lt(0).sum()) + int(last_at is not None and at.iloc[0] < last_at)
+            last_at = at.iloc[-1]
+            kept += len(clean)
+            if len(pending) > 1:  # at most two chunks in flight
+                pending.pop(0).result()
+            rows = list(clean.drop(columns="Time").itertuples(index=False, name=None))
+            pending.append(quiz_db.add_bank_questions(youtube_id, version, rows))
+        for future in pending:
+            future.result()
+        report["questions"] = quiz_db.publish_bank_version(youtube_id, version).result() if kept else 0
+    except BaseException:
+        quiz_db.discard_bank_version(youtube_id, version).result()
+        raise
+    if not kept:
+        quiz_db.discard_bank_version(youtube_id, version).result()
+        report["version"] = None
+    report["duplicates"] = kept - report["questions"]
+    report["issues"] = (
+        pd.concat(issues, ignore_index=True).head(MAX_ISSUES) if issues
+        else pd.DataFrame(columns=["row", "column", "problem"])
+    )
+    return report
+
+
+def _bank_frame(rows) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=["at_seconds", "Question", *OPTION_COLUMNS, "Correct Answer"])
+    df.insert(0, "Time", format_timestamps(df.pop("at_seconds")))
+    return df.fillna("")
+
+
+def load_bank(youtube_id: str, version: int | None = None) -> tuple[int | None, pd.DataFrame | None]:
+    """``(version, quiz table)`` for a video's bank, newest version by default.
+
+    The table has the editor's columns (``BANK_COLUMNS``) in playback
+    order; ``(None, None)`` when the video has no bank yet.
+    """
+    if version is None:
+        versions = quiz_db.list_bank_versions(youtube_id)
+        if not versions:
+            return None, None
+        version = versions[0][0]
+
+    def load():
+        found, rows = quiz_db.load_bank_questions(youtube_id, version)
+        return _bank_frame(rows) if found is not None else None
+
+    df = BANK_CACHE.get_or_load((str(quiz_db.DB_PATH), youtube_id, version), load)
+    return (version, df) if df is not None else (None, None)
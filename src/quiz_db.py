@@ -0,0 +1,461 @@
+import os
+from datetime import datetime
+from pathlib import Path
+
+import metrics
+from db import get_pool, get_writer, migrate
+
+# ---------- Storage ----------
+# Quiz attempts live in their own file next to forum.db, so answer ingestion
+# has its own writer thread and never queues behind forum posts.
+# QUIZ_DB_PATH overrides the location (benchmarks, deployments).
+DB_PATH = Path(os.environ.get("QUIZ_DB_PATH") or Path(__file__).parent / "pages" / "quiz.db")
+
+
+def _conn():
+    """Borrow a pooled connection; commits when the ``with`` block exits."""
+    return get_pool(DB_PATH).connection()
+
+
+# Learners and videos are interned to integer ids, and attempts keep one
+# row per (learner, video, question) in a WITHOUT ROWID table clustered on
+# that key: a re-answer updates the row in place, so the table grows with
+# distinct questions answered, not with clicks.
+BASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS learners(
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS videos(
+    id INTEGER PRIMARY KEY,
+    youtube_id TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS attempts(
+    learner_id INTEGER NOT NULL,
+    video_id INTEGER NOT NULL,
+    question_id TEXT NOT NULL,
+    choice TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    answered_at TEXT NOT NULL,
+    revisions INTEGER NOT NULL DEFAULT 0,
+    received_at TEXT NOT NULL,
+    PRIMARY KEY(learner_id, video_id, question_id)
+) WITHOUT ROWID;
+"""
+
+# Rollups for the analytics page, kept current by triggers on attempts so
+# dashboards read a few hundred pre-aggregated rows instead of scanning
+# every answer. question_stats.answers counts learners who answered, which
+# doubles as "reached this checkpoint" for drop-off.
+ROLLUP_SCHEMA = """
+ALTER TABLE attempts ADD COLUMN at_seconds REAL;
+CREATE TABLE IF NOT EXISTS question_stats(
+    video_id INTEGER NOT NULL,
+    question_id TEXT NOT NULL,
+    at_seconds REAL,
+    answers INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY(video_id, question_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS choice_stats(
+    video_id INTEGER NOT NULL,
+    question_id TEXT NOT NULL,
+    choice TEXT NOT NULL,
+    answers INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY(video_id, question_id, choice)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS learner_progress(
+    video_id INTEGER NOT NULL,
+    learner_id INTEGER NOT NULL,
+    answered INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    last_answered_at TEXT,
+    PRIMARY KEY(video_id, learner_id)
+) WITHOUT ROWID;
+INSERT INTO question_stats(video_id, question_id, at_seconds, answers, correct)
+    SELECT video_id, question_id, MAX(at_seconds), COUNT(*), SUM(correct)
+    FROM attempts GROUP BY video_id, question_id;
+INSERT INTO choice_stats(video_id, question_id, choice, answers)
+    SELECT video_id, question_id, choice, COUNT(*)
+    FROM attempts GROUP BY video_id, question_id, choice;
+INSERT INTO learner_progress(video_id, learner_id, answered, correct, last_answered_at)
+    SELECT video_id, learner_id, COUNT(*), SUM(correct), MAX(answered_at)
+    FROM attempts GROUP BY video_id, learner_id;
+CREATE TRIGGER IF NOT EXISTS attempts_rollup_ai AFTER INSERT ON attempts BEGIN
+    INSERT INTO question_stats(video_id, question_id, at_seconds, answers, correct)
+    VALUES (new.video_id, new.question_id, new.at_seconds, 1, new.correct)
+    ON CONFLICT(video_id, question_id) DO UPDATE SET
+        answers = answers + 1,
+        correct = correct + excluded.correct,
+        at_seconds = coalesce(excluded.at_seconds, at_seconds);
+    INSERT INTO choice_stats(video_id, question_id, choice, answers)
+    VALUES (new.video_id, new.question_id, new.choice, 1)
+    ON CONFLICT(video_id, question_id, choice) DO UPDATE SET answers = answers + 1;
+    INSERT INTO learner_progress(video_id, learner_id, answered, correct, last_answered_at)
+    VALUES (new.video_id, new.learner_id, 1, new.correct, new.answered_at)
+    ON CONFLICT(video_id, learner_id) DO UPDATE SET
+        answered = answered + 1,
+        correct = correct + excluded.correct,
+        last_answered_at = max(last_answered_at, excluded.last_answered_at);
+END;
+CREATE TRIGGER IF NOT EXISTS attempts_rollup_au AFTER UPDATE OF choice, correct ON attempts BEGIN
+    UPDATE question_stats SET correct = correct - old.correct + new.correct
+    WHERE video_id = new.video_id AND question_id = new.question_id;
+    UPDATE choice_stats SET answers = answers - 1
+    WHERE video_id = old.video_id AND question_id = old.question_id AND choice = old.choice;
+    INSERT INTO choice_stats(video_id, question_id, choice, answers)
+    VALUES (new.video_id, new.question_id, new.choice, 1)
+    ON CONFLICT(video_id, question_id, choice) DO UPDATE SET answers = answers + 1;
+    DELETE FROM choice_stats
+    WHERE video_id = old.video_id AND question_id = old.question_id AND answers <= 0;
+    UPDATE learner_progress SET
+        correct = correct - old.correct + new.correct,
+        last_answered_at = max(last_answered_at, new.answered_at)
+    WHERE video_id = new.video_id AND learner_id = new.learner_id;
+END;
+CREATE TRIGGER IF NOT EXISTS attempts_rollup_ad AFTER DELETE ON attempts BEGIN
+    UPDATE question_stats SET answers = answers - 1, correct = correct - old.correct
+    WHERE video_id = old.video_id AND question_id = old.question_id;
+    UPDATE choice_stats SET answers = answers - 1
+    WHERE video_id = old.video_id AND question_id = old.question_id AND choice = old.choice;
+    UPDATE learner_progress SET answered = answered - 1, correct = correct - old.correct
+    WHERE video_id = old.video_id AND learner_id = old.learner_id;
+    DELETE FROM question_stats WHERE video_id = old.video_id AND question_id = old.question_id AND answers <= 0;
+    DELETE FROM choice_stats WHERE video_id = old.video_id AND question_id = old.question_id AND answers <= 0;
+    DELETE FROM learner_progress WHERE video_id = old.video_id AND learner_id = old.learner_id AND answered <= 0;
+END;
+"""
+
+# Question banks, one immutable set of questions per (video, version). An
+# import writes its rows into a new unpublished version and flips
+# ``published`` when it is complete, so readers never see half a bank.
+# Questions are clustered on (video, version, time, question): loading a
+# bank is a single range scan already in playback order, and a repeated
+# (time, question) pair lands on the same key instead of duplicating.
+BANK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bank_versions(
+    video_id INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    source TEXT,
+    questions INTEGER NOT NULL DEFAULT 0,
+    published INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY(video_id, version)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bank_questions(
+    video_id INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    at_seconds REAL NOT NULL,
+    question TEXT NOT NULL,
+    option_a TEXT,
+    option_b TEXT,
+    option_c TEXT,
+    answer TEXT NOT NULL,
+    PRIMARY KEY(video_id, version, at_seconds, question)
+) WITHOUT ROWID;
+"""
+
+# A deleted answer may have been the learner's latest; take last_answered_at
+# from what remains (a range of the attempts key) instead of keeping it.
+ROLLUP_DELETE_SCHEMA = """
+DROP TRIGGER IF EXISTS attempts_rollup_ad;
+CREATE TRIGGER attempts_rollup_ad AFTER DELETE ON attempts BEGIN
+    UPDATE question_stats SET answers = answers - 1, correct = correct - old.correct
+    WHERE video_id = old.video_id AND question_id = old.question_id;
+    UPDATE choice_stats SET answers = answers - 1
+    WHERE video_id = old.video_id AND question_id = old.question_id AND choice = old.choice;
+    UPDATE learner_progress SET
+        answered = answered - 1,
+        correct = correct - old.correct,
+        last_answered_at = (
+            SELECT MAX(answered_at) FROM attempts
+            WHERE learner_id = old.learner_id AND video_id = old.video_id
+        )
+    WHERE video_id = old.video_id AND learner_id = old.learner_id;
+    DELETE FROM question_stats WHERE video_id = old.video_id AND question_id = old.question_id AND answers <= 0;
+    DELETE FROM choice_stats WHERE video_id = old.video_id AND question_id = old.question_id AND answers <= 0;
+    DELETE FROM learner_progress WHERE video_id = old.video_id AND learner_id = old.learner_id AND answered <= 0;
+END;
+"""
+
+MIGRATIONS = [
+    (1, "attempts store", BASE_SCHEMA, True),
+    (2, "analytics rollups", ROLLUP_SCHEMA, True),
+    (3, "quiz banks", BANK_SCHEMA, True),
+    (4, "rollup deletes recompute last answer", ROLLUP_DELETE_SCHEMA, True),
+]
+
+
+@metrics.helper("init_quiz_db")
+def init_quiz_db():
+    with _conn() as c:
+        migrate(c, MIGRATIONS)
+
+
+# ---------- Ingestion ----------
+# The browser posts only answers that are new or changed since its last
+# flush. Each batch becomes one job on the writer thread, which commits jobs
+# from every session together; the page does not wait for the commit.
+# Replays are harmless: an older or repeated answer never overwrites a newer
+# one, so the same batch can be delivered any number of times.
+UPSERT_ATTEMPT = """
+INSERT INTO attempts(learner_id, video_id, question_id, choice, correct, answered_at, at_seconds, received_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(learner_id, video_id, question_id) DO UPDATE SET
+    choice = excluded.choice,
+    correct = excluded.correct,
+    answered_at = excluded.answered_at,
+    at_seconds = coalesce(excluded.at_seconds, at_seconds),
+    received_at = excluded.received_at,
+    revisions = revisions + 1
+WHERE excluded.answered_at > attempts.answered_at
+"""
+
+
+def _intern(c, table: str, column: str, value: str) -> int:
+    c.execute(f"INSERT INTO {table}({column}) VALUES (?) ON CONFLICT({column}) DO NOTHING", (value,))
+    return c.execute(f"SELECT id FROM {table} WHERE {column}=?", (value,)).fetchone()[0]
+
+
+def normalize_answers(answers) -> list[tuple]:
+    """``(question_id, choice, correct, answered_at, at_seconds)`` rows, latest per question.
+
+    Accepts the player's answer records (``questionId``, ``choice``,
+    ``correct``, ``answered_at`` and optional ``at_seconds``) and drops
+    anything malformed.
+    """
+    latest = {}
+    for a in answers or []:
+        if not isinstance(a, dict):
+            continue
+        qid, choice, at = a.get("questionId"), a.get("choice"), a.get("answered_at")
+        if not (isinstance(qid, str) and isinstance(choice, str) and isinstance(at, str)):
+            continue
+        if qid not in latest or at > latest[qid][3]:
+            t = a.get("at_seconds")
+            t = float(t) if isinstance(t, (int, float)) and not isinstance(t, bool) else None
+            latest[qid] = (qid, choice, int(bool(a.get("correct"))), at, t)
+    return list(latest.values())
+
+
+def record_attempts(learner: str, youtube_id: str, answers):
+    """Queue ``answers`` for ``learner`` on ``youtube_id``; returns a Future.
+
+    The Future resolves to the number of rows inserted or updated, or to
+    ``None`` when there was nothing to write.
+    """
+    rows = normalize_answers(answers)
+    if not rows:
+        return None
+
+    def write(c):
+        learner_id = _intern(c, "learners", "name", learner)
+        video_id = _intern(c, "videos", "youtube_id", youtube_id)
+        received = datetime.now().isoformat(timespec="seconds")
+        # rowcount leaves out the interning above and the rollup triggers
+        return c.executemany(UPSERT_ATTEMPT, [(learner_id, video_id, *row, received) for row in rows]).rowcount
+
+    return get_writer(DB_PATH).submit(metrics.helper("record_attempts")(write))
+
+
+# ---------- Reads ----------
+
+@metrics.helper("list_attempts")
+def list_attempts(learner: str, youtube_id: str):
+    """``(question_id, choice, correct, answered_at, revisions)`` for one learner and video."""
+    with _conn() as c:
+        return c.execute(
+            """
+            SELECT a.question_id, a.choice, a.correct, a.answered_at, a.revisions
+            FROM attempts a
+            JOIN learners l ON l.id = a.learner_id
+            JOIN videos v ON v.id = a.video_id
+            WHERE l.name=? AND v.youtube_id=?
+            ORDER BY a.question_id
+            """,
+            (learner, youtube_id),
+        ).fetchall()
+
+
+@metrics.helper("count_attempts")
+def count_attempts() -> int:
+    with _conn() as c:
+        return c.execute("SELECT COUNT(*) FROM attempts").fetchone()[0]
+
+
+# ---------- Analytics ----------
+# All of these read the rollup tables only; cost is independent of how many
+# raw attempts are stored.
+
+@metrics.helper("list_quiz_videos")
+def list_quiz_videos():
+    """``(youtube_id, learners, answers)`` for every video with attempts, busiest first."""
+    with _conn() as c:
+        return c.execute(
+            """
+            SELECT v.youtube_id, COUNT(*), SUM(p.answered)
+            FROM learner_progress p JOIN videos v ON v.id = p.video_id
+            GROUP BY p.video_id
+            ORDER BY SUM(p.answered) DESC
+            """
+        ).fetchall()
+
+
+@metrics.helper("list_question_stats")
+def list_question_stats(youtube_id: str):
+    """``(question_id, at_seconds, answers, correct)`` per question of a video."""
+    with _conn() as c:
+        return c.execute(
+            """
+            SELECT s.question_id, s.at_seconds, s.answers, s.correct
+            FROM question_stats s JOIN videos v ON v.id = s.video_id
+            WHERE v.youtube_id=?
+            """,
+            (youtube_id,),
+        ).fetchall()
+
+
+@metrics.helper("list_choice_stats")
+def list_choice_stats(youtube_id: str):
+    """``(question_id, choice, answers)`` per question and choice of a video."""
+    with _conn() as c:
+        return c.execute(
+            """
+            SELECT s.question_id, s.choice, s.answers
+            FROM choice_stats s JOIN videos v ON v.id = s.video_id
+            WHERE v.youtube_id=?
+            """,
+            (youtube_id,),
+        ).fetchall()
+
+
+@metrics.helper("list_learner_progress")
+def list_learner_progress(youtube_id: str):
+    """``(learner, answered, correct, last_answered_at)`` per learner of a video."""
+    with _conn() as c:
+        return c.execute(
+            """
+            SELECT l.name, p.answered, p.correct, p.last_answered_at
+            FROM learner_progress p
+            JOIN videos v ON v.id = p.video_id
+            JOIN learners l ON l.id = p.learner_id
+            WHERE v.youtube_id=?
+            """,
+            (youtube_id,),
+        ).fetchall()
+
+
+# ---------- Quiz banks ----------
+# Writes go through the writer thread like attempts. A bulk import is one
+# begin job, one job per chunk and a publish job, so a large file never
+# holds the writer for long and other sessions' answers keep flowing.
+UPSERT_BANK_QUESTION = """
+INSERT INTO bank_questions(video_id, version, at_seconds, question, option_a, option_b, option_c, answer)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(video_id, version, at_seconds, question) DO UPDATE SET
+    option_a = excluded.option_a,
+    option_b = excluded.option_b,
+    option_c = excluded.option_c,
+    answer = excluded.answer
+"""
+
+
+def begin_bank_version(youtube_id: str, source: str = ""):
+    """Allocate the next (unpublished) bank version; returns a Future of it."""
+
+    def write(c):
+        video_id = _intern(c, "videos", "youtube_id", youtube_id)
+        version = c.execute(
+            "SELECT COALESCE(MAX(version), 0) + 1 FROM bank_versions WHERE video_id=?", (video_id,)
+        ).fetchone()[0]
+        c.execute(
+            "INSERT INTO bank_versions(video_id, version, created_at, source) VALUES (?, ?, ?, ?)",
+            (video_id, version, datetime.now().isoformat(timespec="seconds"), source),
+        )
+        return version
+
+    return get_writer(DB_PATH).submit(metrics.helper("begin_bank_version")(write))
+
+
+def add_bank_questions(youtube_id: str, version: int, rows):
+    """Queue ``(at_seconds, question, option_a, option_b, option_c, answer)`` rows
+    for an unpublished version; returns a Future of the row count written."""
+
+    def write(c):
+        video_id = _intern(c, "videos", "youtube_id", youtube_id)
+        c.executemany(UPSERT_BANK_QUESTION, [(video_id, version, *row) for row in rows])
+        return len(rows)
+
+    return get_writer(DB_PATH).submit(metrics.helper("add_bank_questions")(write))
+
+
+def publish_bank_version(youtube_id: str, version: int):
+    """Make ``version`` visible to readers; returns a Future of its question count."""
+
+    def write(c):
+        video_id = _intern(c, "videos", "youtube_id", youtube_id)
+        count = c.execute(
+            "SELECT COUNT(*) FROM bank_questions WHERE video_id=? AND version=?", (video_id, version)
+        ).fetchone()[0]
+        c.execute(
+            "UPDATE bank_versions SET questions=?, published=1 WHERE video_id=? AND version=?",
+            (count, video_id, version),
+        )
+        return count
+
+    return get_writer(DB_PATH).submit(metrics.helper("publish_bank_version")(write))
+
+
+def discard_bank_version(youtube_id: str, version: int):
+    """Drop an unpublished version (a failed import); returns a Future."""
+
+    def write(c):
+        video_id = _intern(c, "videos", "youtube_id", youtube_id)
+        c.execute("DELETE FROM bank_questions WHERE video_id=? AND version=?", (video_id, version))
+        c.execute("DELETE FROM bank_versions WHERE video_id=? AND version=? AND published=0", (video_id, version))
+
+    return get_writer(DB_PATH).submit(metrics.helper("discard_bank_version")(write))
+
+
+@metrics.helper("list_bank_versions")
+def list_bank_versions(youtube_id: str):
+    """``(version, created_at, source, questions)`` of published versions, newest first."""
+    with _conn() as c:
+        return c.execute(
+            """
+            SELECT b.version, b.created_at, b.source, b.questions
+            FROM bank_versions b JOIN videos v ON v.id = b.video_id
+            WHERE v.youtube_id=? AND b.published=1
+            ORDER BY b.version DESC
+            """,
+            (youtube_id,),
+        ).fetchall()
+
+
+@metrics.helper("load_bank_questions")
+def load_bank_questions(youtube_id: str, version: int | None = None):
+    """``(version, rows)`` for a published bank; the newest when ``version`` is None.
+
+    Rows are ``(at_seconds, question, option_a, option_b, option_c, answer)``
+    in playback order. Returns ``(None, [])`` when the video has no bank.
+    """
+    with _conn() as c:
+        row = c.execute(
+            """
+            SELECT b.video_id, b.version FROM bank_versions b JOIN videos v ON v.id = b.video_id
+            WHERE v.youtube_id=? AND b.published=1 AND (? IS NULL OR b.version=?)
+            ORDER BY b.version DESC LIMIT 1
+            """,
+            (youtube_id, version, version),
+        ).fetchone()
+        if row is None:
+            return None, []
+        rows = c.execute(
+            """
+            SELECT at_seconds, question, option_a, option_b, option_c, answer
+            FROM bank_questions WHERE video_id=? AND version=?
+            ORDER BY at_seconds, question
+            """,
+            row,
+        ).fetchall()
+    return row[1], rows
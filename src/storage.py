@@ -0,0 +1,188 @@
+import itertools
+import os
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+from db import PRAGMAS, connect, get_pool, get_writer
+
+# ---------- Storage backends ----------
+# A backend tells the query helpers where connections come from:
+#   read()     pooled connection for SELECTs
+#   write()    pooled connection for schema changes (migrations)
+#   writer()   the single writer thread that applies data changes
+#   data_version() changes whenever another process writes what read()
+#              returns (read caches key on it)
+#   committed() hook called after a local write commits
+# ``key`` names the database for caches and stats.
+#
+# FORUM_DB_BACKEND selects one at import time (backend_from_env):
+#   sqlite   (default) the file at FORUM_DB_PATH or the module default
+#   memory   a process-private in-memory database
+#   replica  writes to the primary file, reads from FORUM_DB_REPLICAS
+#            (comma-separated read-only copies kept in sync externally)
+
+
+class SQLiteBackend:
+    """One database file: pooled connections plus one writer thread."""
+
+    kind = "sqlite"
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.key = str(self.path.resolve())
+
+    def read(self):
+        return get_pool(self.path).connection()
+
+    def write(self):
+        return get_pool(self.path).connection()
+
+    def writer(self):
+        return get_writer(self.path)
+
+    def data_version(self) -> int:
+        return self.writer().data_version()
+
+    def committed(self) -> None:
+        pass
+
+
+# Shared-cache memory databases lock per table and ignore busy_timeout
+# between their own connections; readers skip those locks instead (they
+# may see a batch that is still being written, which tests can live with).
+MEMORY_PRAGMAS = {"busy_timeout": 5000, "read_uncommitted": 1, "temp_store": "MEMORY"}
+_memory_ids = itertools.count(1)
+
+
+class MemoryBackend:
+    """In-memory database shared by this process's connections; gone at exit.
+
+    Meant for tests and benchmarks. ``load_from(path)`` copies a file
+    database in, e.g. one made by ``python -m bench seed``.
+    """
+
+    kind = "memory"
+
+    def __init__(self, name: str = "forum"):
+        self.key = f"file:{name}-{next(_memory_ids)}?mode=memory&cache=shared"
+        # The database lives as long as one connection to it is open.
+        self._keeper = connect(self.key, MEMORY_PRAGMAS)
+
+    def read(self):
+        return get_pool(self.key, pragmas=MEMORY_PRAGMAS).connection()
+
+    def write(self):
+        return get_pool(self.key, pragmas=MEMORY_PRAGMAS).connection()
+
+    def writer(self):
+        return get_writer(self.key, pragmas=MEMORY_PRAGMAS)
+
+    def data_version(self) -> int:
+        return self.writer().data_version()
+
+    def committed(self) -> None:
+        pass
+
+    def load_from(self, path) -> None:
+        source = connect(path)
+        try:
+            source.backup(self._keeper)
+        finally:
+            source.close()
+
+
+# Read-only connections cannot change the journal or vacuum mode.
+REPLICA_PRAGMAS = {**{k: v for k, v in PRAGMAS.items() if k not in ("auto_vacuum", "journal_mode")}, "query_only": 1}
+
+
+class ReplicaBackend:
+    """Writes go to ``primary``; reads rotate over read-only ``replicas``.
+
+    Replicas are files kept in sync outside this process (LiteFS,
+    Litestream restore, a shared volume) or by ``sync_replicas()``. After a
+    local write, reads stay on the primary for ``sticky`` seconds so a
+    session sees its own change before replication catches up.
+    """
+
+    kind = "replica"
+
+    def __init__(self, primary, replicas=(), sticky: float = 2.0):
+        self.primary = SQLiteBackend(primary)
+        self.key = self.primary.key
+        self.replicas = [Path(p) for p in replicas]
+        # Without replicas, still separate the read path: read-only
+        # connections to the primary file.
+        targets = self.replicas or [self.primary.path]
+        # URI filenames must escape ?, # and % (and spaces, for portability)
+        self._uris = [f"file:{quote(str(p.resolve()))}?mode=ro" for p in targets]
+        self._next = itertools.cycle(range(len(self._uris)))
+        self._lock = threading.Lock()
+        self.sticky = sticky
+        self._last_write = float("-inf")
+        self._watchers = None
+        self._watch_lock = threading.Lock()
+
+    def read(self):
+        if time.monotonic() - self._last_write < self.sticky:
+            return self.primary.read()
+        with self._lock:
+            uri = self._uris[next(self._next)]
+        return get_pool(uri, pragmas=REPLICA_PRAGMAS).connection()
+
+    def write(self):
+        return self.primary.write()
+
+    def writer(self):
+        return self.primary.writer()
+
+    def data_version(self) -> tuple:
+        """The primary's data_version followed by each replica's.
+
+        Reads after the sticky window may come from a replica that has not
+        caught up yet; keying the cache on this retires those rows as soon
+        as replication lands instead of after the TTL. Each replica is
+        watched through one dedicated read-only connection. A replica
+        replaced by renaming a new file over it is not seen (the watcher
+        keeps the old file open); the cache TTL still bounds that case.
+        """
+        with self._watch_lock:
+            if self._watchers is None:
+                uris = self._uris if self.replicas else []
+                self._watchers = [connect(uri, REPLICA_PRAGMAS, timed=False) for uri in uris]
+            replicas = [w.execute("PRAGMA data_version").fetchone()[0] for w in self._watchers]
+        return (self.primary.data_version(), *replicas)
+
+    def committed(self) -> None:
+        self._last_write = time.monotonic()
+
+    def sync_replicas(self) -> None:
+        """Copy the primary over every replica file (single-host setups, tests)."""
+        source = connect(self.primary.path)
+        try:
+            for path in self.replicas:
+                target = connect(path, {"journal_mode": "DELETE"})
+                try:
+                    source.backup(target)
+                    # the copy carries the primary's WAL flag; read-only
+                    # openers would then need a writable -shm file
+                    target.execute("PRAGMA journal_mode=DELETE")
+                finally:
+                    target.close()
+        finally:
+            source.close()
+
+
+def backend_from_env(default_path):
+    """Build the backend selected by FORUM_DB_BACKEND / FORUM_DB_PATH / FORUM_DB_REPLICAS."""
+    kind = os.environ.get("FORUM_DB_BACKEND", "sqlite")
+    path = os.environ.get("FORUM_DB_PATH") or default_path
+    if kind == "sqlite":
+        return SQLiteBackend(path)
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "replica":
+        replicas = [p.strip() for p in os.environ.get("FORUM_DB_REPLICAS", "").split(",") if p.strip()]
+        return ReplicaBackend(path, replicas)
+    raise ValueError(f"unknown FORUM_DB_BACKEND {kind!r} (expected sqlite, memory or replica)")
@@ -1,5 +1,8 @@
 import streamlit as st
 
+import metrics
+from bootstrap import bootstrap
+
 st.set_page_config(
     page_title="YouTube currentTime",  # 页面标题
     page_icon="▶️",                   # 页面图标
@@ -19,5 +22,10 @@ st.markdown("""
 st.title("🎓 E-Learning Interactive Learning Platform")
 
 
-pg = st.navigation(["setting.py", "test.py", "forum.py"])
-pg.run()
\ No newline at end of file
+# 每个进程只初始化一次数据库结构和写线程（见 bootstrap.py）
+bootstrap()
+
+pg = st.navigation(["pages/setting.py", "pages/test.py", "pages/forum.py", "pages/analytics.py", "pages/admin.py"])
+# 记录每个页面每次重跑的耗时和数据库调用次数（见 admin 页面）
+with metrics.page_run(pg.url_path or "setting"):
+    pg.run()
\ No newline at end of file
@@ -0,0 +1,24 @@
+from pathlib import Path
+
+import streamlit.components.v1 as components
+
+# ---------- Virtualized thread list ----------
+# A page of threads rendered as one custom component instead of a markdown
+# card, a column row and two buttons per thread. Rows travel as compact
+# lists and the browser only builds the cards in view (frontend/index.html,
+# plain JS, no build step).
+
+ROW_HEIGHT = 150  # px per card, including the gap below it
+
+_component = components.declare_component("thread_list", path=str(Path(__file__).parent / "frontend"))
+
+
+def thread_list_view(rows, key: str, height: int = 720):
+    """Render ``rows`` of ``[id, title, meta, preview, saved]``.
+
+    Returns the last click as ``{"action": "open" | "save", "id", "nonce"}``
+    (or ``None``). The value persists across reruns, so callers should act
+    once per ``nonce``; it is also readable from ``st.session_state[key]``
+    before the component is drawn.
+    """
+    return _component(rows=rows, row_height=ROW_HEIGHT, height=height, key=key, default=None)
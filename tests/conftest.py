@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import forum_db  # noqa: E402
+import quiz_db  # noqa: E402
+
+
+@pytest.fixture
+def forum_backend():
+    """Restore the module-level forum backend after a test swaps it."""
+    saved = forum_db._backend
+    yield
+    forum_db.set_backend(saved)
+
+
+@pytest.fixture
+def quiz_store(tmp_path, monkeypatch):
+    """Point quiz_db at a fresh, migrated file for one test."""
+    monkeypatch.setattr(quiz_db, "DB_PATH", tmp_path / "quiz.db")
+    quiz_db.init_quiz_db()
+    return quiz_db
@@ -0,0 +1,69 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+import export
+import forum_db
+from storage import MemoryBackend
+
+
+@pytest.fixture
+def stores(forum_backend, quiz_store):
+    forum_db.set_backend(MemoryBackend())
+    forum_db.init_db()
+    for i in range(5):
+        thread_id = forum_db.create_thread(f"Thread {i}", f'body "{i}", with, commas\nand lines', "General", f"user{i}")
+        forum_db.add_post(thread_id, f"réponse {i}", "bob")
+        forum_db.toggle_save(f"user{i % 2}", thread_id)
+    answers = [
+        {"questionId": f"q{i}", "choice": "A", "correct": i % 2 == 0, "answered_at": f"2024-01-01T10:0{i}", "at_seconds": i * 1.5}
+        for i in range(3)
+    ]
+    quiz_store.record_attempts("amy", "vid00000001", answers).result()
+    quiz_store.record_attempts("bob", "vid00000001", answers[:1]).result()
+    version = quiz_store.begin_bank_version("vid00000001").result()
+    quiz_store.add_bank_questions("vid00000001", version, [(1.5, "Q1", "a", "b", "", "a"), (3.0, "Q2", "a", "b", "c", "c")]).result()
+    quiz_store.publish_bank_version("vid00000001", version).result()
+
+
+def expected(dataset: str) -> list[tuple]:
+    return [row for chunk in export.iter_chunks(dataset, chunk_rows=10_000) for row in chunk]
+
+
+def read_back(fmt: str, data: bytes, dataset: str) -> list[tuple]:
+    if fmt == "csv":
+        df = pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False)
+    elif fmt == "jsonl":
+        df = pd.DataFrame([json.loads(line) for line in data.decode("utf-8").splitlines()], columns=export.columns(dataset))
+    else:
+        df = pd.read_parquet(io.BytesIO(data))
+    assert list(df.columns) == export.columns(dataset)
+    return [tuple(row) for row in df.itertuples(index=False)]
+
+
+@pytest.mark.parametrize("fmt", export.FORMATS)
+@pytest.mark.parametrize("dataset", export.DATASETS)
+def test_export_round_trip(stores, dataset, fmt):
+    out = io.BytesIO()
+    count = export.export(dataset, fmt, out, chunk_rows=2)
+    rows = expected(dataset)
+    assert count == len(rows) > 0
+    back = read_back(fmt, out.getvalue(), dataset)
+    if fmt == "csv":  # CSV has no types
+        rows = [tuple("" if v is None else str(v) for v in row) for row in rows]
+    assert back == rows
+
+
+def test_chunks_follow_the_key_order(stores):
+    chunked = [row for chunk in export.iter_chunks("saves", chunk_rows=2) for row in chunk]
+    assert chunked == sorted(expected("saves"))
+    assert len(chunked) == 5
+
+
+def test_unknown_dataset_or_format(stores):
+    with pytest.raises(ValueError, match="dataset"):
+        export.export("users", "csv", io.BytesIO())
+    with pytest.raises(ValueError, match="format"):
+        export.export("threads", "xlsx", io.BytesIO())
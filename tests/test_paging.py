@@ -0,0 +1,61 @@
+import pytest
+
+import forum_db
+from bench.seed import seed
+from storage import SQLiteBackend
+
+SORTS = [*forum_db.SORT_ORDERS, forum_db.RELEVANCE]
+FILTERS = {
+    "all": {},
+    "category": {"category": "General"},
+    "author": {"author": "user1"},
+    "saved": {"saved_by": "user0"},
+    "search": {"search": "audit"},
+}
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    """A small seeded forum: skewed authors and many ties in reply counts."""
+    saved = forum_db._backend
+    path = tmp_path_factory.mktemp("paging") / "forum.db"
+    seed(path, threads=400, posts=2000, users=20, saves=400, log=lambda *a: None)
+    forum_db.set_backend(saved)
+    return path
+
+
+@pytest.fixture
+def forum(store, forum_backend):
+    forum_db.set_backend(SQLiteBackend(store))
+
+
+def all_pages(limit: int, **kwargs) -> list:
+    ids, cursor = [], None
+    while True:
+        rows, cursor = forum_db.query_thread_page(None, limit=limit, cursor=cursor, **kwargs)
+        ids += [r[0] for r in rows]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("name", FILTERS)
+@pytest.mark.parametrize("sort", SORTS)
+def test_pages_follow_the_unpaged_order(forum, sort, name):
+    unpaged = [r[0] for r in forum_db.query_thread_list(None, limit=10_000, sort=sort, **FILTERS[name])]
+    assert unpaged, "the seeded store should have rows for every filter"
+    assert all_pages(7, sort=sort, **FILTERS[name]) == unpaged
+
+
+def test_last_page_has_no_cursor(forum):
+    ids = [r[0] for r in forum_db.query_thread_list(None, limit=10_000)]
+    rows, cursor = forum_db.query_thread_page(None, limit=len(ids))
+    assert len(rows) == len(ids) and cursor is None
+    rows, cursor = forum_db.query_thread_page(None, limit=len(ids) - 1)
+    rest, cursor = forum_db.query_thread_page(None, limit=5, cursor=cursor)
+    assert [r[0] for r in rest] == ids[-1:] and cursor is None
+
+
+def test_before_id_pages_by_id(forum):
+    first = forum_db.query_threads(limit=10)
+    second = forum_db.query_threads(limit=10, before_id=first[-1][0])
+    assert [r[0] for r in first + second] == [r[0] for r in forum_db.query_threads(limit=20)]
@@ -0,0 +1,39 @@
+import pytest
+
+import forum_db
+from bench.seed import seed
+from storage import SQLiteBackend
+
+CHECKS = sorted(forum_db.query_plan_checks())
+
+
+@pytest.fixture(scope="module")
+def stores(tmp_path_factory):
+    """One store straight after migration, one with analyzed data."""
+    saved = forum_db._backend
+    empty = tmp_path_factory.mktemp("plans") / "empty.db"
+    forum_db.set_backend(SQLiteBackend(empty))
+    forum_db.init_db()
+    seeded = tmp_path_factory.mktemp("plans") / "seeded.db"
+    seed(seeded, threads=3000, posts=15000, users=200, saves=1500, log=lambda *a: None)
+    forum_db.set_backend(saved)
+    return {"empty": empty, "seeded": seeded}
+
+
+@pytest.fixture(params=["empty", "seeded"])
+def forum(request, stores, forum_backend):
+    forum_db.set_backend(SQLiteBackend(stores[request.param]))
+
+
+@pytest.mark.parametrize("name", CHECKS)
+def test_plan_uses_indexes(forum, name):
+    sql, params, may_sort, must_seek = forum_db.query_plan_checks()[name]
+    plan = forum_db.explain(sql, params)
+    assert forum_db.plan_problems(plan, may_sort, must_seek) == [], "\n".join(plan)
+
+
+def test_temp_b_tree_is_a_problem():
+    plan = ["SCAN t USING INDEX threads_list", "USE TEMP B-TREE FOR ORDER BY"]
+    assert forum_db.plan_problems(plan) == ["USE TEMP B-TREE FOR ORDER BY"]
+    assert forum_db.plan_problems(plan, may_sort=True) == []
+    assert forum_db.plan_problems(plan, may_sort=True, must_seek=True) == plan[:1]
@@ -0,0 +1,90 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import quiz_bank
+from player import format_timestamps, parse_timestamps
+
+
+@pytest.mark.parametrize("text, seconds", [
+    ("5", 5.0),
+    ("1:05", 65.0),
+    ("1:05.25", 65.25),
+    ("01:02:03", 3723.0),
+    (" 0:59.5 ", 59.5),
+    ("12.", 12.0),
+])
+def test_parse_timestamps(text, seconds):
+    assert parse_timestamps(pd.Series([text]))[0] == seconds
+
+
+@pytest.mark.parametrize("text", ["", "abc", "1:60", "1:60:00", "-5", "1::2", "1:2:3:4", "nan"])
+def test_parse_timestamps_rejects(text):
+    assert np.isnan(parse_timestamps(pd.Series([text]))[0])
+
+
+def test_format_timestamps_round_trips():
+    seconds = pd.Series([0, 5, 59.9994, 59.9996, 61.1, 3599.9999, 3600, 3661.5])
+    text = format_timestamps(seconds)
+    assert list(text) == ["0:00", "0:05", "0:59.999", "1:00", "1:01.1", "1:00:00", "1:00:00", "1:01:01.5"]
+    values = pd.Series(np.random.default_rng(0).uniform(0, 20000, 2000).round(3))
+    assert (parse_timestamps(format_timestamps(values)) - values).abs().max() < 1e-6
+
+
+def bank(*rows) -> pd.DataFrame:
+    return pd.DataFrame(list(rows), columns=quiz_bank.BANK_COLUMNS, dtype=str)
+
+
+def test_validate_chunk():
+    chunk = bank(
+        ["0:10", " Q1 ", "a", "b", "", "a"],
+        ["", "", "", "", "", ""],
+        ["0:70", "Q2", "a", "b", "c", "a"],
+        ["0:20", "", "a", "", "", "z"],
+        ["0:30", "Q3", "a", "b", "c", "c"],
+    )
+    clean, issues = quiz_bank.validate_chunk(chunk, first_row=11)
+    assert list(clean.index) == [11, 15]
+    assert list(clean["at_seconds"]) == [10.0, 30.0]
+    assert clean.loc[11, "Question"] == "Q1"
+    assert sorted(map(tuple, issues.values.tolist())) == [
+        (13, "Time", "not a timestamp ([h:]m:ss[.fff])"),
+        (14, "Correct Answer", "not one of the options"),
+        (14, "Option A", "fewer than two options"),
+        (14, "Question", "empty"),
+    ]
+
+
+def test_validate_chunk_needs_every_column():
+    with pytest.raises(ValueError, match="Correct Answer"):
+        quiz_bank.validate_chunk(bank().drop(columns="Correct Answer"))
+
+
+def test_import_and_load_round_trip(quiz_store):
+    csv = "\n".join([
+        ",".join(quiz_bank.BANK_COLUMNS),
+        "1:00,Later,a,b,,b",
+        "0:30,Early,a,b,c,a",
+        "0:30,Early,x,y,,y",  # same (time, question): the last row wins
+        "bad,Broken,a,b,,a",
+    ])
+    chunks = quiz_bank.read_chunks(io.BytesIO(csv.encode()), "bank.csv", chunk_rows=2)
+    report = quiz_bank.import_bank("vid00000001", chunks, "bank.csv")
+    assert report["version"] == 1
+    assert {k: report[k] for k in ("rows", "rejected", "duplicates", "out_of_order", "questions")} == {
+        "rows": 4, "rejected": 1, "duplicates": 1, "out_of_order": 1, "questions": 2,
+    }
+    version, df = quiz_bank.load_bank("vid00000001")
+    assert version == 1
+    assert df.values.tolist() == [
+        ["0:30", "Early", "x", "y", "", "y"],
+        ["1:00", "Later", "a", "b", "", "b"],
+    ]
+
+
+def test_import_without_good_rows_stores_nothing(quiz_store):
+    report = quiz_bank.import_bank("vid00000002", [bank(["x", "Q", "a", "b", "", "a"])])
+    assert report["version"] is None and report["rejected"] == 1
+    assert quiz_bank.load_bank("vid00000002") == (None, None)
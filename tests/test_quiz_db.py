@@ -0,0 +1,58 @@
+from db import connect, get_writer
+
+ROLLUPS = {
+    "question_stats": (
+        "SELECT video_id, question_id, answers, correct FROM question_stats",
+        "SELECT video_id, question_id, COUNT(*), SUM(correct) FROM attempts GROUP BY 1, 2",
+    ),
+    "choice_stats": (
+        "SELECT video_id, question_id, choice, answers FROM choice_stats",
+        "SELECT video_id, question_id, choice, COUNT(*) FROM attempts GROUP BY 1, 2, 3",
+    ),
+    "learner_progress": (
+        "SELECT video_id, learner_id, answered, correct, last_answered_at FROM learner_progress",
+        "SELECT video_id, learner_id, COUNT(*), SUM(correct), MAX(answered_at) FROM attempts GROUP BY 1, 2",
+    ),
+}
+
+
+def answer(qid, choice, correct, at, at_seconds=None):
+    return {"questionId": qid, "choice": choice, "correct": correct, "answered_at": at, "at_seconds": at_seconds}
+
+
+def assert_rollups_match(quiz_db):
+    conn = connect(quiz_db.DB_PATH)
+    try:
+        for name, (stored, recomputed) in ROLLUPS.items():
+            assert sorted(conn.execute(stored)) == sorted(conn.execute(recomputed)), name
+    finally:
+        conn.close()
+
+
+def test_rollups_follow_inserts_and_re_answers(quiz_store):
+    quiz_store.record_attempts("amy", "vid", [answer("q1", "A", True, "2024-01-01T10:00", 5.0), answer("q2", "B", False, "2024-01-01T10:01")]).result()
+    quiz_store.record_attempts("bob", "vid", [answer("q1", "C", False, "2024-01-01T11:00", 5.0)]).result()
+    assert_rollups_match(quiz_store)
+    # amy changes her mind; a replay of her old answer is ignored
+    assert quiz_store.record_attempts("amy", "vid", [answer("q1", "C", False, "2024-01-02T09:00")]).result() == 1
+    assert quiz_store.record_attempts("amy", "vid", [answer("q1", "A", True, "2024-01-01T10:00")]).result() == 0
+    assert_rollups_match(quiz_store)
+    assert sorted(quiz_store.list_choice_stats("vid")) == [("q1", "C", 2), ("q2", "B", 1)]
+    assert sorted(quiz_store.list_question_stats("vid")) == [("q1", 5.0, 2, 0), ("q2", None, 1, 0)]
+    assert quiz_store.list_quiz_videos() == [("vid", 2, 3)]
+
+
+def test_rollups_follow_deletes(quiz_store):
+    quiz_store.record_attempts("amy", "vid", [answer("q1", "A", True, "2024-01-01T10:00"), answer("q2", "A", True, "2024-01-01T10:05")]).result()
+    quiz_store.record_attempts("bob", "vid", [answer("q1", "B", False, "2024-01-01T11:00")]).result()
+    deleted = get_writer(quiz_store.DB_PATH).submit(
+        lambda c: c.execute("DELETE FROM attempts WHERE question_id='q2' OR choice='B'").rowcount
+    ).result()
+    assert deleted == 2
+    assert_rollups_match(quiz_store)
+    assert quiz_store.list_learner_progress("vid") == [("amy", 1, 1, "2024-01-01T10:00")]
+
+
+def test_malformed_answers_are_dropped(quiz_store):
+    assert quiz_store.record_attempts("amy", "vid", [None, {"questionId": "q1"}, answer(1, "A", True, "t")]) is None
+    assert quiz_store.count_attempts() == 0
@@ -0,0 +1,76 @@
+import pytest
+
+import forum_db
+from db import connect
+from storage import SQLiteBackend
+
+OLD = "2000-01-01T00:00:00"
+
+
+@pytest.fixture
+def forum(tmp_path, forum_backend):
+    """Threads 1-4; 1 and 2 idle since 2000, with replies and saves."""
+    forum_db.set_backend(SQLiteBackend(tmp_path / "forum.db"))
+    forum_db.init_db()
+    ids = [forum_db.create_thread(f"Thread {i}", f"budget text {i}", "General", "amy") for i in range(1, 5)]
+    for thread_id in ids:
+        forum_db.add_post(thread_id, f"reply to {thread_id}", "bob")
+    forum_db.toggle_save("amy", ids[0])
+    forum_db.toggle_save("bob", ids[2])
+    forum_db.submit_write(
+        lambda c: c.execute("UPDATE threads SET last_activity_at=? WHERE id IN (?,?)", (OLD, *ids[:2])),
+        "threads",
+    ).result()
+    return ids
+
+
+def dump(path, table: str, columns: str) -> list:
+    conn = connect(path)
+    try:
+        return conn.execute(f"SELECT {columns} FROM {table} ORDER BY 1, 2").fetchall()
+    finally:
+        conn.close()
+
+
+def test_dry_run_counts_without_moving(forum, tmp_path):
+    report = forum_db.archive_inactive(days=30, archive=tmp_path / "archive.db", dry_run=True)
+    assert (report["threads"], report["posts"], report["saves"]) == (2, 2, 1)
+    assert not (tmp_path / "archive.db").exists()
+    assert len(forum_db.query_threads()) == 4
+
+
+def test_archive_round_trip(forum, tmp_path):
+    live = tmp_path / "forum.db"
+    archive = tmp_path / "archive.db"
+    columns = {
+        "threads": "id, title, body, category, author, created_at, reply_count, last_activity_at",
+        "posts": "id, thread_id, author, body, created_at",
+        "saves": "user, thread_id",
+    }
+    before = {table: dump(live, table, cols) for table, cols in columns.items()}
+    report = forum_db.archive_inactive(days=30, archive=archive, batch=1)
+    assert (report["threads"], report["posts"], report["saves"]) == (2, 2, 1)
+    for table, cols in columns.items():
+        moved, kept = dump(archive, table, cols), dump(live, table, cols)
+        assert sorted(moved + kept) == sorted(before[table]), table
+    assert [r[0] for r in dump(archive, "threads", "id, title")] == forum[:2]
+    assert [r[1] for r in dump(archive, "posts", "id, thread_id")] == forum[:2]
+    assert dump(archive, "saves", "user, thread_id") == [("amy", forum[0])]
+    assert [r[0] for r in forum_db.query_threads()] == forum[:1:-1]
+    assert {r[0] for r in forum_db.search_threads("budget")} == set(forum[2:])
+    assert forum_db.query_threads(saved_by="amy") == []
+    again = forum_db.archive_inactive(days=30, archive=archive)
+    assert again["threads"] == 0
+    assert len(dump(archive, "threads", "id, title")) == 2
+
+
+def test_threads_that_stay_live_leave_the_archive(forum, tmp_path, monkeypatch):
+    copy = forum_db._copy_batch
+    # As if amy's save was made after the copy: its thread must stay.
+    monkeypatch.setattr(forum_db, "_copy_batch", lambda *args: copy(*args) - {("amy", forum[0])})
+    archive = tmp_path / "archive.db"
+    report = forum_db.archive_inactive(days=30, archive=archive)
+    assert report["threads"] == 1
+    assert [r[0] for r in dump(archive, "threads", "id, title")] == [forum[1]]
+    assert dump(archive, "saves", "user, thread_id") == []
+    assert forum_db.is_saved("amy", forum[0])
@@ -0,0 +1,67 @@
+import pytest
+
+import forum_db
+from storage import MemoryBackend
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("hello world", '"hello"* "world"*'),
+    ('"exact phrase" x', '"exact phrase" "x"'),
+    ("a", '"a"'),
+    ("ab", '"ab"*'),
+    ("NOT OR AND", '"NOT"* "OR"* "AND"*'),
+    ('foo"bar', '"foo""bar"*'),
+    ('"unterminated', '"""unterminated"*'),
+    ("*", '"*"'),
+    ('""', ""),
+    ("  ", ""),
+    (None, ""),
+])
+def test_fts_query(text, expected):
+    assert forum_db.fts_query(text) == expected
+
+
+@pytest.fixture
+def forum(forum_backend):
+    """Threads 1-6; the odd ones mention "budget" in their text or a reply."""
+    forum_db.set_backend(MemoryBackend())
+    forum_db.init_db()
+    ids = []
+    for i in range(1, 7):
+        body = "quarterly budget review" if i in (1, 5) else "nothing to see"
+        ids.append(forum_db.create_thread(f"Thread {i}", body, "General", f"user{i}"))
+    forum_db.add_post(ids[2], "the budget is late", "bob")
+    forum_db.add_post(ids[3], "unrelated", "bob")
+    return ids
+
+
+def test_operators_are_plain_words(forum):
+    for text in ('"budget', "budget*", "(budget"):
+        assert len(forum_db.search_threads(text)) == 3  # no fts5 syntax error
+    assert forum_db.search_threads("budget OR") == []  # "OR" is a word to find
+    assert len(forum_db.search_threads("NOT")) == 4  # a prefix of "nothing"
+
+
+def test_prefix_and_phrase(forum):
+    assert {r[0] for r in forum_db.search_threads("budg")} == {forum[0], forum[2], forum[4]}
+    assert {r[0] for r in forum_db.search_threads('"budget review"')} == {forum[0], forum[4]}
+    assert forum_db.search_threads("b") == []  # one letter: whole words only
+
+
+def test_title_matches_rank_first(forum):
+    tid = forum_db.create_thread("Budget", "see title", "General", "amy")
+    assert forum_db.search_threads("budget")[0][0] == tid
+
+
+def test_snippets_come_from_the_matching_text(forum):
+    snippets = {r[0]: r[-1] for r in forum_db.search_threads("budget")}
+    assert snippets[forum[0]] == "quarterly <mark>budget</mark> review"
+    assert snippets[forum[2]] == "the <mark>budget</mark> is late"
+
+
+@pytest.mark.parametrize("sort", [*forum_db.SORT_ORDERS, forum_db.RELEVANCE])
+def test_every_sort_finds_every_match(forum, sort):
+    rows, cursor = forum_db.query_thread_page(None, "budget", limit=10, sort=sort)
+    assert cursor is None
+    assert {r[0] for r in rows} == {forum[0], forum[2], forum[4]}
+    assert all("<mark>" in r[-1] for r in rows)
@@ -0,0 +1,148 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import forum_db
+from db import PRAGMAS, WriteQueue, connect
+from storage import SQLiteBackend
+
+
+@pytest.fixture
+def queue(tmp_path):
+    """A writer on a fresh file with one table, ``t(x UNIQUE)``."""
+    path = tmp_path / "q.db"
+    conn = connect(path)
+    conn.execute("CREATE TABLE t (x INTEGER UNIQUE)")
+    conn.commit()
+    conn.close()
+    writer = WriteQueue(path)
+    yield writer
+    writer.close()
+
+
+def rows(writer) -> list:
+    conn = connect(writer.path)
+    try:
+        return [x for (x,) in conn.execute("SELECT x FROM t ORDER BY x")]
+    finally:
+        conn.close()
+
+
+def hold(writer) -> threading.Event:
+    """Park the writer thread on a job until the returned event is set."""
+    release = threading.Event()
+    writer.submit(lambda c: release.wait(5))
+    return release
+
+
+def insert(x):
+    return lambda c: c.execute("INSERT INTO t VALUES (?)", (x,)).rowcount
+
+
+def test_failing_job_does_not_sink_its_batch(queue):
+    release = hold(queue)
+    futures = [queue.submit(insert(1)), queue.submit(insert(1)), queue.submit(insert(2))]
+    release.set()
+    assert futures[0].result(5) == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result(5)
+    assert futures[2].result(5) == 1
+    assert rows(queue) == [1, 2]
+
+
+def test_partial_job_is_rolled_back(queue):
+    def half_done(c):
+        c.execute("INSERT INTO t VALUES (3)")
+        raise ValueError("stop")
+
+    release = hold(queue)
+    failed, ok = queue.submit(half_done), queue.submit(insert(4))
+    release.set()
+    with pytest.raises(ValueError):
+        failed.result(5)
+    assert ok.result(5) == 1
+    assert rows(queue) == [4]
+
+
+def test_busy_database_is_retried(tmp_path):
+    path = tmp_path / "busy.db"
+    other = connect(path)
+    other.execute("CREATE TABLE t (x INTEGER UNIQUE)")
+    other.commit()
+    writer = WriteQueue(path, pragmas={**PRAGMAS, "busy_timeout": 0})
+    try:
+        writer.submit(lambda c: None).result(5)  # connect before the lock is taken
+        other.execute("BEGIN IMMEDIATE")
+        future = writer.submit(insert(1))
+        time.sleep(0.05)
+        assert not future.done()
+        other.rollback()
+        assert future.result(5) == 1
+        assert writer.retries >= 1
+        assert rows(writer) == [1]
+    finally:
+        writer.close()
+        other.close()
+
+
+def test_future_resolves_after_commit(queue):
+    seen = []
+    future = queue.submit(insert(5), on_commit=lambda _: seen.append(rows(queue)))
+    assert future.result(5) == 1
+    assert seen == [[5]]
+
+
+def test_on_commit_error_keeps_the_result(queue, caplog):
+    def broken(_):
+        raise RuntimeError("cache gone")
+
+    assert queue.submit(insert(6), on_commit=broken).result(5) == 1
+    assert rows(queue) == [6]
+    assert "on_commit callback failed" in caplog.text
+
+
+def test_bare_job_runs_outside_a_transaction(queue):
+    assert queue.submit(lambda c: c.in_transaction, transaction=False).result(5) is False
+    assert queue.submit(lambda c: c.in_transaction).result(5) is True
+
+
+def test_data_version_ignores_own_writes(queue):
+    before = queue.data_version()
+    queue.submit(insert(7)).result(5)
+    assert queue.data_version() == before
+    conn = connect(queue.path)
+    conn.execute("INSERT INTO t VALUES (8)")
+    conn.commit()
+    conn.close()
+    assert queue.data_version() != before
+
+
+def test_reads_see_local_writes(tmp_path, forum_backend):
+    forum_db.set_backend(SQLiteBackend(tmp_path / "forum.db"))
+    forum_db.init_db()
+    assert forum_db.query_threads() == []
+    thread_id = forum_db.create_thread("Hello", "first", "General", "amy")
+    assert [r[0] for r in forum_db.query_threads()] == [thread_id]
+    assert forum_db.post_count(thread_id) == 0
+    forum_db.add_post(thread_id, "a reply", "bob")
+    assert forum_db.post_count(thread_id) == 1
+    assert forum_db.toggle_save("amy", thread_id) is True
+    assert forum_db.is_saved("amy", thread_id)
+
+
+def test_reads_see_writes_from_other_processes(tmp_path, forum_backend, monkeypatch):
+    monkeypatch.setattr(forum_db, "DATA_VERSION_INTERVAL", 0)
+    path = tmp_path / "forum.db"
+    forum_db.set_backend(SQLiteBackend(path))
+    forum_db.init_db()
+    assert forum_db.query_threads() == []
+    conn = connect(path)
+    conn.execute(
+        "INSERT INTO threads (title, body, preview, category, author, created_at) "
+        "VALUES ('Elsewhere', 'b', 'b', 'General', 'cli', '2024-01-01T00:00:00')"
+    )
+    conn.commit()
+    conn.close()
+    assert [r[1] for r in forum_db.query_threads()] == ["Elsewhere"]